@@ -1,4 +1,5 @@
 import os
+import sys
 import django
 from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
@@ -9,6 +10,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 django_asgi_app = get_asgi_application()
 from games import routing
+from backend.redis_pool import close_async_redis, close_on_reactor_shutdown
 
 ALLOWED_WS_ORIGINS = [
     "http://localhost:3000",
@@ -18,8 +20,30 @@ ALLOWED_WS_ORIGINS = [
     "https://*.vercel.app",  
 ]
 
+
+
+if "twisted.internet.reactor" in sys.modules:
+    # Daphne installs its reactor before loading the application and never
+    # sends lifespan events, so close the shared Redis pool from the reactor
+    from twisted.internet import reactor
+    close_on_reactor_shutdown(reactor)
+
+
+async def lifespan(scope, receive, send):
+    """Close the shared Redis pool on shutdown (servers that speak ASGI lifespan, e.g. uvicorn)."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_redis()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
+    "lifespan": lifespan,
     "websocket": OriginValidator(
         AuthMiddlewareStack(
             URLRouter(
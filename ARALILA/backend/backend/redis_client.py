@@ -0,0 +1,21 @@
+"""
+Shared synchronous Redis client for request-path features (leaderboards, ...).
+
+Returns None when Redis was not reachable at startup (settings.REDIS_AVAILABLE)
+so callers can fall back to the database.
+"""
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=1)
+def _client():
+    import redis
+    return redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def get_redis():
+    if not getattr(settings, 'REDIS_AVAILABLE', False):
+        return None
+    return _client()
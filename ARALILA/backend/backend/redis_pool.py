@@ -0,0 +1,86 @@
+"""
+Process-wide async Redis pool for the WebSocket consumers.
+
+Every consumer shares one client backed by a BlockingConnectionPool (sockets
+wait for a free connection instead of opening new ones past
+REDIS_POOL['MAX_CONNECTIONS']). The pool is created lazily on the running
+event loop and closed on shutdown (backend/asgi.py): by a Twisted shutdown
+trigger under Daphne, which never sends ASGI lifespan events, or by the
+lifespan shutdown event under servers that do (e.g. uvicorn).
+"""
+import asyncio
+
+from django.conf import settings
+from redis import asyncio as aioredis
+
+_pool = None
+_client = None
+_loop = None
+
+
+def _pool_settings():
+    config = getattr(settings, 'REDIS_POOL', {})
+    return {
+        'max_connections': config.get('MAX_CONNECTIONS', 50),
+        'timeout': config.get('TIMEOUT', 5),
+        'health_check_interval': config.get('HEALTH_CHECK_INTERVAL', 30),
+        'socket_keepalive': True,
+    }
+
+
+def get_async_redis():
+    """Shared async client for the current event loop."""
+    global _pool, _client, _loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _loop is not loop:
+        # Connections are bound to the loop that opened them
+        _pool = aioredis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            **_pool_settings(),
+        )
+        _client = aioredis.Redis(connection_pool=_pool)
+        _loop = loop
+        print(f"🔌 Redis pool created (max {_pool.max_connections} connections)")
+    return _client
+
+
+async def close_async_redis():
+    """Close the shared client and every pooled connection."""
+    global _pool, _client, _loop
+    client, pool = _client, _pool
+    _pool = _client = _loop = None
+    if client is not None:
+        await client.aclose()
+    if pool is not None:
+        await pool.disconnect()
+        print("🔌 Redis pool closed")
+
+
+def close_on_reactor_shutdown(reactor):
+    """
+    Close the pool when the Twisted reactor shuts down (Daphne). Runs in the
+    "during" phase, after Daphne's own "before" trigger has stopped the
+    consumers, while the asyncio loop is still running.
+    """
+    from twisted.internet import defer
+
+    def close():
+        return defer.Deferred.fromFuture(asyncio.ensure_future(close_async_redis()))
+
+    reactor.addSystemEventTrigger('during', 'shutdown', close)
+
+
+def pool_stats():
+    if _pool is None:
+        return {'created': False, 'max_connections': _pool_settings()['max_connections']}
+    # Private to redis-py; pinned by RedisPoolTests so a rename fails loudly
+    in_use = len(_pool._in_use_connections)
+    idle = len(_pool._available_connections)
+    return {
+        'created': True,
+        'max_connections': _pool.max_connections,
+        'in_use': in_use,
+        'idle': idle,
+        'open': in_use + idle,
+    }
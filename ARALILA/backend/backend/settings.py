@@ -14,6 +14,7 @@ from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
 import os
+import tempfile
 import dj_database_url  # ADD THIS IMPORT
 
 load_dotenv(encoding='utf-8')  # Load environment variables from .env file
@@ -138,14 +139,65 @@ REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')
 
 print(f"🔧 Redis URL: {REDIS_URL}")
 
+REDIS_AVAILABLE = False
 try:
     import redis
     r = redis.from_url(REDIS_URL)
     r.ping()
+    REDIS_AVAILABLE = True
     print("✅ Redis connected successfully")
 except Exception as e:
     print(f"❌ Redis connection failed: {e}")
 
+# Shared cache tier (question packs, etc). Falls back to an on-disk cache
+# when Redis is not reachable so local processes (runserver + seed commands)
+# still share invalidations.
+CACHES = {
+    "default": {
+        "BACKEND": (
+            'django.core.cache.backends.redis.RedisCache'
+            if REDIS_AVAILABLE
+            else 'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        "LOCATION": REDIS_URL if REDIS_AVAILABLE else os.path.join(tempfile.gettempdir(), 'aralila-cache'),
+        "KEY_PREFIX": 'aralila',
+    },
+}
+
+# In-process LRU size for compiled question packs (see games/question_packs.py)
+QUESTION_PACK_LRU_SIZE = int(os.getenv('QUESTION_PACK_LRU_SIZE', '256'))
+
+# AI answer evaluation (see games/ai_evaluator.py). Set AI_EVALUATOR_BACKEND to
+# games.ai_evaluator.LocalBackend to grade offline without an OpenAI key.
+AI_EVALUATOR = {
+    'BACKEND': os.getenv('AI_EVALUATOR_BACKEND', 'games.ai_evaluator.OpenAIBackend'),
+    'MODEL': os.getenv('AI_EVALUATOR_MODEL', 'gpt-4o-mini'),
+    'MAX_CONCURRENCY': int(os.getenv('AI_EVALUATOR_MAX_CONCURRENCY', '8')),
+    'TIMEOUT': float(os.getenv('AI_EVALUATOR_TIMEOUT', '30')),
+    'CACHE_TIMEOUT': int(os.getenv('AI_EVALUATOR_CACHE_TIMEOUT', str(60 * 60 * 24 * 7))),
+    # Bump when the prompts/scoring rules change to drop cached verdicts
+    'RUBRIC_VERSION': 1,
+    # Decide clear-cut answers locally (see games/pregrader.py)
+    'PREGRADE': os.getenv('AI_EVALUATOR_PREGRADE', 'True') == 'True',
+}
+
+# Story Chain sentence scoring runs in a background queue (see games/story_evaluation.py);
+# after TIMEOUT seconds the round is scored locally instead. MODE 'batched' scores rounds
+# locally during play and sends the whole game to the model in one request at the end.
+STORY_EVALUATION = {
+    'WORKERS': int(os.getenv('STORY_EVALUATION_WORKERS', '4')),
+    'TIMEOUT': float(os.getenv('STORY_EVALUATION_TIMEOUT', '10')),
+    'MODE': os.getenv('STORY_EVALUATION_MODE', 'per_round'),
+}
+
+# Async Redis pool shared by the WebSocket consumers (see backend/redis_pool.py)
+REDIS_POOL = {
+    'MAX_CONNECTIONS': int(os.getenv('REDIS_POOL_MAX_CONNECTIONS', '50')),
+    # Seconds a socket waits for a free connection before erroring
+    'TIMEOUT': float(os.getenv('REDIS_POOL_TIMEOUT', '5')),
+    'HEALTH_CHECK_INTERVAL': int(os.getenv('REDIS_POOL_HEALTH_CHECK_INTERVAL', '30')),
+}
+
 # WebSocket Configuration
 WEBSOCKET_ALLOWED_ORIGINS = [
     'http://localhost:3000',
@@ -0,0 +1,594 @@
+"""
+AI evaluation service for free-text Filipino answers (emoji sentences,
+COMPOSE challenges and Story Chain sentences).
+
+All model calls run on one background event loop owned by the evaluator:
+    - the backend's HTTP client (AsyncOpenAI) keeps a single connection pool
+    - an asyncio.Semaphore caps in-flight completions (MAX_CONCURRENCY)
+    - sync views block only on the result; async views await it
+
+Verdicts are cached in the shared cache under the normalized
+(kind, answer, emojis) plus RUBRIC_VERSION, so regrading the same answer is
+free and bumping the rubric version orphans every stored verdict. Identical
+requests that arrive while one is still being graded are coalesced: they
+wait on the in-flight evaluation instead of calling the model again
+(single-flight). Clear-cut answers (empty, mostly English, no expected
+keyword) are decided by the local pre-grader in games/pregrader.py before
+any of that. stats() reports pre-graded answers, cache hits and coalesced
+waiters.
+
+Backends are pluggable through settings.AI_EVALUATOR['BACKEND']:
+    games.ai_evaluator.OpenAIBackend  - production
+    games.ai_evaluator.LocalBackend   - deterministic, offline (tests, local dev)
+"""
+import asyncio
+import concurrent.futures
+import copy
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+from .data.lexicon import filipino_words, english_words
+from .pregrader import pregrade, words_in
+
+
+EMOJI_PROMPT = """You are a Filipino language teacher. Evaluate this student's sentence.
+
+Keywords to use: {emojis}
+Student's sentence: "{answer}"
+
+Evaluation criteria:
+1. Check if ALL words are in Filipino (Tagalog). If English words are used, note them.
+2. Check grammar correctness in Filipino.
+3. Check if meaning matches the keywords.
+
+Scoring rules:
+- All Filipino words + correct grammar + matches keywords = 20 points (valid: true)
+- Has 1-2 English words but otherwise correct = 15 points (valid: true)
+- Has 3+ English words or major grammar issues = 10 points (valid: false)
+- Completely wrong or nonsensical = 0 points (valid: false)
+
+Respond ONLY in valid JSON:
+{{
+  "valid": true/false,
+  "points": 0-20,
+  "explanation": "Filipino text explaining what's good/wrong. If English words found, mention them and give Filipino equivalents.",
+  "english_words_found": ["word1", "word2"] or [],
+  "filipino_equivalents": {{"english_word": "Filipino_word"}} or {{}}
+}}
+
+Example response for mixed language:
+{{
+  "valid": true,
+  "points": 15,
+  "explanation": "Maganda ang sentence mo pero may English words: 'run' (dapat 'takbo'), 'water' (dapat 'tubig'). Gamitin: 'Tumakbo siya para sa tubig.'",
+  "english_words_found": ["run", "water"],
+  "filipino_equivalents": {{"run": "takbo", "water": "tubig"}}
+}}
+
+Use Filipino only in explanations. No english if possible.
+"""
+
+COMPOSE_PROMPT = """You are a Filipino language teacher. Evaluate this student's composed sentence.
+
+Emojis to use: {emojis}
+Student's sentence: "{answer}"
+
+Evaluation criteria:
+1. Check if the sentence uses ALL Filipino (Tagalog) words. Note any English words.
+2. Check grammar correctness in Filipino.
+3. Check if the sentence relates to ALL the given emojis.
+4. Check sentence structure and coherence.
+
+Scoring rules:
+- All Filipino + correct grammar + uses all emojis + coherent = 100% (valid: true)
+- 1-2 English words but otherwise good = 80% (valid: true)
+- Missing 1 emoji or minor grammar issues = 70% (valid: true)
+- 3+ English words or major grammar issues = 50% (valid: false)
+- Nonsensical or unrelated to emojis = 0% (valid: false)
+
+Respond ONLY in valid JSON:
+{{
+  "valid": true/false,
+  "score": 0-100,
+  "explanation": "Filipino text explaining what's good/wrong. If English words found, give Filipino equivalents.",
+  "english_words_found": ["word1", "word2"] or [],
+  "filipino_equivalents": {{"english_word": "Filipino_word"}} or {{}},
+  "missing_emojis": ["emoji1", "emoji2"] or []
+}}
+
+Example response:
+{{
+  "valid": true,
+  "score": 80,
+  "explanation": "Maganda ang pangungusap mo! Pero may English word: 'play' (dapat 'maglaro'). Ginamit mo nang tama ang lahat ng emoji. Subukan: 'Masayang naglalaro ang pamilya sa bahay.'",
+  "english_words_found": ["play"],
+  "filipino_equivalents": {{"play": "maglaro"}},
+  "missing_emojis": []
+}}
+
+Use Filipino only in explanations.
+"""
+
+
+STORY_PROMPT = """You are a Filipino language evaluator.
+Evaluate the following Filipino sentence based on:
+1. Grammar correctness
+2. Coherence and flow
+3. Creativity
+4. Relevance to the image description
+
+Image description:
+"{emojis[0]}"
+
+Sentence:
+"{answer}"
+
+Respond in JSON format:
+{{
+  "score": 1-20,
+  "grammar": 1-5,
+  "coherence": 1-5,
+  "feedback": "One short sentence of feedback in Filipino."
+}}
+"""
+
+
+STORY_BATCH_PROMPT = """You are a Filipino language evaluator.
+A group of learners wrote one sentence per image in a story game.
+Evaluate each sentence based on:
+1. Grammar correctness
+2. Coherence and flow
+3. Creativity
+4. Relevance to its image description
+
+Rounds (JSON list of {{"round", "image_description", "sentence"}}):
+{answer}
+
+Respond in JSON format, with one entry per round:
+{{
+  "scores": [
+    {{"round": 0, "score": 1-20, "grammar": 1-5, "coherence": 1-5, "feedback": "One short sentence of feedback in Filipino."}}
+  ]
+}}
+"""
+
+
+def finish_emoji_result(result):
+    """Ensure all expected fields exist with defaults."""
+    if "points" not in result:
+        result["points"] = 20 if result.get("valid") else 0
+    if "english_words_found" not in result:
+        result["english_words_found"] = []
+    if "filipino_equivalents" not in result:
+        result["filipino_equivalents"] = {}
+    if "details" not in result:
+        result["details"] = {
+            "grammar": result.get("points", 0) // 4,
+            "punctuation": result.get("points", 0) // 4,
+            "spelling": result.get("points", 0) // 4,
+            "relevancy": result.get("points", 0) // 4
+        }
+    return result
+
+
+def finish_compose_result(result):
+    """Ensure all expected fields exist with defaults."""
+    if "score" not in result:
+        result["score"] = 100 if result.get("valid") else 0
+    if "english_words_found" not in result:
+        result["english_words_found"] = []
+    if "filipino_equivalents" not in result:
+        result["filipino_equivalents"] = {}
+    if "missing_emojis" not in result:
+        result["missing_emojis"] = []
+    return result
+
+
+def finish_story_result(result):
+    """Clamp the group score to 1-20 and fill the sub-scores."""
+    try:
+        score = int(result.get("score", 10))
+    except (TypeError, ValueError):
+        score = 10
+    result["score"] = max(1, min(score, 20))
+    for field in ("grammar", "coherence"):
+        try:
+            result[field] = int(result.get(field, 0))
+        except (TypeError, ValueError):
+            result[field] = 0
+    result.setdefault("feedback", "")
+    return result
+
+
+def finish_story_batch_result(result):
+    """Normalise every round's entry like a single 'story' result."""
+    scores = []
+    for entry in result.get("scores") or []:
+        try:
+            index = int(entry.get("round"))
+        except (AttributeError, TypeError, ValueError):
+            continue
+        scores.append({**finish_story_result(dict(entry)), "round": index})
+    result["scores"] = scores
+    return result
+
+
+RUBRICS = {
+    'emoji': {
+        'prompt': EMOJI_PROMPT,
+        'max_tokens': 200,
+        'finish': finish_emoji_result,
+    },
+    'compose': {
+        'prompt': COMPOSE_PROMPT,
+        'max_tokens': 150,
+        'finish': finish_compose_result,
+    },
+    # emojis = [image description]
+    'story': {
+        'prompt': STORY_PROMPT,
+        'max_tokens': 100,
+        'finish': finish_story_result,
+        'pregrade': False,
+    },
+    # answer = JSON list of a whole game's rounds, emojis = []
+    'story_batch': {
+        'prompt': STORY_BATCH_PROMPT,
+        'max_tokens': 500,
+        'finish': finish_story_batch_result,
+        'pregrade': False,
+    },
+}
+
+
+class EvaluationRequest(NamedTuple):
+    kind: str
+    answer: str
+    emojis: list
+    prompt: str
+    max_tokens: int
+
+
+def normalize_text(text):
+    """Case/whitespace/Unicode-insensitive form used for cache keys."""
+    return ' '.join(unicodedata.normalize('NFC', str(text or '')).split()).casefold()
+
+
+def parse_ai_json(text):
+    """Parse a model reply, tolerating ```json fences. Raises json.JSONDecodeError."""
+    cleaned = (
+        text.replace("```json", "")
+            .replace("```", "")
+            .strip()
+    )
+    return json.loads(cleaned)
+
+
+# -------------------- Backends --------------------
+
+class OpenAIBackend:
+    """Chat completions through one pooled AsyncOpenAI client."""
+
+    def __init__(self, options):
+        self.model = options.get('MODEL', 'gpt-4o-mini')
+        self.timeout = options.get('TIMEOUT', 30)
+        self._client = None
+
+    async def complete(self, request):
+        if self._client is None:
+            # Created on the evaluator loop so the connection pool lives there
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=self.timeout)
+
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": "Respond ONLY in valid JSON."},
+                {"role": "user", "content": request.prompt}
+            ],
+            max_tokens=request.max_tokens,
+        )
+        return response.choices[0].message.content.strip()
+
+
+def local_story_score(sentence):
+    """
+    Deterministic 1-20 score for a Story Chain sentence, used offline and
+    when the model is slow or down: up to 8 points for length, 8 for
+    writing in Filipino and 4 for ending the sentence properly.
+    """
+    words = words_in(sentence)
+    if not words:
+        return 1
+    filipino = sum(1 for word in words if word in filipino_words or word not in english_words)
+    length_points = min(len(words), 8)
+    language_points = round(8 * filipino / len(words))
+    ending_points = 4 if sentence.strip()[-1:] in '.!?' else 2
+    return max(1, min(length_points + language_points + ending_points, 20))
+
+
+def local_verdict(request):
+    """Offline verdict: any non-empty answer passes with full marks."""
+    if request.kind == 'story':
+        return {"score": local_story_score(request.answer), "feedback": ""}
+    if request.kind == 'story_batch':
+        return {"scores": [
+            {"round": entry["round"], "score": local_story_score(entry["sentence"]), "feedback": ""}
+            for entry in json.loads(request.answer)
+        ]}
+    answered = bool(request.answer.strip())
+    explanation = "Magaling!" if answered else "Walang sagot."
+    if request.kind == 'emoji':
+        return {"valid": answered, "points": 20 if answered else 0, "explanation": explanation}
+    return {"valid": answered, "score": 100 if answered else 0, "explanation": explanation}
+
+
+class LocalBackend:
+    """
+    Deterministic backend that never touches the network.
+    Pass `responder(request) -> dict` to script verdicts in tests.
+    """
+
+    def __init__(self, options=None, responder=None, delay=0):
+        self.responder = responder or local_verdict
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def complete(self, request):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            return json.dumps(self.responder(request))
+        finally:
+            self.in_flight -= 1
+
+
+# -------------------- Evaluator --------------------
+
+class AIEvaluator:
+    """
+    Runs evaluations on a private event loop thread.
+
+    evaluate(kind, answer, emojis)         - from sync code (DRF views)
+    await aevaluate(kind, answer, emojis)  - from async views / consumers
+    """
+
+    def __init__(self, backend=None, max_concurrency=None, cache_timeout=None, rubric_version=None, use_pregrader=None):
+        options = getattr(settings, 'AI_EVALUATOR', {})
+        if backend is None:
+            backend = import_string(options.get('BACKEND', 'games.ai_evaluator.OpenAIBackend'))(options)
+        self.backend = backend
+        self.max_concurrency = max_concurrency or options.get('MAX_CONCURRENCY', 8)
+        self.cache_timeout = cache_timeout if cache_timeout is not None else options.get('CACHE_TIMEOUT', 60 * 60 * 24 * 7)
+        self.rubric_version = rubric_version if rubric_version is not None else options.get('RUBRIC_VERSION', 1)
+        self.use_pregrader = use_pregrader if use_pregrader is not None else options.get('PREGRADE', True)
+
+        self._loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+        # key -> concurrent.futures.Future resolving to the verdict
+        self._inflight = {}
+        self._stats = {
+            'requests': 0,
+            'pregraded': 0,
+            'cache_hits': 0,
+            'coalesced': 0,
+            'model_calls': 0,
+            'errors': 0,
+        }
+
+    # ---- event loop ----
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-evaluator', daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    async def _complete(self, request):
+        # Only ever touched from the evaluator loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            return await self.backend.complete(request)
+
+    def _submit(self, request):
+        return asyncio.run_coroutine_threadsafe(self._complete(request), self._get_loop())
+
+    # ---- request / cache ----
+
+    def build_request(self, kind, answer, emojis):
+        rubric = RUBRICS[kind]
+        answer = answer or ""
+        emojis = list(emojis or [])
+        return EvaluationRequest(
+            kind=kind,
+            answer=answer,
+            emojis=emojis,
+            prompt=rubric['prompt'].format(emojis=emojis, answer=answer),
+            max_tokens=rubric['max_tokens'],
+        )
+
+    def cache_key(self, kind, answer, emojis):
+        normalized = json.dumps(
+            [normalize_text(answer), [normalize_text(emoji) for emoji in emojis or []]],
+            ensure_ascii=False,
+        )
+        digest = hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+        return f'ai_eval:{kind}:v{self.rubric_version}:{digest}'
+
+    def _cache_get(self, key):
+        try:
+            return cache.get(key)
+        except Exception as e:
+            print(f"⚠️ AI evaluation cache read failed: {e}")
+            return None
+
+    def _cache_set(self, key, result):
+        try:
+            cache.set(key, result, timeout=self.cache_timeout)
+        except Exception as e:
+            print(f"⚠️ AI evaluation cache write failed: {e}")
+
+    def _finish(self, request, text):
+        result = RUBRICS[request.kind]['finish'](parse_ai_json(text))
+        self._cache_set(self.cache_key(request.kind, request.answer, request.emojis), result)
+        return result
+
+    def _pregrade(self, kind, answer, emojis, keywords):
+        if not self.use_pregrader or not RUBRICS[kind].get('pregrade', True):
+            return None
+        try:
+            verdict = pregrade(kind, answer, emojis, keywords)
+        except Exception as e:
+            print(f"⚠️ Pre-grader failed, asking the model: {e}")
+            return None
+        if verdict is not None:
+            self._count('pregraded')
+            verdict = RUBRICS[kind]['finish'](verdict)
+        return verdict
+
+    # ---- single-flight ----
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _join(self, key):
+        """Return (future, is_leader); the leader grades, everyone else waits on the future."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self._stats['coalesced'] += 1
+                return future, False
+            future = concurrent.futures.Future()
+            self._inflight[key] = future
+            self._stats['model_calls'] += 1
+            return future, True
+
+    def _settle(self, key, future, result=None, error=None):
+        # The verdict is already cached, so late arrivals hit the cache
+        with self._lock:
+            self._inflight.pop(key, None)
+            if error is not None:
+                self._stats['errors'] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def stats(self):
+        """Counters for this process since startup."""
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats['requests']
+        stats['hit_rate'] = round(stats['cache_hits'] / requests, 3) if requests else 0.0
+        stats['pregraded_rate'] = round(stats['pregraded'] / requests, 3) if requests else 0.0
+        # Requests answered without a model call of their own
+        stats['avoided_rate'] = round((requests - stats['model_calls']) / requests, 3) if requests else 0.0
+        stats['coalesced_rate'] = round(stats['coalesced'] / requests, 3) if requests else 0.0
+        stats['in_flight'] = len(self._inflight)
+        return stats
+
+    # ---- public API ----
+
+    def evaluate(self, kind, answer, emojis, keywords=None):
+        """
+        Grade an answer; returns the rubric's result dict.
+        keywords optionally overrides the words expected from the emojis.
+        Raises json.JSONDecodeError for unparseable replies and lets backend
+        errors (rate limits, timeouts) propagate.
+        """
+        self._count('requests')
+        verdict = self._pregrade(kind, answer, emojis, keywords)
+        if verdict is not None:
+            return verdict
+
+        key = self.cache_key(kind, answer, emojis)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+
+        future, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            request = self.build_request(kind, answer, emojis)
+            result = self._finish(request, self._submit(request).result())
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+    async def aevaluate(self, kind, answer, emojis, keywords=None):
+        """Async counterpart of evaluate(); never blocks the caller's loop."""
+        self._count('requests')
+        # May read EmojiSymbol once per content version
+        verdict = await sync_to_async(self._pregrade)(kind, answer, emojis, keywords)
+        if verdict is not None:
+            return verdict
+
+        key = self.cache_key(kind, answer, emojis)
+        cached = await asyncio.to_thread(self._cache_get, key)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+
+        future, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(await asyncio.wrap_future(future))
+
+        try:
+            request = self.build_request(kind, answer, emojis)
+            text = await asyncio.wrap_future(self._submit(request))
+            result = await asyncio.to_thread(self._finish, request, text)
+        except asyncio.CancelledError:
+            # e.g. the caller's timeout; don't leave coalesced waiters hanging
+            self._settle(key, future, error=TimeoutError("Evaluation was cancelled"))
+            raise
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        self._settle(key, future, result=result)
+        return result
+
+
+_evaluator = None
+_evaluator_lock = threading.Lock()
+
+
+def get_evaluator():
+    """Process-wide evaluator built from settings.AI_EVALUATOR."""
+    global _evaluator
+    with _evaluator_lock:
+        if _evaluator is None:
+            _evaluator = AIEvaluator()
+        return _evaluator
+
+
+def set_evaluator(evaluator):
+    """Swap the process-wide evaluator (e.g. AIEvaluator(backend=LocalBackend())). Returns the previous one."""
+    global _evaluator
+    with _evaluator_lock:
+        previous, _evaluator = _evaluator, evaluator
+        return previous
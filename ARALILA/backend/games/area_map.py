@@ -0,0 +1,112 @@
+"""
+Area map engine for get_unlocked_areas.
+
+Everything the map needs is fetched up front in a constant number of
+queries (areas, grouped per-area item/game counts and the user's progress
+snapshot, which carries their progress rows and passed assessments); lock
+state, averages and messages are then computed in one linear pass over the
+ordered areas.
+"""
+from django.db.models import Count
+
+from progress.snapshot import get_snapshot
+from .models import Area, GameItem
+
+DEFAULT_GAMES_PER_AREA = 6  # Expected games per area when none are seeded yet
+
+
+def load_area_map_data(user):
+    """Fetch all inputs for the area map (3 queries)."""
+    areas = list(Area.objects.filter(is_active=True).order_by('order_index'))
+
+    item_counts = {}
+    game_counts = {}
+    for row in GameItem.objects.filter(area__in=areas).values('area_id').annotate(
+        item_count=Count('id'),
+        game_count=Count('game_id', distinct=True),
+    ).order_by():
+        item_counts[row['area_id']] = row['item_count']
+        game_counts[row['area_id']] = row['game_count']
+
+    snapshot = get_snapshot(user)
+    progress_by_area = {
+        int(area_id): list(games.values())
+        for area_id, games in snapshot['games'].items()
+    }
+    passed_area_ids = set(snapshot['passed_areas'])
+
+    return areas, item_counts, game_counts, progress_by_area, passed_area_ids
+
+
+def compute_area_map(areas, item_counts, game_counts, progress_by_area, passed_area_ids):
+    """Build the `areas` payload of get_unlocked_areas in one pass."""
+    areas_data = []
+    previous_area = None
+    previous_stats = None
+
+    for index, area in enumerate(areas):
+        rows = progress_by_area.get(area.id, [])
+
+        total_games = item_counts.get(area.id, 0)
+        if total_games == 0:
+            total_games = DEFAULT_GAMES_PER_AREA
+
+        # Games with at least 1 star
+        games_with_stars = sum(1 for row in rows if row['stars_earned'] >= 1)
+
+        # Best score across all difficulties for each game
+        best_scores = []
+        for row in rows:
+            max_score = max(
+                row['difficulty_1_score'],
+                row['difficulty_2_score'],
+                row['difficulty_3_score']
+            )
+            if max_score > 0:
+                best_scores.append(max_score)
+
+        average_score = sum(best_scores) / len(best_scores) if best_scores else 0
+
+        if index == 0:
+            is_locked = False
+            message = "Start your journey here!"
+        else:
+            prev_total = game_counts.get(previous_area.id, 0)
+            if prev_total == 0:
+                prev_total = DEFAULT_GAMES_PER_AREA
+
+            prev_games_with_stars = previous_stats
+            prev_assessment_passed = previous_area.id in passed_area_ids
+
+            # Both conditions must be met
+            if prev_games_with_stars < prev_total:
+                is_locked = True
+                message = f"Earn at least 1 star in all games in {previous_area.name} ({prev_games_with_stars}/{prev_total})"
+            elif not prev_assessment_passed:
+                is_locked = True
+                message = f"Pass the assessment in {previous_area.name} with 80%+"
+            else:
+                is_locked = False
+                message = "Unlocked!"
+
+        areas_data.append({
+            'id': area.id,
+            'order_index': area.order_index,
+            'name': area.name,
+            'description': area.description,
+            'is_locked': is_locked,
+            'completed_games': games_with_stars,
+            'total_games': total_games,
+            'average_score': round(average_score, 1),
+            'message': message,
+            'theme_color': area.theme_color,
+        })
+
+        previous_area = area
+        previous_stats = games_with_stars
+
+    return areas_data
+
+
+def build_area_map(user):
+    return compute_area_map(*load_area_map_data(user))
@@ -0,0 +1,145 @@
+"""
+Area view builder shared by get_area_detail and get_area_by_order.
+
+The per-area game catalog (which games have items in the area, in display
+order) is content, so it is compiled once per content version and kept in
+process; the version bump in games/signals.py orphans it on any content
+write. The user's side comes from their progress snapshot, so a warm call
+costs the area lookup plus one snapshot read.
+"""
+from functools import lru_cache
+
+from progress.snapshot import get_snapshot, area_progress
+from .area_map import DEFAULT_GAMES_PER_AREA
+from .models import Game, GameItem
+from .question_packs import get_content_version
+
+
+def compile_area_catalog(area_id):
+    """Games with items in area_id, ordered like the old views (2 queries)."""
+    game_ids = GameItem.objects.filter(area_id=area_id).values_list('game_id', flat=True).distinct()
+    return tuple(
+        {
+            'id': game.id,
+            'name': game.name,
+            'description': game.description,
+            'game_type': game.game_type if game.game_type else 'unknown',
+        }
+        for game in Game.objects.filter(id__in=game_ids).order_by('order_index')
+    )
+
+
+@lru_cache(maxsize=64)
+def _load_area_catalog(area_id, version):
+    return compile_area_catalog(area_id)
+
+
+def get_area_catalog(area_id):
+    """Cached game catalog for an area. Entries are shared - treat them as read-only."""
+    version = get_content_version()
+    if version is None:
+        return compile_area_catalog(area_id)
+    return _load_area_catalog(area_id, version)
+
+
+def next_difficulty_for(progress, by_order):
+    if not progress['difficulty_1_completed']:
+        return 1
+    if by_order and progress['difficulty_3_unlocked'] and not progress['difficulty_3_completed']:
+        return 3
+    if not progress['difficulty_2_completed']:
+        return 2
+    if not progress['difficulty_3_completed']:
+        return 3
+    return 1
+
+
+def game_entry(game, progress, by_order):
+    if not progress:
+        return {
+            **game,
+            'stars_earned': 0,
+            'next_difficulty': 1,
+            'difficulty_scores': {1: 0, 2: 0, 3: 0},
+            'difficulty_unlocked': {1: True, 2: False, 3: False},
+            'best_score': 0,
+            'completed': False,
+            'attempts': 0,
+            'replay_mode': False,
+        }
+
+    if by_order:
+        difficulty_unlocked = {
+            1: True,
+            2: progress['difficulty_2_unlocked'],
+            3: progress['difficulty_3_unlocked'],
+        }
+    else:
+        difficulty_unlocked = {
+            1: True,
+            2: progress['difficulty_1_completed'],
+            3: progress['difficulty_2_completed'],
+        }
+
+    return {
+        **game,
+        'stars_earned': progress['stars_earned'],
+        'next_difficulty': next_difficulty_for(progress, by_order),
+        'difficulty_scores': {
+            1: progress['difficulty_1_score'],
+            2: progress['difficulty_2_score'],
+            3: progress['difficulty_3_score'],
+        },
+        'difficulty_unlocked': difficulty_unlocked,
+        'best_score': max(
+            progress['difficulty_1_score'],
+            progress['difficulty_2_score'],
+            progress['difficulty_3_score']
+        ),
+        'completed': progress['stars_earned'] >= 1,
+        # (user, area, game) is unique, so there is at most one progress row
+        'attempts': 1,
+        'replay_mode': progress['stars_earned'] == 3,
+    }
+
+
+def build_area_view(user, area, by_order=False):
+    """
+    Response body for the area endpoints.
+
+    by_order keeps get_area_by_order's variant: difficulty unlocks come from
+    the stored *_unlocked flags, an unlocked-but-unfinished Hard is suggested
+    first, and the area carries its order_index.
+    """
+    progress_by_game = area_progress(get_snapshot(user), area.id)
+
+    games_data = [
+        game_entry(game, progress_by_game.get(game['id']), by_order)
+        for game in get_area_catalog(area.id)
+    ]
+
+    completed_count = sum(1 for g in games_data if g['completed'])
+    total_games = len(games_data)
+
+    if total_games == 0:
+        total_games = DEFAULT_GAMES_PER_AREA
+
+    scores = [g['best_score'] for g in games_data if g['best_score'] > 0]
+    avg_score = sum(scores) / len(scores) if scores else 0
+
+    area_data = {'id': area.id}
+    if by_order:
+        area_data['order_index'] = area.order_index
+    area_data.update({
+        'name': area.name,
+        'description': area.description,
+        'completed_games': completed_count,
+        'total_games': total_games,
+        'average_score': round(avg_score, 1),
+        'theme_color': area.theme_color,
+    })
+
+    return {
+        'area': area_data,
+        'games': games_data
+    }
@@ -0,0 +1,262 @@
+"""
+Assessment sessions: the shuffled challenge order, the shuffled words of
+each ARRANGE challenge and a precompiled answer key per challenge, created when a lesson starts and kept in the shared cache
+(Redis in production) for SESSION_TIMEOUT seconds. Each start gets its own
+session id, returned to the client as `sessionId` and sent back with every
+answer, so lessons open in several tabs keep separate sessions.
+
+Validating an answer is then a lookup in the player's session plus an
+in-memory comparison, with no database reads. Answer keys by type:
+    SELECT / ASSIST  id of the correct option
+    SPELL            normalised word
+    ARRANGE          word sequence in order_position order
+    PUNCTUATE        set of (mark, word index) pairs
+    TAG_POS          word option id -> POS tag
+    COMPOSE          emojis + keywords for the AI grader
+A challenge missing from the session (unknown or expired id, or answered
+outside the lesson) gets its key compiled from the database instead.
+
+grade_answers() checks a whole batch of answers: every non-AI answer in
+one pass over the keys, and all COMPOSE answers sent to the AI grader at
+once. record_completions() marks challenges completed with one upsert.
+"""
+import asyncio
+import random
+import re
+import secrets
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from .ai_evaluator import get_evaluator
+from .models import AssessmentChallenge, AssessmentProgress
+
+SESSION_KEY = 'assessment:session:{user_id}:{session_id}'
+SESSION_TIMEOUT = 60 * 60
+
+EMOJI_PATTERN = re.compile("[\U0001F300-\U0001F9FF]+")
+
+
+def sorted_options(challenge):
+    """Options by order_position, from the prefetch (order_by() would re-query)."""
+    return sorted(challenge.options.all(), key=lambda opt: (opt.order_position is None, opt.order_position or 0, opt.id))
+
+
+def shuffled_words(challenge):
+    """ARRANGE options in a random order that isn't already the answer."""
+    words = sorted_options(challenge)
+    answer = [opt.text for opt in words]
+    shuffled = list(words)
+    if len(set(answer)) > 1:
+        while [opt.text for opt in shuffled] == answer:
+            random.shuffle(shuffled)
+    return shuffled
+
+
+def compile_answer_key(challenge):
+    """JSON-serialisable answer key for one challenge (options must be prefetched)."""
+    key = {'type': challenge.type, 'correct_answer': challenge.correct_answer}
+
+    if challenge.type in ['SELECT', 'ASSIST']:
+        correct = [opt.id for opt in challenge.options.all() if opt.correct]
+        key['option'] = correct[0] if correct else None
+
+    elif challenge.type == 'SPELL':
+        key['answer'] = (challenge.correct_answer or '').lower().strip()
+
+    elif challenge.type == 'ARRANGE':
+        key['sequence'] = [opt.text for opt in sorted_options(challenge)]
+
+    elif challenge.type == 'PUNCTUATE':
+        key['pairs'] = sorted([opt.text, opt.order_position] for opt in challenge.options.all())
+
+    elif challenge.type == 'TAG_POS':
+        # Only words (order_position < 100) have correct POS tags
+        key['tags'] = {
+            str(opt.id): opt.pos_tag
+            for opt in challenge.options.all()
+            if opt.order_position is not None and opt.order_position < 100
+        }
+
+    elif challenge.type == 'COMPOSE':
+        # Emojis come from the question (e.g., "Write a sentence using: 🌧️ 📚 ☕")
+        key['emojis'] = EMOJI_PATTERN.findall(challenge.question)
+        key['keywords'] = challenge.correct_answer.split() if challenge.correct_answer else None
+
+    return key
+
+
+def is_correct(key, answer):
+    """Compare an answer with its key. COMPOSE needs the AI grader and isn't handled here."""
+    kind = key['type']
+
+    if kind in ['SELECT', 'ASSIST']:
+        return key['option'] is not None and str(answer) == str(key['option'])
+
+    if kind == 'SPELL':
+        return isinstance(answer, str) and answer.lower().strip() == key['answer']
+
+    if kind == 'ARRANGE':
+        return answer == key['sequence']
+
+    if kind == 'PUNCTUATE':
+        user_pairs = {
+            (item['mark'], item['position'])
+            for item in (answer or [])
+            if isinstance(item, dict) and item.get('mark') and isinstance(item.get('position'), int)
+        }
+        return user_pairs == {tuple(pair) for pair in key['pairs']}
+
+    if kind == 'TAG_POS':
+        # answer format: {word_id: pos_text, ...}
+        if not isinstance(answer, dict):
+            return False
+        tags = key['tags']
+        return len(answer) == len(tags) and all(answer.get(word_id) == tag for word_id, tag in tags.items())
+
+    raise ValueError(f"{kind} answers are graded by the AI evaluator")
+
+
+def compose_fallback(key, answer):
+    """Keyword check used when the AI grader is unavailable."""
+    keywords = (key['correct_answer'] or '').lower().split()
+    return all(kw in str(answer or '').lower() for kw in keywords)
+
+
+# -------------------- Sessions --------------------
+
+def start_session(user, lesson, challenges):
+    """Store a new session for `challenges` (already shuffled, options prefetched)."""
+    session = {
+        'id': secrets.token_urlsafe(12),
+        'lesson_id': lesson.id,
+        'area_id': lesson.area_id,
+        'order': [challenge.id for challenge in challenges],
+        # ARRANGE option ids in the order they're shown
+        'words': {
+            str(challenge.id): [opt.id for opt in shuffled_words(challenge)]
+            for challenge in challenges if challenge.type == 'ARRANGE'
+        },
+        'keys': {str(challenge.id): compile_answer_key(challenge) for challenge in challenges},
+    }
+    try:
+        cache.set(SESSION_KEY.format(user_id=user.pk, session_id=session['id']), session, timeout=SESSION_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Could not store assessment session: {e}")
+    return session
+
+
+def get_session(user, session_id):
+    if not session_id:
+        return None
+    try:
+        return cache.get(SESSION_KEY.format(user_id=user.pk, session_id=session_id))
+    except Exception as e:
+        print(f"⚠️ Assessment session cache unavailable: {e}")
+        return None
+
+
+def end_session(user, session_id):
+    try:
+        cache.delete(SESSION_KEY.format(user_id=user.pk, session_id=session_id))
+    except Exception as e:
+        print(f"⚠️ Could not clear assessment session: {e}")
+
+
+def get_answer_keys(user, challenge_ids, session_id=None):
+    """
+    {challenge id: answer key} for the requested challenges, from the
+    player's session `session_id` where possible. Unknown challenge ids are
+    left out.
+    """
+    wanted = {str(challenge_id) for challenge_id in challenge_ids}
+    session = get_session(user, session_id) or {}
+    keys = {cid: key for cid, key in session.get('keys', {}).items() if cid in wanted}
+
+    missing = [cid for cid in wanted - set(keys) if cid.isdigit()]
+    if missing:
+        for challenge in AssessmentChallenge.objects.filter(id__in=missing).prefetch_related('options'):
+            keys[str(challenge.id)] = compile_answer_key(challenge)
+    return keys
+
+
+def get_answer_key(user, challenge_id, session_id=None):
+    """Answer key for one challenge, or None if it doesn't exist."""
+    return get_answer_keys(user, [challenge_id], session_id).get(str(challenge_id))
+
+
+# -------------------- Grading --------------------
+
+def compose_result(key, answer, ai_result):
+    """Result for a COMPOSE answer; ai_result is the grader's verdict or the exception it raised."""
+    if isinstance(ai_result, Exception):
+        print(f"AI validation error: {ai_result}")
+        # Fallback to keyword check
+        correct = compose_fallback(key, answer)
+        return {'correct': correct, 'correctAnswer': key['correct_answer'] if not correct else None}
+
+    return {
+        # Consider valid if score >= 70%
+        'correct': ai_result.get('valid', False) and ai_result.get('score', 0) >= 70,
+        'correctAnswer': None,
+        'ai_feedback': ai_result.get('explanation'),
+        'score': ai_result.get('score'),
+        'suggestions': ai_result.get('filipino_equivalents', {}),
+    }
+
+
+async def _grade_compose(pending):
+    evaluator = get_evaluator()
+    return await asyncio.gather(
+        *(evaluator.aevaluate('compose', answer, key['emojis'], keywords=key['keywords']) for key, answer in pending),
+        return_exceptions=True,
+    )
+
+
+def grade_answers(user, items, session_id=None):
+    """
+    Grade [{'challengeId', 'answer'}, ...]. Returns one result per item, in
+    order: {'challengeId', 'correct', 'correctAnswer', ...} or
+    {'challengeId', 'error'} for a challenge that doesn't exist.
+    """
+    keys = get_answer_keys(user, [item.get('challengeId') for item in items], session_id)
+    results = []
+    pending = []
+
+    for item in items:
+        challenge_id = item.get('challengeId')
+        key = keys.get(str(challenge_id))
+        if key is None:
+            results.append({'challengeId': challenge_id, 'error': 'Challenge not found'})
+        elif key['type'] == 'COMPOSE':
+            results.append({'challengeId': challenge_id})
+            pending.append((len(results) - 1, key, item.get('answer')))
+        else:
+            correct = is_correct(key, item.get('answer'))
+            results.append({
+                'challengeId': challenge_id,
+                'correct': correct,
+                'correctAnswer': key['correct_answer'] if not correct else None,
+            })
+
+    if pending:
+        verdicts = async_to_sync(_grade_compose)([(key, answer) for _, key, answer in pending])
+        for (index, key, answer), verdict in zip(pending, verdicts):
+            results[index].update(compose_result(key, answer, verdict))
+    return results
+
+
+def record_completions(user, challenge_ids):
+    """Mark challenges completed for `user` (one upsert). Returns the ids that exist."""
+    rows = list(
+        AssessmentChallenge.objects.filter(id__in=[cid for cid in challenge_ids if str(cid).isdigit()])
+        .values_list('id', 'lesson__area_id')
+    )
+    if rows:
+        AssessmentProgress.objects.bulk_create(
+            [AssessmentProgress(user=user, area_id=area_id, challenge_id=cid, completed=True) for cid, area_id in rows],
+            update_conflicts=True,
+            unique_fields=['user', 'challenge'],
+            update_fields=['area', 'completed'],
+        )
+    return [cid for cid, _ in rows]
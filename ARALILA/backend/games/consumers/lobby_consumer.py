@@ -1,14 +1,18 @@
 import json
 from channels.generic.websocket import AsyncWebsocketConsumer
-from redis import asyncio as aioredis
-from django.conf import settings
+from backend.redis_pool import get_async_redis
+from games.lobby_room import LobbyRoom, ROOM_TTL
+from games.room_events import RoomEventsMixin, next_seq
 from urllib.parse import parse_qs, unquote  # NEW: Proper URL parsing
 
-async def get_redis():
-    """Singleton Redis connection."""
-    return aioredis.from_url(settings.REDIS_URL, decode_responses=True)
 
-class LobbyConsumer(AsyncWebsocketConsumer):
+class LobbyConsumer(RoomEventsMixin, AsyncWebsocketConsumer):
+    # v2 clients keep the player list from the snapshot and apply these deltas
+    DELTA_FIELDS = {
+        "player_joined": ("player",),
+        "player_left": ("player",),
+    }
+
     async def connect(self):
         self.room_code = self.scope['url_route']['kwargs']['room_code']
         self.room_group_name = f"lobby_{self.room_code}"
@@ -23,135 +27,121 @@ class LobbyConsumer(AsyncWebsocketConsumer):
         
         print(f"🔌 Player '{self.player_name}' connecting to room '{self.room_code}'")
         
-        # Use Redis
-        self.redis = await get_redis()
-        await self.redis.ping()
-        
-        # NEW: Check if room already has max_players set
-        existing_max = await self.redis.get(f"room:{self.room_code}:max_players")
-        
-        if not existing_max:
-            # First player (host) sets the max_players
-            await self.redis.set(
-                f"room:{self.room_code}:max_players",
-                max_players_param,
-                ex=3600
-            )
-            print(f"✅ Room '{self.room_code}' created with {max_players_param} players")
-            max_players = int(max_players_param)
-        else:
-            # Joiners use the existing max_players from Redis
-            max_players = int(existing_max)
-            print(f"✅ Room '{self.room_code}' already set to {max_players} players (existing)")
-         
-        # Get existing players from Redis
-        players_json = await self.redis.get(f"room:{self.room_code}:players")
-        players = json.loads(players_json) if players_json else []
-
-        # Check if player already exists (prevent duplicates)
-        if self.player_name in players:
-            print(f"⚠️ Player '{self.player_name}' already in room, not adding again")
-        else:
-            players.append(self.player_name)
-            await self.redis.set(
-                f"room:{self.room_code}:players", 
-                json.dumps(players),
-                ex=3600
-            )
-            print(f"✅ Player '{self.player_name}' added. Total: {len(players)}/{max_players}")
+        # Shared pool; connections are health-checked by the pool
+        self.redis = get_async_redis()
+        self.lobby = LobbyRoom(self.redis, self.room_code, ROOM_TTL)
+        self.joined = False
 
-        # Join room group
+        # Join room group first so every member sees the game_start
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
-        await self.accept()
+        await self.accept_room()
+
+        # The first player (host) sets max_players; joiners use the existing value
+        joined = await self.lobby.join(self.player_name, max_players_param)
+        max_players = joined["max_players"]
+        if joined["status"] == "full":
+            print(f"⛔ Room '{self.room_code}' is full ({max_players} players), '{self.player_name}' turned away")
+            await self.send_event({"type": "room_full", "max_players": max_players})
+            await self.close(code=4003)
+            return
+
+        self.joined = True
+        players = joined["players"]
+        if joined["added"]:
+            print(f"✅ Player '{self.player_name}' added. Total: {len(players)}/{max_players}")
+        else:
+            print(f"⚠️ Player '{self.player_name}' already in room, not adding again")
 
         # Send current player list and max_players to ONLY this player
-        await self.send(text_data=json.dumps({
-            "type": "player_list",
-            "players": players,
-            "max_players": max_players,
-        }))
+        if self.delta_protocol:
+            await self.send_snapshot()
+        else:
+            await self.send(text_data=json.dumps({
+                "type": "player_list",
+                "players": players,
+                "max_players": max_players,
+            }))
         print(f"📤 Sent player_list to '{self.player_name}': {players} (max: {max_players})")
 
         # Notify everyone (including this player) that someone joined
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "player_joined",
-                "player": self.player_name,
-                "players": players,
-                "max_players": max_players,
-            }
-        )
+        await self.broadcast({
+            "type": "player_joined",
+            "player": self.player_name,
+            "players": players,
+            "max_players": max_players,
+        })
 
-        # Auto-start game when max_players reached
-        if len(players) == max_players:
+        # Auto-start game when max_players reached (only one join gets `started`)
+        if joined["started"]:
             import random
             turn_order = players.copy()
             random.shuffle(turn_order)
             
             print(f"🚀 Auto-starting game with {max_players} players. Turn order: {turn_order}")
             
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "game_start",
-                    "turn_order": turn_order,
-                }
-            )
+            await self.broadcast({
+                "type": "game_start",
+                "turn_order": turn_order,
+            })
 
     async def disconnect(self, close_code):
         print(f"🔌 Player '{self.player_name}' disconnecting from room '{self.room_code}'")
-        
-        # Get current players from Redis
-        players_json = await self.redis.get(f"room:{self.room_code}:players")
-        players = json.loads(players_json) if players_json else []
-        
-        if self.player_name in players:
-            players.remove(self.player_name)
-            await self.redis.set(
-                f"room:{self.room_code}:players", 
-                json.dumps(players),
-                ex=3600
-            )
-            print(f"✅ Player '{self.player_name}' removed. Remaining: {len(players)}")
-
-        # Get max_players
-        max_players_str = await self.redis.get(f"room:{self.room_code}:max_players")
-        max_players = int(max_players_str) if max_players_str else 3
-
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "player_left",
-                "player": self.player_name,
-                "players": players,
-                "max_players": max_players,
-            }
-        )
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        if not getattr(self, "joined", False):
+            return
+
+        left = await self.lobby.leave(self.player_name)
+        if left is None:
+            return
+        print(f"✅ Player '{self.player_name}' removed. Remaining: {len(left['players'])}")
+
+        await self.broadcast({
+            "type": "player_left",
+            "player": self.player_name,
+            "players": left["players"],
+            "max_players": left["max_players"],
+        })
+
+    async def broadcast(self, event):
+        """Number the event and send it to the whole room."""
+        event["seq"] = await next_seq(self.redis, self.lobby.seq_key, ROOM_TTL)
+        await self.channel_layer.group_send(self.room_group_name, event)
+
+    async def send_snapshot(self):
+        await self.send_event({"type": "snapshot", **await self.lobby.snapshot()})
 
     async def player_joined(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_event({
             "type": "player_joined",
+            "seq": event.get("seq"),
             "player": event["player"],
             "players": event["players"],
             "max_players": event.get("max_players", 3),
-        }))
+        })
 
     async def player_left(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_event({
             "type": "player_left",
+            "seq": event.get("seq"),
             "player": event["player"],
             "players": event["players"],
             "max_players": event.get("max_players", 3),
-        }))
+        })
 
     async def game_start(self, event):
-        await self.send(text_data=json.dumps({
+        await self.send_event({
             "type": "game_start",
+            "seq": event.get("seq"),
             "turn_order": event["turn_order"],
-        }))
+        })
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = self.decode_message(text_data, bytes_data)
+        except ValueError as e:
+            print(f"❌ Invalid lobby message from '{self.player_name}': {e}")
+            return
 
-    async def receive(self, text_data):
-        # No-op for now
-        pass
\ No newline at end of file
+        # Reconnecting (or out-of-sequence) v2 clients ask for the full state
+        if data.get("type") == "snapshot":
+            await self.send_snapshot()
\ No newline at end of file
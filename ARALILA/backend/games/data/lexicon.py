@@ -0,0 +1,131 @@
+# Word lists for the local pre-grader (games/pregrader.py).
+# Lowercase, accent-free. A word listed in both languages counts as Filipino.
+
+filipino_words = {
+    # Markers, particles, conjunctions
+    "ang", "ng", "nang", "mga", "sa", "si", "sina", "ni", "nina", "kay", "kina",
+    "ay", "at", "o", "pero", "ngunit", "subalit", "dahil", "kasi", "kaya", "para",
+    "kung", "kapag", "pag", "habang", "upang", "na", "pa", "din", "rin", "daw", "raw",
+    "ba", "po", "opo", "ho", "oho", "man", "lang", "lamang", "naman", "nga", "pala",
+    "yata", "sana", "tuloy", "muna", "kaagad", "agad", "hindi", "huwag", "wala",
+    "walang", "may", "mayroon", "meron", "oo", "bakit", "paano", "saan",
+    "kailan", "sino", "ano", "alin", "ilan", "magkano", "gaano", "dito", "doon",
+    "diyan", "rito", "roon", "riyan", "ngayon", "bukas", "kahapon", "mamaya",
+    "kanina", "lagi", "palagi", "minsan", "tuwing", "bawat", "lahat", "iba",
+    "ibang", "isa", "isang", "dalawa", "tatlo", "apat", "lima", "anim", "pito",
+    "walo", "siyam", "sampu", "unang", "una", "huli", "mas", "pinaka", "sobra",
+    "masyado", "talaga", "tunay", "siguro", "baka", "sapagkat", "bago", "pagkatapos",
+    "hanggang", "mula", "tungkol", "laban", "gaya", "tulad", "parang",
+    # Pronouns
+    "ako", "ko", "akin", "aking", "ikaw", "ka", "mo", "iyo", "iyong", "siya", "niya",
+    "kaniya", "kanya", "kaniyang", "kanyang", "kami", "namin", "amin", "aming",
+    "tayo", "natin", "atin", "ating", "kayo", "ninyo", "inyo", "inyong", "sila",
+    "nila", "kanila", "kanilang", "ito", "nito", "dito", "iyan", "niyan", "iyon",
+    "niyon", "noon", "yan", "yun", "yon", "ganito", "ganyan", "ganoon",
+    # Common nouns
+    "bata", "anak", "nanay", "ina", "tatay", "ama", "kuya", "ate", "lolo",
+    "lola", "kapatid", "pamilya", "kaibigan", "guro", "titser", "mag-aaral",
+    "estudyante", "tao", "babae", "lalaki", "sanggol", "bahay", "paaralan", "eskwela",
+    "silid", "kusina", "hardin", "bakuran", "parke", "palaruan", "simbahan",
+    "palengke", "tindahan", "kalsada", "daan", "bayan", "lungsod", "probinsya",
+    "bundok", "dagat", "ilog", "lawa", "dalampasigan", "gubat", "puno", "halaman",
+    "bulaklak", "dahon", "damo", "lupa", "bato", "langit", "ulap", "araw", "buwan",
+    "bituin", "ulan", "hangin", "bagyo", "kidlat", "kulog", "tubig", "apoy",
+    "pagkain", "kanin", "tinapay", "isda", "karne", "manok", "itlog", "gulay",
+    "prutas", "saging", "mangga", "gatas", "kape", "tsaa", "juice", "almusal",
+    "tanghalian", "hapunan", "meryenda", "aso", "pusa", "ibon", "baboy", "baka",
+    "kabayo", "kalabaw", "paru-paro", "paruparo", "kulisap", "langgam", "libro",
+    "aklat", "kuwaderno", "lapis", "bolpen", "papel", "bag", "damit", "sapatos",
+    "payong", "bola", "laruan", "saranggola", "tali", "kotse", "sasakyan", "dyip",
+    "bus", "barko", "eroplano", "bisikleta", "telepono", "kompyuter", "pera",
+    "regalo", "gantimpala", "tropeo", "pangkat", "koponan", "laro", "paligsahan",
+    "trabaho", "gawain", "takdang-aralin", "aralin", "tanong", "sagot", "salita",
+    "pangungusap", "kuwento", "awit", "kanta", "musika", "sayaw", "larawan",
+    "umaga", "tanghali", "hapon", "gabi", "oras", "linggo", "taon", "kaarawan",
+    "pasko", "bakasyon", "puso", "ulo", "kamay", "paa", "mata", "bibig", "ilong",
+    "tenga", "katawan", "lakas", "saya", "tuwa", "lungkot", "galit", "takot",
+    "pag-ibig", "pagmamahal", "kalusugan", "kaligtasan", "kapayapaan",
+    # Common verbs / roots
+    "kain", "kumain", "kumakain", "kakain", "inom", "uminom", "umiinom", "iinom",
+    "takbo", "tumakbo", "tumatakbo", "tatakbo", "lakad", "naglakad", "naglalakad",
+    "maglalakad", "laro", "naglaro", "naglalaro", "maglalaro", "maglaro", "basa",
+    "bumasa", "nagbasa", "nagbabasa", "magbasa", "sulat", "sumulat", "sumusulat",
+    "nagsulat", "magsulat", "aral", "nag-aral", "nag-aaral", "mag-aaral", "tulog",
+    "natulog", "natutulog", "matulog", "gising", "gumising", "nagising", "luto",
+    "nagluto", "nagluluto", "magluto", "linis", "naglinis", "naglilinis", "maglinis",
+    "punta", "pumunta", "pupunta", "pumupunta", "uwi", "umuwi", "uuwi", "umuuwi",
+    "alis", "umalis", "aalis", "dating", "dumating", "darating", "bili", "bumili",
+    "bumibili", "bibili", "dala", "nagdala", "dinala", "bigay", "nagbigay",
+    "ibinigay", "tulong", "tumulong", "tumutulong", "tutulong", "kanta", "kumanta",
+    "kumakanta", "sayaw", "sumayaw", "sumasayaw", "lipad", "lumipad", "lumilipad",
+    "lilipad", "langoy", "lumangoy", "lumalangoy", "upo", "umupo", "nakaupo",
+    "tayo", "tumayo", "nakatayo", "ulan", "umulan", "umuulan", "uulan", "init",
+    "mainit", "lamig", "malamig", "panalo", "nanalo", "nananalo", "mananalo",
+    "talo", "natalo", "tawa", "tumawa", "tumatawa", "iyak", "umiyak", "umiiyak",
+    "nakita", "makita", "tingin", "tumingin", "narinig", "marinig", "sabi",
+    "sinabi", "sabihin", "gusto", "ayaw", "kailangan", "dapat", "puwede", "pwede",
+    "kaya", "alam", "mahal", "minahal", "mahalin", "salamat",
+    # Common adjectives
+    "maganda", "magandang", "pangit", "mabait", "masama", "malaki", "maliit",
+    "mataas", "mababa", "mahaba", "maikli", "mabilis", "mabagal", "masaya",
+    "masayang", "malungkot", "galit", "matapang", "matalino", "masipag", "tamad",
+    "malinis", "marumi", "bago", "luma", "masarap", "matamis", "maasim", "maalat",
+    "mapait", "mabango", "mabaho", "maliwanag", "madilim", "malakas", "mahina",
+    "mabigat", "magaan", "marami", "kaunti", "kakaunti", "puno", "tahimik",
+    "maingay", "abala", "pagod", "gutom", "busog", "uhaw", "handa", "ligtas",
+    "totoo", "tama", "mali", "pula", "asul", "dilaw", "berde", "puti", "itim",
+}
+
+english_words = {
+    "the", "a", "an", "is", "are", "was", "were", "be", "been", "being", "am",
+    "i", "you", "he", "she", "it", "we", "they", "me", "him", "her", "us", "them",
+    "my", "your", "his", "its", "our", "their", "mine", "yours", "this", "that",
+    "these", "those", "there", "here", "what", "who", "whom", "which", "when",
+    "where", "why", "how", "and", "or", "but", "because", "so", "if", "then",
+    "than", "of", "in", "on", "for", "with", "to", "from", "by", "about", "into",
+    "over", "under", "after", "before", "while", "very", "not", "no", "yes",
+    "do", "does", "did", "done", "have", "has", "had", "will", "would", "can",
+    "could", "should", "must", "shall", "go", "goes", "went", "going", "gone",
+    "come", "comes", "came", "coming", "eat", "eats", "ate", "eating", "drink",
+    "drinks", "drank", "drinking", "run", "runs", "ran", "running", "walk",
+    "walks", "walked", "walking", "play", "plays", "played", "playing", "read",
+    "reads", "reading", "write", "writes", "wrote", "writing", "sleep", "sleeps",
+    "slept", "sleeping", "study", "studies", "studied", "studying", "cook",
+    "cooks", "cooked", "cooking", "clean", "cleans", "cleaned", "cleaning",
+    "buy", "buys", "bought", "buying", "give", "gives", "gave", "giving", "help",
+    "helps", "helped", "helping", "sing", "sings", "sang", "singing", "dance",
+    "dances", "danced", "dancing", "fly", "flies", "flew", "flying", "swim",
+    "swims", "swam", "swimming", "sit", "sits", "sat", "sitting", "stand",
+    "stands", "stood", "standing", "rain", "rains", "rained", "raining", "win",
+    "wins", "won", "winning", "lose", "lost", "laugh", "laughs", "laughed",
+    "laughing", "cry", "cries", "cried", "crying", "see", "sees", "saw", "seen",
+    "look", "looks", "looked", "looking", "hear", "heard", "say", "says", "said",
+    "like", "likes", "liked", "love", "loves", "loved", "want", "wants", "wanted",
+    "need", "needs", "needed", "know", "knows", "knew", "make", "makes", "made",
+    "take", "takes", "took", "get", "gets", "got", "happy", "sad", "angry",
+    "big", "small", "little", "tall", "short", "long", "fast", "slow", "good",
+    "bad", "nice", "beautiful", "pretty", "ugly", "new", "old", "hot", "cold",
+    "clean", "dirty", "strong", "weak", "high", "low", "many", "much", "some",
+    "all", "every", "each", "other", "another", "together", "today", "tomorrow",
+    "yesterday", "now", "always", "never", "sometimes", "morning", "afternoon",
+    "evening", "night", "day", "week", "year", "time", "boy", "girl", "boys",
+    "girls", "child", "children", "kid", "kids", "mother", "father", "mom", "dad",
+    "brother", "sister", "family", "friend", "friends", "teacher", "student",
+    "students", "people", "man", "woman", "house", "home", "school", "room",
+    "garden", "park", "church", "market", "store", "street", "road", "city",
+    "mountain", "sea", "river", "lake", "beach", "forest", "tree", "trees",
+    "plant", "flower", "flowers", "leaf", "grass", "sky", "cloud", "clouds",
+    "sun", "moon", "star", "stars", "wind", "storm", "water", "fire", "food",
+    "rice", "bread", "fish", "meat", "chicken", "egg", "eggs", "fruit", "milk",
+    "coffee", "tea", "breakfast", "lunch", "dinner", "dog", "cat", "bird", "pig",
+    "cow", "horse", "butterfly", "ant", "book", "books", "notebook", "pencil",
+    "pen", "paper", "shoes", "clothes", "umbrella", "ball", "toy", "toys", "kite",
+    "string", "car", "boat", "ship", "airplane", "plane", "bike", "bicycle",
+    "phone", "computer", "money", "gift", "prize", "reward", "trophy", "team",
+    "game", "games", "contest", "work", "homework", "lesson", "question",
+    "answer", "word", "words", "sentence", "story", "song", "music", "picture",
+    "birthday", "christmas", "vacation", "heart", "head", "hand", "hands", "foot",
+    "feet", "eyes", "mouth", "body", "strength", "joy", "fear", "celebrate",
+    "celebration", "celebrating", "together", "everyone", "someone", "something",
+    "nothing", "really", "also", "too", "just", "only", "again",
+}
@@ -0,0 +1,82 @@
+# Building blocks for the seeded pre-grader benchmark corpus
+# (games/management/commands/benchmark_pregrader.py).
+#
+# Each prompt is (emojis, keywords). Answers are generated per label:
+#   model     - plausible Filipino answers that use a keyword (must reach the model),
+#               including conjugated verbs for mag-/um- keywords (conjugated_answers)
+#   empty     - blank / emoji-only answers
+#   english   - mostly English answers
+#   unrelated - Filipino answers that use none of the keywords
+
+prompts = [
+    (["🌧️", "☕"], ["ulan", "kape"]),
+    (["👦👧", "🏃", "⚽", "😊"], ["bata", "takbo", "bola", "masaya", "laro"]),
+    (["🪁", "☁️", "🌤️"], ["saranggola", "langit", "lipad", "tali", "mataas"]),
+    (["🏆", "👥", "💪", "🎉"], ["panalo", "pangkat", "lakas", "gantimpala", "saya"]),
+    (["📚", "✏️"], ["libro", "aklat", "sulat", "lapis", "aral"]),
+    (["🍚", "🐟"], ["kanin", "isda", "kain", "ulam"]),
+    (["🐶", "🏠"], ["aso", "bahay", "bantay"]),
+    (["🌳", "🐦"], ["puno", "ibon", "lipad", "awit"]),
+]
+
+model_templates = [
+    "Ang {kw} ay nasa bahay namin ngayon.",
+    "Masaya ang mga bata dahil sa {kw}.",
+    "Kahapon ay nakita ko ang {kw} sa parke.",
+    "Gusto ko ang {kw} tuwing umaga.",
+    "Naglalaro kami habang may {kw} sa labas.",
+    "Si nanay ay may dalang {kw} para sa amin.",
+    "Ang {kw} at ang {kw2} ay magkasama.",
+    "Dahil sa {kw}, masaya kaming lahat.",
+    "May {kw} kaya hindi kami umalis.",
+    "Ang aking kaibigan ay may {kw} na bago.",
+    # Mixed but mostly Filipino: still needs the model
+    "Ang {kw} ay very nice sa paningin ko.",
+    "Pumunta kami sa mall para bumili ng {kw}.",
+]
+
+# (keywords, answer): the keyword is a verb and the answer conjugates it
+conjugated_answers = [
+    (["maglaro"], "Naglalaro ang mga bata sa parke."),
+    (["magluto"], "Nagluluto si nanay ng adobo."),
+    (["magluto"], "Lulutuin ko ang isda mamaya."),
+    (["maglinis"], "Naglinis kami ng bahay kahapon."),
+    (["maglinis"], "Naglilinis ng silid ang mga mag-aaral."),
+    (["magsulat"], "Magsusulat ako ng liham bukas."),
+    (["magsulat"], "Nagsulat si ate ng tula."),
+    (["magbasa"], "Binasa ko ang aklat kagabi."),
+    (["mag-aral"], "Nag-aaral ang kuya ko sa silid."),
+    (["kumain"], "Kumakain kami ng kanin at isda."),
+    (["uminom"], "Umiinom siya ng gatas tuwing umaga."),
+    (["maligo"], "Naliligo ang bata sa ilog."),
+    (["matulog"], "Natutulog na ang sanggol."),
+]
+
+empty_answers = [
+    "",
+    "   ",
+    "☕☕☕",
+    "🌧️ 🌧️",
+    "...",
+    "123",
+]
+
+english_templates = [
+    "The children are playing in the park.",
+    "I like to drink coffee when it is raining.",
+    "We won the game because our team is strong.",
+    "My dog is sleeping in the house.",
+    "The bird is flying over the tree.",
+    "She is reading a book with her friends.",
+    "They eat rice and fish for dinner.",
+    "It is a beautiful day to fly a kite.",
+]
+
+unrelated_templates = [
+    "Ang guro ay nagtuturo sa silid.",
+    "Masarap ang tinapay na binili ni tatay.",
+    "Natutulog ang pusa sa ilalim ng mesa.",
+    "Pupunta kami sa simbahan sa Linggo.",
+    "Malinis ang kalsada sa aming bayan.",
+    "Mabait ang aking lola.",
+]
@@ -0,0 +1,128 @@
+"""
+Redis state for a multiplayer lobby.
+
+    room:<code>:max_players  string  set once by the first (host) connect
+    room:<code>:members      zset    players in the lobby, scored by join order
+    room:<code>:joins        string  join counter (the members' scores)
+    room:<code>:started      string  set once when the lobby fills up
+    room:<code>:roster       set     players the game started with
+    room:<code>:seq          string  last event number (see games/room_events.py)
+
+Joining and leaving are single Lua scripts, so simultaneous connects can't
+drop a player, overfill the lobby or start the game twice: the player that
+fills the last seat is the only one that gets `started`, together with the
+member list to shuffle into the turn order. After the start only players on
+the roster can (re)join, and once the last member leaves the lobby can start
+again.
+"""
+ROOM_TTL = 3600
+
+# KEYS: max_players, members, joins, started, roster. The last ARGV is always the TTL.
+PRELUDE = """
+local max_players, members, joins, started, roster = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+
+local function touch()
+    local ttl = tonumber(ARGV[#ARGV])
+    for _, key in ipairs(KEYS) do
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+"""
+
+# ARGV: player, max players asked for by the host, ttl
+JOIN = PRELUDE + """
+redis.call('SET', max_players, ARGV[2], 'NX')
+local limit = tonumber(redis.call('GET', max_players))
+
+local added = 0
+if not redis.call('ZSCORE', members, ARGV[1]) then
+    -- Once the game has started only its players can come back
+    if redis.call('EXISTS', started) == 1 then
+        if redis.call('SISMEMBER', roster, ARGV[1]) == 0 then
+            return {'full', limit}
+        end
+    elseif redis.call('ZCARD', members) >= limit then
+        return {'full', limit}
+    end
+    redis.call('ZADD', members, redis.call('INCR', joins), ARGV[1])
+    added = 1
+end
+
+-- Only the join that fills the last seat starts the game
+local start = 0
+if redis.call('ZCARD', members) == limit and redis.call('SET', started, 1, 'NX') then
+    redis.call('SADD', roster, unpack(redis.call('ZRANGE', members, 0, -1)))
+    start = 1
+end
+touch()
+return {'ok', limit, added, start, redis.call('ZRANGE', members, 0, -1)}
+"""
+
+# ARGV: player, ttl
+LEAVE = PRELUDE + """
+if redis.call('ZREM', members, ARGV[1]) == 0 then
+    return false
+end
+-- An empty lobby can fill up and start again
+if redis.call('ZCARD', members) == 0 then
+    redis.call('DEL', started, roster)
+end
+touch()
+return {tonumber(redis.call('GET', max_players) or '3'), redis.call('ZRANGE', members, 0, -1)}
+"""
+
+
+class LobbyRoom:
+    """Lobby membership for one room code, stored in a Redis sorted set."""
+
+    def __init__(self, redis, room_code, ttl=ROOM_TTL):
+        self.redis = redis
+        self.ttl = ttl
+        prefix = f"room:{room_code}"
+        self.keys = [
+            f"{prefix}:max_players", f"{prefix}:members", f"{prefix}:joins",
+            f"{prefix}:started", f"{prefix}:roster",
+        ]
+        self.seq_key = f"{prefix}:seq"
+        self._join = redis.register_script(JOIN)
+        self._leave = redis.register_script(LEAVE)
+
+    async def join(self, player, max_players):
+        """
+        Add `player` (rejoining is a no-op). Returns {'status': 'full',
+        'max_players'} when the lobby has no seat left for them, otherwise
+        {'status': 'ok', 'max_players', 'added', 'started', 'players'} with
+        players in join order; `started` is True for exactly one join per
+        game.
+        """
+        reply = await self._join(keys=self.keys, args=[player, int(max_players), self.ttl])
+        if reply[0] == 'full':
+            return {'status': 'full', 'max_players': int(reply[1])}
+        _, limit, added, started, players = reply
+        return {
+            'status': 'ok',
+            'max_players': int(limit),
+            'added': bool(added),
+            'started': bool(started),
+            'players': players,
+        }
+
+    async def leave(self, player):
+        """Remove `player`. Returns {'max_players', 'players'}, or None if they weren't in the lobby."""
+        reply = await self._leave(keys=self.keys, args=[player, self.ttl])
+        if not reply:
+            return None
+        limit, players = reply
+        return {'max_players': int(limit), 'players': players}
+
+    async def snapshot(self):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.get(self.seq_key)
+            pipe.zrange(self.keys[1], 0, -1)
+            pipe.get(self.keys[0])
+            seq, players, max_players = await pipe.execute()
+        return {
+            'seq': int(seq or 0),
+            'players': players,
+            'max_players': int(max_players) if max_players else 3,
+        }
@@ -0,0 +1,84 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from games.data import pregrader_corpus as corpus
+from games.pregrader import pregrade
+
+# Labels the pre-grader may decide on its own; 'model' answers must reach the model
+EXPECTED_REASON = {
+    'empty': 'empty',
+    'english': 'english',
+    'unrelated': 'unrelated',
+    'model': None,
+}
+
+
+def build_corpus(size, seed):
+    """Seeded, labelled (kind, answer, emojis, keywords, label) tuples."""
+    rng = random.Random(seed)
+    labels = ['model'] * 6 + ['empty', 'english', 'unrelated', 'unrelated']
+    rows = []
+    for _ in range(size):
+        emojis, keywords = rng.choice(corpus.prompts)
+        kind = rng.choice(['emoji', 'compose'])
+        label = rng.choice(labels)
+        if label == 'model' and rng.random() < 0.25:
+            keywords, answer = rng.choice(corpus.conjugated_answers)
+        elif label == 'model':
+            kw, kw2 = rng.choice(keywords), rng.choice(keywords)
+            answer = rng.choice(corpus.model_templates).format(kw=kw, kw2=kw2)
+        elif label == 'empty':
+            answer = rng.choice(corpus.empty_answers)
+        elif label == 'english':
+            answer = rng.choice(corpus.english_templates)
+        else:
+            answer = rng.choice(corpus.unrelated_templates)
+        # The emoji game sends keywords; COMPOSE passes the challenge keywords
+        rows.append((kind, answer, keywords, keywords, label))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the local pre-grader on a seeded, labelled answer corpus'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rows = build_corpus(options['size'], options['seed'])
+
+        decided = 0
+        wrong = 0
+        false_fails = 0
+        by_reason = {}
+
+        start = time.perf_counter()
+        verdicts = [pregrade(kind, answer, emojis, keywords) for kind, answer, emojis, keywords, _ in rows]
+        elapsed = time.perf_counter() - start
+
+        for (kind, answer, emojis, keywords, label), verdict in zip(rows, verdicts):
+            if verdict is None:
+                continue
+            decided += 1
+            reason = verdict['pregraded']
+            by_reason[reason] = by_reason.get(reason, 0) + 1
+            if label == 'model':
+                # Failing an answer the model should have seen is the costly mistake
+                false_fails += 1
+                wrong += 1
+            elif reason != EXPECTED_REASON[label]:
+                wrong += 1
+
+        total = len(rows)
+        self.stdout.write(f'📊 Pre-grader benchmark ({total} answers, seed {options["seed"]})')
+        self.stdout.write(f'   Model calls avoided: {decided}/{total} ({decided / total:.1%})')
+        for reason, count in sorted(by_reason.items()):
+            self.stdout.write(f'     {reason}: {count}')
+        self.stdout.write(f'   Wrong verdicts: {wrong} (false fails on valid answers: {false_fails})')
+        self.stdout.write(f'   Throughput: {elapsed / total * 1e6:.1f} µs/answer')
+
+        style = self.style.SUCCESS if false_fails == 0 else self.style.ERROR
+        self.stdout.write(style('✅ No valid answers were failed locally' if false_fails == 0 else '❌ Pre-grader failed valid answers'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_results(apps, schema_editor):
+    """One passed result per (user, area) that already has passed challenges."""
+    AssessmentProgress = apps.get_model('games', 'AssessmentProgress')
+    AssessmentResult = apps.get_model('games', 'AssessmentResult')
+    rows = (
+        AssessmentProgress.objects.filter(passed=True)
+        .values('user_id', 'area_id')
+        .annotate(score=Max('score'))
+        .order_by()
+    )
+    AssessmentResult.objects.bulk_create(
+        [AssessmentResult(user_id=row['user_id'], area_id=row['area_id'], passed=True, score=row['score']) for row in rows],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_assessmentchallenge_correct_answer_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssessmentResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('passed', models.BooleanField(default=False)),
+                ('score', models.IntegerField(default=0)),
+                ('completed_at', models.DateTimeField(auto_now=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='games.area')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'area')},
+            },
+        ),
+        migrations.RunPython(backfill_results, migrations.RunPython.noop),
+    ]
@@ -313,4 +313,18 @@ class AssessmentProgress(models.Model):
     score = models.IntegerField(default=0) 
     
     class Meta:
-        unique_together = ('user', 'challenge')
\ No newline at end of file
+        unique_together = ('user', 'challenge')
+
+class AssessmentResult(models.Model):
+    """Per-area assessment outcome, so unlock checks read one row per area"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    area = models.ForeignKey(Area, on_delete=models.CASCADE)
+    passed = models.BooleanField(default=False)
+    score = models.IntegerField(default=0)
+    completed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'area')
+
+    def __str__(self):
+        return f"{self.user} - {self.area.name} ({self.score}%)"
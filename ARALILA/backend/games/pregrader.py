@@ -0,0 +1,224 @@
+"""
+Local rule-based pre-grader for emoji and COMPOSE answers.
+
+Decides the clear-cut cases without calling the model and returns None for
+everything else:
+    - empty answers (no letters at all)                 -> fail, 0
+    - mostly English (3+ English words, >= 60% of words) -> fail, rubric's
+                                                            "3+ English words" score
+    - none of the expected keywords used                -> fail, 0
+      (nor their verb roots: "naglalaro" uses "maglaro")
+
+It never passes an answer on its own; grammar and meaning still need the
+model. Keywords come from the request (emoji game sends EmojiSymbol
+keywords), the challenge (COMPOSE correct_answer), or are looked up from
+EmojiSymbol by symbol.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+
+from .data.lexicon import filipino_words, english_words
+from .models import EmojiSymbol
+from .question_packs import get_content_version
+
+# Verdicts mirror the rubric bands in games/ai_evaluator.py
+FAIL_SCORES = {
+    'emoji': {'empty': 0, 'english': 10, 'unrelated': 0},
+    'compose': {'empty': 0, 'english': 50, 'unrelated': 0},
+}
+
+MIN_ENGLISH_WORDS = 3
+ENGLISH_RATIO = 0.6
+
+WORD_RE = re.compile(r"[a-z\u00f1]+(?:-[a-z\u00f1]+)*")
+LETTER_RE = re.compile(r"[^\W\d_]", re.UNICODE)
+VARIATION_SELECTORS = dict.fromkeys([0xFE0E, 0xFE0F, 0x200D])
+
+
+def fold(text):
+    """Lowercase and strip accents (ñ kept)."""
+    folded = []
+    for ch in unicodedata.normalize('NFC', str(text or '').casefold()):
+        if ch == '\u00f1':
+            folded.append(ch)
+        else:
+            folded.extend(part for part in unicodedata.normalize('NFD', ch) if not unicodedata.combining(part))
+    return ''.join(folded)
+
+
+def words_in(text):
+    return WORD_RE.findall(fold(text))
+
+
+def english_words_in(words):
+    return [word for word in words if word in english_words and word not in filipino_words]
+
+
+def strip_symbol(symbol):
+    return str(symbol).translate(VARIATION_SELECTORS).strip()
+
+
+# -------------------- Keyword lookup --------------------
+
+@lru_cache(maxsize=2)
+def _load_symbol_keywords(version):
+    keywords = {}
+    for symbol, keyword in EmojiSymbol.objects.values_list('symbol', 'keyword'):
+        if keyword:
+            keywords.setdefault(strip_symbol(symbol), set()).add(fold(keyword))
+    return keywords
+
+
+def symbol_keywords():
+    """{emoji symbol: {keywords}} from EmojiSymbol, cached per content version."""
+    version = get_content_version()
+    if version is None:
+        return _load_symbol_keywords.__wrapped__(None)
+    return _load_symbol_keywords(version)
+
+
+def keyword_groups(emojis):
+    """
+    One set of acceptable keywords per expected emoji/keyword.
+    Returns None if any emoji has no known keyword (coverage can't be judged).
+    """
+    groups = []
+    lookup = None
+    for item in emojis or []:
+        if LETTER_RE.search(str(item)):
+            groups.append({fold(item)})
+            continue
+        if lookup is None:
+            lookup = symbol_keywords()
+        stripped = strip_symbol(item)
+        # "👦👧" style tokens may hold several symbols
+        symbols = [stripped] if stripped in lookup else [strip_symbol(ch) for ch in stripped]
+        for symbol in symbols:
+            if not symbol:
+                continue
+            if symbol not in lookup:
+                return None
+            groups.append(lookup[symbol])
+    return groups
+
+
+# -------------------- Verb roots --------------------
+
+VERB_PREFIXES = (
+    'mag', 'nag', 'pag', 'ma', 'na', 'pa', 'i', 'ipag', 'ipinag', 'pinag',
+    'maka', 'naka', 'makapag', 'nakapag', 'makipag', 'nakipag', 'magpa', 'nagpa',
+)
+VERB_SUFFIXES = ('hin', 'han', 'in', 'an')
+VOWELS = set('aeiou')
+MIN_ROOT = 3
+
+
+def _strip_once(word):
+    """Words one affix (or reduplicated syllable) shorter than `word`."""
+    for prefix in VERB_PREFIXES:
+        if word.startswith(prefix):
+            yield word[len(prefix):].lstrip('-')
+    if word[:2] in ('um', 'in') and word[2:3] in VOWELS:
+        # um-/in- before a vowel: umalis -> alis
+        yield word[2:]
+    if len(word) > 3 and word[0] not in VOWELS and word[1:3] in ('um', 'in'):
+        # -um-/-in- after the first consonant: kumain -> kain, binasa -> basa
+        yield word[0] + word[3:]
+    if len(word) > 3 and word[0] not in VOWELS and word[1] in VOWELS and word[2:4] == word[:2]:
+        # Reduplicated first syllable: lalaro -> laro
+        yield word[2:]
+    if word[:1] in VOWELS and word[1:2] == word[:1]:
+        # Reduplicated vowel: uulan -> ulan
+        yield word[1:]
+    for suffix in VERB_SUFFIXES:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            yield stem
+            if stem.endswith('u'):
+                # lutuin -> luto
+                yield stem[:-1] + 'o'
+
+
+@lru_cache(maxsize=4096)
+def roots(word):
+    """
+    Every form of `word` with affixes or reduplication removed, including
+    the word itself: "naglalaro" -> {..., "lalaro", "laro"}. Over-stripping
+    is harmless; a spurious match only sends the answer to the model.
+    """
+    found = {word}
+    pending = [word]
+    while pending:
+        for stem in _strip_once(pending.pop()):
+            if len(stem) >= MIN_ROOT and stem not in found:
+                found.add(stem)
+                pending.append(stem)
+    return frozenset(found)
+
+
+def covered(text, text_roots, keywords):
+    # Substring match so affixed forms count: "ulan" in "umuulan";
+    # conjugated verbs share a root: "naglalaro" / "maglaro" -> "laro"
+    return any(
+        keyword and (keyword in text or not roots(keyword).isdisjoint(text_roots))
+        for keyword in keywords
+    )
+
+
+# -------------------- Verdicts --------------------
+
+def _verdict(kind, reason, explanation, english_found=(), missing=()):
+    score = FAIL_SCORES[kind][reason]
+    result = {
+        "valid": False,
+        "explanation": explanation,
+        "english_words_found": list(english_found),
+        "filipino_equivalents": {},
+        "pregraded": reason,
+    }
+    if kind == 'emoji':
+        result["points"] = score
+    else:
+        result["score"] = score
+        result["missing_emojis"] = list(missing)
+    return result
+
+
+def pregrade(kind, answer, emojis=(), keywords=None):
+    """
+    Confident verdict dict for clear-cut answers, or None to ask the model.
+
+    keywords: explicit acceptable words (e.g. COMPOSE correct_answer split);
+    otherwise they are derived from `emojis`.
+    """
+    text = str(answer or '')
+    if not LETTER_RE.search(text):
+        return _verdict(kind, 'empty', "Walang sagot. Sumulat ng pangungusap sa Filipino.")
+
+    words = words_in(text)
+    english_found = english_words_in(words)
+    if len(english_found) >= MIN_ENGLISH_WORDS and len(english_found) >= ENGLISH_RATIO * len(words):
+        return _verdict(
+            kind, 'english',
+            "Karamihan ng salita ay nasa Ingles. Isulat ang pangungusap sa Filipino.",
+            english_found=english_found,
+        )
+
+    if keywords:
+        groups = [{fold(keyword)} for keyword in keywords if fold(keyword).strip()]
+    else:
+        groups = keyword_groups(emojis)
+
+    if groups:
+        folded = fold(text)
+        text_roots = set().union(*map(roots, words))
+        if not any(covered(folded, text_roots, group) for group in groups):
+            return _verdict(
+                kind, 'unrelated',
+                "Hindi nagamit ang alinman sa mga salitang hinihingi. Gamitin ang mga emoji sa iyong pangungusap.",
+                english_found=english_found,
+                missing=emojis or [],
+            )
+
+    return None
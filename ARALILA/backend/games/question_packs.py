@@ -0,0 +1,124 @@
+"""
+Question packs: the question list for one (area, game_type, difficulty)
+compiled once and served from cache.
+
+Game content only changes when a seed command (or the admin) writes to the
+GameItem / *Item tables, so a pack is keyed by a global content version.
+Signals in games/signals.py bump that version on every content write, which
+orphans every previously compiled pack at once.
+
+Lookup order:
+    1. in-process LRU   (keyed by version, so stale entries just age out)
+    2. shared cache     (Redis in production, see settings.CACHES)
+    3. compile from the database and store in both tiers
+"""
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Area, Game, GameItem
+from .question_plans import QUESTION_PLANS, apply_plan, serialize_items
+
+CONTENT_VERSION_KEY = 'question_packs:version'
+PACK_KEY = 'question_packs:v{version}:{area_id}:{game_type}:{difficulty}'
+
+
+def _fresh_version():
+    # Seeded from the clock so a flushed cache never reuses a version that
+    # in-process LRUs may still hold entries for
+    return time.time_ns() // 1000
+
+
+def get_content_version():
+    """Current content version (one shared cache read)."""
+    try:
+        version = cache.get(CONTENT_VERSION_KEY)
+        if version is None:
+            fresh = _fresh_version()
+            cache.add(CONTENT_VERSION_KEY, fresh, timeout=None)
+            version = cache.get(CONTENT_VERSION_KEY, fresh)
+        return version
+    except Exception as e:
+        print(f"⚠️ Question pack cache unavailable: {e}")
+        return None
+
+
+def bump_content_version():
+    """Invalidate every compiled question pack."""
+    try:
+        try:
+            cache.incr(CONTENT_VERSION_KEY)
+        except ValueError:
+            # Key missing (first write or cache flushed)
+            cache.set(CONTENT_VERSION_KEY, _fresh_version(), timeout=None)
+    except Exception as e:
+        print(f"⚠️ Could not bump question pack version: {e}")
+    # Local tier is keyed by version already, but clearing keeps memory tidy
+    _load_pack.cache_clear()
+
+
+def compile_question_pack(area_id, game_type, difficulty):
+    """
+    Build the serialized pack straight from the database.
+    Raises Area.DoesNotExist / Game.DoesNotExist like the view used to.
+    """
+    area = Area.objects.get(id=area_id, is_active=True)
+    game = Game.objects.get(game_type=game_type)
+
+    items = GameItem.objects.filter(
+        area=area,
+        game=game,
+        difficulty=difficulty
+    ).order_by('id')
+
+    if game_type in QUESTION_PLANS:
+        items = list(apply_plan(items, game_type))
+        has_items = bool(items)
+        questions = serialize_items(items, game_type)
+    else:
+        has_items = items.exists()
+        questions = []
+
+    return {
+        'area': {'id': area.id, 'name': area.name},
+        'game': {'id': game.id, 'name': game.name, 'type': game_type},
+        'has_items': has_items,
+        'questions': questions,
+    }
+
+
+@lru_cache(maxsize=getattr(settings, 'QUESTION_PACK_LRU_SIZE', 256))
+def _load_pack(area_id, game_type, difficulty, version):
+    key = PACK_KEY.format(
+        version=version,
+        area_id=area_id,
+        game_type=game_type,
+        difficulty=difficulty,
+    )
+    try:
+        pack = cache.get(key)
+    except Exception as e:
+        print(f"⚠️ Question pack cache read failed: {e}")
+        pack = None
+
+    if pack is None:
+        pack = compile_question_pack(area_id, game_type, difficulty)
+        try:
+            cache.set(key, pack, timeout=None)
+        except Exception as e:
+            print(f"⚠️ Question pack cache write failed: {e}")
+    return pack
+
+
+def get_question_pack(area_id, game_type, difficulty):
+    """
+    Return the compiled pack for (area, game_type, difficulty).
+    The returned dict is shared between requests - treat it as read-only.
+    """
+    version = get_content_version()
+    if version is None:
+        # No usable cache at all: behave like the old endpoint
+        return compile_question_pack(area_id, game_type, difficulty)
+    return _load_pack(int(area_id), game_type, int(difficulty), version)
@@ -0,0 +1,247 @@
+"""
+Query plans for the question endpoints.
+
+QUESTION_PLANS maps every Game.GAME_TYPE_CHOICES value to:
+    data_attr         - reverse one-to-one on GameItem holding the game data
+    select_related    - joined in the main GameItem query
+    prefetch          - child rows loaded in one extra query each
+    serialize         - item -> question dict (difficulty endpoint / packs)
+    serialize_legacy  - item -> list of question dicts (per-game endpoints)
+
+With the plan applied, an endpoint runs a fixed number of queries no matter
+how many items the area has.
+"""
+from django.db.models import Prefetch
+
+from .models import (
+    GameItem, PunctuationAnswer, PartsOfSpeechWord, FourPicsOneWordImage, EmojiSymbol,
+)
+
+
+# -------------------- Difficulty endpoint serializers --------------------
+
+def serialize_spelling(item, spelling):
+    return {
+        'id': item.id,
+        'word': spelling.word,
+        'sentence': spelling.sentence,
+    }
+
+
+def serialize_grammar(item, grammar):
+    return {
+        'id': item.id,
+        'sentence': grammar.sentence,
+    }
+
+
+def serialize_emoji(item, emoji):
+    symbols = emoji.emojis.all()
+    return {
+        'id': item.id,
+        'emojis': [emoji_symbol.symbol for emoji_symbol in symbols],
+        'keywords': [emoji_symbol.keyword for emoji_symbol in symbols],
+        'translation': emoji.translation,
+    }
+
+
+def serialize_punctuation(item, punctuation):
+    return {
+        'id': item.id,
+        'sentence': punctuation.sentence,
+        'hint': punctuation.hint,
+        'answers': [
+            {'position': answer.position, 'mark': answer.mark}
+            for answer in punctuation.answers.all()
+        ],
+    }
+
+
+def serialize_parts_of_speech(item, pos):
+    return {
+        'id': item.id,
+        'sentence': pos.sentence,
+        'words': [
+            {
+                'id': word_obj.id,
+                'word': word_obj.word,
+                'correct_answer': word_obj.correct_answer
+            }
+            for word_obj in pos.words.all()
+        ],
+        'hint': pos.hint,
+        'explanation': pos.explanation
+    }
+
+
+def serialize_word_association(item, fourpics):
+    return {
+        'id': item.id,
+        'answer': fourpics.answer,
+        'images': [img.image_path for img in fourpics.images.all()],
+        'hint': fourpics.hint
+    }
+
+
+# -------------------- Legacy per-game endpoint serializers --------------------
+
+def serialize_spelling_legacy(item, spelling):
+    return [{
+        'id': item.id,
+        'word': spelling.word,
+        'sentence': spelling.sentence,
+        'difficulty': item.get_difficulty_display(),
+    }]
+
+
+def serialize_grammar_legacy(item, grammar):
+    return [{
+        'id': item.id,
+        'sentence': grammar.sentence,
+        'difficulty': item.get_difficulty_display(),
+    }]
+
+
+def serialize_emoji_legacy(item, emoji):
+    return [{
+        'id': item.id,
+        'emojis': [
+            {
+                'symbol': emoji_symbol.symbol,
+                'keyword': emoji_symbol.keyword
+            }
+            for emoji_symbol in emoji.emojis.all()
+        ],
+        'translation': emoji.translation,
+        'difficulty': item.get_difficulty_display(),
+    }]
+
+
+def serialize_punctuation_legacy(item, punctuation):
+    return [{
+        'id': item.id,
+        'sentence': punctuation.sentence,
+        'answers': [
+            {
+                'position': answer.position,
+                'mark': answer.mark
+            }
+            for answer in punctuation.answers.all()
+        ],
+        'hint': punctuation.hint,
+        'difficulty': item.get_difficulty_display(),
+    }]
+
+
+def serialize_parts_of_speech_legacy(item, pos):
+    # One question per tagged word
+    return [
+        {
+            'id': f"{item.id}-{word.word}",
+            'sentence': pos.sentence,
+            'word': word.word,
+            'correctAnswer': word.correct_answer,
+            'hint': pos.hint,
+            'explanation': pos.explanation,
+            'difficulty': item.get_difficulty_display(),
+        }
+        for word in pos.words.all()
+    ]
+
+
+def serialize_word_association_legacy(item, fourpics):
+    return [{
+        'id': item.id,
+        'answer': fourpics.answer,
+        'images': [img.image_path for img in fourpics.images.all()],
+        'hint': fourpics.hint,
+        'difficulty': item.get_difficulty_display(),
+    }]
+
+
+QUESTION_PLANS = {
+    'spelling-challenge': {
+        'data_attr': 'spelling_data',
+        'select_related': ['spelling_data'],
+        'prefetch': [],
+        'serialize': serialize_spelling,
+        'serialize_legacy': serialize_spelling_legacy,
+    },
+    'punctuation-task': {
+        'data_attr': 'punctuation_data',
+        'select_related': ['punctuation_data'],
+        'prefetch': [
+            Prefetch('punctuation_data__answers', queryset=PunctuationAnswer.objects.order_by('id')),
+        ],
+        'serialize': serialize_punctuation,
+        'serialize_legacy': serialize_punctuation_legacy,
+    },
+    'parts-of-speech': {
+        'data_attr': 'pos_data',
+        'select_related': ['pos_data'],
+        'prefetch': [
+            Prefetch('pos_data__words', queryset=PartsOfSpeechWord.objects.order_by('id')),
+        ],
+        'serialize': serialize_parts_of_speech,
+        'serialize_legacy': serialize_parts_of_speech_legacy,
+    },
+    'word-association': {
+        'data_attr': 'fourpics_data',
+        'select_related': ['fourpics_data'],
+        'prefetch': [
+            Prefetch('fourpics_data__images', queryset=FourPicsOneWordImage.objects.order_by('id')),
+        ],
+        'serialize': serialize_word_association,
+        'serialize_legacy': serialize_word_association_legacy,
+    },
+    'emoji-challenge': {
+        'data_attr': 'emoji_data',
+        'select_related': ['emoji_data'],
+        'prefetch': [
+            Prefetch('emoji_data__emojis', queryset=EmojiSymbol.objects.order_by('id')),
+        ],
+        'serialize': serialize_emoji,
+        'serialize_legacy': serialize_emoji_legacy,
+    },
+    'grammar-check': {
+        'data_attr': 'grammar_data',
+        'select_related': ['grammar_data'],
+        'prefetch': [],
+        'serialize': serialize_grammar,
+        'serialize_legacy': serialize_grammar_legacy,
+    },
+}
+
+
+def apply_plan(queryset, game_type):
+    """Attach the select_related/prefetch plan for game_type to a GameItem queryset."""
+    plan = QUESTION_PLANS[game_type]
+    return queryset.select_related(*plan['select_related']).prefetch_related(*plan['prefetch'])
+
+
+def serialize_items(items, game_type, legacy=False):
+    """
+    Serialize planned GameItems. Items missing their game data are skipped
+    (and logged) instead of failing the whole request.
+    """
+    plan = QUESTION_PLANS[game_type]
+    questions = []
+    for item in items:
+        data = getattr(item, plan['data_attr'], None)
+        if data is None:
+            print(f"Error loading {game_type} item {item.id}: missing {plan['data_attr']}")
+            continue
+        if legacy:
+            questions.extend(plan['serialize_legacy'](item, data))
+        else:
+            questions.append(plan['serialize'](item, data))
+    return questions
+
+
+def get_legacy_questions(area, game_type):
+    """Questions for the per-game endpoints (all difficulties of one area)."""
+    items = apply_plan(
+        GameItem.objects.filter(area=area, game__game_type=game_type),
+        game_type,
+    )
+    return serialize_items(items, game_type, legacy=True)
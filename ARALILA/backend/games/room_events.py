@@ -0,0 +1,88 @@
+"""
+Versioned room-event protocol shared by LobbyConsumer and StoryChainConsumer.
+
+The client picks the protocol with the WebSocket subprotocol it offers:
+    aralila.v2.msgpack  - delta events as MessagePack binary frames
+    aralila.v2.json     - delta events as compact JSON text frames
+    (none)              - v1, the original full-state JSON events
+
+Every event broadcast to a room carries the next number of the room's
+sequence (`seq`, kept in Redis so every worker agrees on it). v2 events only
+carry what changed (e.g. `player_joined` without the whole player list,
+`new_image` without the description); the full state comes in a `snapshot`
+{"type": "snapshot", "seq", ...}, sent on connect and whenever the client
+asks with {"type": "snapshot"} - e.g. after a reconnect or a gap in `seq`.
+Events numbered at or below a snapshot's `seq` are already part of it.
+"""
+import json
+
+import msgpack
+
+MSGPACK = 'aralila.v2.msgpack'
+JSON = 'aralila.v2.json'
+SUBPROTOCOLS = (MSGPACK, JSON)
+
+
+def choose_subprotocol(scope):
+    """First v2 subprotocol the client offered, or None for v1."""
+    offered = scope.get('subprotocols') or []
+    for subprotocol in offered:
+        if subprotocol in SUBPROTOCOLS:
+            return subprotocol
+    return None
+
+
+async def next_seq(redis, key, ttl):
+    """Number the next event of a room."""
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.incr(key)
+        pipe.expire(key, ttl)
+        seq, _ = await pipe.execute()
+    return int(seq)
+
+
+class RoomEventsMixin:
+    """
+    Protocol handling for an AsyncWebsocketConsumer.
+
+    DELTA_FIELDS maps an event type to the fields a v2 client gets; event
+    types not listed are sent whole. Group events always carry the full v1
+    payload, so v1 and v2 sockets can share a room.
+    """
+    DELTA_FIELDS = {}
+
+    async def accept_room(self):
+        self.subprotocol = choose_subprotocol(self.scope)
+        await self.accept(self.subprotocol)
+
+    @property
+    def delta_protocol(self):
+        return getattr(self, 'subprotocol', None) is not None
+
+    async def send_event(self, event):
+        if not self.delta_protocol:
+            # v1 clients never saw sequence numbers
+            event = {key: value for key, value in event.items() if key != 'seq'}
+            await self.send(text_data=json.dumps(event))
+            return
+
+        fields = self.DELTA_FIELDS.get(event["type"])
+        if fields is not None:
+            event = {key: event[key] for key in ('type', 'seq', *fields) if key in event}
+        if self.subprotocol == MSGPACK:
+            await self.send(bytes_data=msgpack.packb(event))
+        else:
+            await self.send(text_data=json.dumps(event, separators=(',', ':'), ensure_ascii=False))
+
+    def decode_message(self, text_data=None, bytes_data=None):
+        """Client message as a dict; raises ValueError if it can't be read."""
+        if bytes_data is not None:
+            try:
+                data = msgpack.unpackb(bytes_data)
+            except Exception as e:
+                raise ValueError(f"Invalid MessagePack frame: {e}")
+        else:
+            data = json.loads(text_data)
+        if not isinstance(data, dict):
+            raise ValueError("Message must be an object")
+        return data
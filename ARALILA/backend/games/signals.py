@@ -0,0 +1,31 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import (
+    Area, Game, GameItem,
+    SpellingItem, PunctuationItem, PunctuationAnswer,
+    PartsOfSpeechItem, PartsOfSpeechWord,
+    FourPicsOneWordItem, FourPicsOneWordImage,
+    GrammarItem, EmojiSentenceItem, EmojiSymbol,
+)
+from .area_view import _load_area_catalog
+from .question_packs import bump_content_version
+
+# Every model whose rows end up inside a compiled question pack or area catalog
+QUESTION_CONTENT_MODELS = [
+    Area, Game, GameItem,
+    SpellingItem, PunctuationItem, PunctuationAnswer,
+    PartsOfSpeechItem, PartsOfSpeechWord,
+    FourPicsOneWordItem, FourPicsOneWordImage,
+    GrammarItem, EmojiSentenceItem, EmojiSymbol,
+]
+
+
+def invalidate_question_packs(sender, **kwargs):
+    """Bump the content version whenever question content changes."""
+    bump_content_version()
+    _load_area_catalog.cache_clear()
+
+
+for model in QUESTION_CONTENT_MODELS:
+    post_save.connect(invalidate_question_packs, sender=model, dispatch_uid=f"question_packs_save_{model.__name__}")
+    post_delete.connect(invalidate_question_packs, sender=model, dispatch_uid=f"question_packs_delete_{model.__name__}")
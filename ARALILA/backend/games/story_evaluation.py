@@ -0,0 +1,180 @@
+"""
+Background scoring for finished Story Chain rounds.
+
+The game moves on to the next image as soon as a round closes; the round is
+queued here and a small pool of worker tasks scores it through the AI
+evaluator ('story' rubric). A model call slower than
+STORY_EVALUATION['TIMEOUT'] (or failing) falls back to the deterministic
+local scorer, so every round gets a score. The result is handed to the
+job's callback (StoryChainGame.record_evaluation), which awards it and
+broadcasts `sentence_evaluation`. save_round() stores the round in
+GameRound / SentenceEvaluation.
+
+With STORY_EVALUATION['MODE'] = 'batched' rounds get a provisional local
+score during play instead, and the whole game goes to the model as one
+StoryGameJob ('story_batch' rubric) once the last round is in; the game
+reconciles the provisional scores with the returned ones
+(StoryChainGame.record_game_evaluation). If that call fails the provisional
+scores stand.
+"""
+import asyncio
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from .ai_evaluator import get_evaluator, local_story_score
+from .models import GameRoom, GameRound, SentenceEvaluation
+
+
+class StoryEvaluationJob(NamedTuple):
+    room_name: str
+    image_index: int
+    total_images: int
+    image_url: str
+    image_description: str
+    sentence: str
+    # One entry per part written (missed turns excluded)
+    contributors: list
+
+
+class StoryGameJob(NamedTuple):
+    room_name: str
+    total_images: int
+    # StoryEvaluationJob per round, in image order
+    rounds: list
+    # image index -> provisional group score already awarded
+    provisional: dict
+
+
+def provisional_verdict(sentence):
+    return {**fallback_verdict(sentence), "source": "provisional"}
+
+
+def fallback_verdict(sentence):
+    return {
+        "score": local_story_score(sentence),
+        "grammar": 0,
+        "coherence": 0,
+        "feedback": "",
+        "source": "fallback",
+    }
+
+
+class StoryEvaluationQueue:
+    def __init__(self, workers=None, timeout=None):
+        options = getattr(settings, 'STORY_EVALUATION', {})
+        self.workers = workers or options.get('WORKERS', 4)
+        self.timeout = timeout or options.get('TIMEOUT', 10)
+        self._queue = None
+        self._loop = None
+        self._tasks = []
+
+    def submit(self, job, on_scored):
+        """Queue `job`; `await on_scored(job, verdict)` runs once it is scored."""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._queue = asyncio.Queue()
+            self._loop = loop
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+        self._queue.put_nowait((job, on_scored))
+
+    async def join(self):
+        """Wait until every queued job has been scored and handled."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def score(self, job):
+        if not job.sentence.strip():
+            return fallback_verdict(job.sentence)
+        try:
+            verdict = await asyncio.wait_for(
+                get_evaluator().aevaluate('story', job.sentence, [job.image_description]),
+                self.timeout,
+            )
+            return {**verdict, "source": "model"}
+        except Exception as e:
+            print(f"⚠️ Story evaluation fell back to the local scorer: {e!r}")
+            return fallback_verdict(job.sentence)
+
+    async def score_game(self, job):
+        """
+        Score every round of a game in one model call. Returns
+        {image index: verdict}; rounds missing from it (or all of them, if
+        the call fails) keep their provisional score.
+        """
+        rounds = [
+            {"round": entry.image_index, "image_description": entry.image_description, "sentence": entry.sentence}
+            for entry in job.rounds if entry.sentence.strip()
+        ]
+        if not rounds:
+            return {}
+        try:
+            result = await asyncio.wait_for(
+                get_evaluator().aevaluate('story_batch', json.dumps(rounds, ensure_ascii=False), []),
+                self.timeout,
+            )
+        except Exception as e:
+            print(f"⚠️ Batched story evaluation failed, keeping provisional scores: {e!r}")
+            return {}
+        return {entry["round"]: {**entry, "source": "model"} for entry in result["scores"]}
+
+    async def _work(self):
+        while True:
+            job, on_scored = await self._queue.get()
+            try:
+                score = self.score_game if isinstance(job, StoryGameJob) else self.score
+                await on_scored(job, await score(job))
+            except Exception as e:
+                print(f"❌ Story evaluation for {job.room_name} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+
+_queue = None
+
+
+def get_story_queue():
+    """Process-wide queue built from settings.STORY_EVALUATION."""
+    global _queue
+    if _queue is None:
+        _queue = StoryEvaluationQueue()
+    return _queue
+
+
+def save_round(job, verdict, game_complete=False):
+    """Store a scored round in GameRound / SentenceEvaluation."""
+    room, _ = GameRoom.objects.get_or_create(
+        room_name=job.room_name,
+        defaults={'total_images': job.total_images},
+    )
+    game_round, _ = GameRound.objects.update_or_create(
+        room=room,
+        round_index=job.image_index,
+        defaults={
+            'image_url': job.image_url,
+            'completed_at': timezone.now(),
+            'group_score': verdict['score'],
+            'evaluated_sentence': job.sentence,
+        },
+    )
+    SentenceEvaluation.objects.update_or_create(
+        round=game_round,
+        defaults={
+            'grammar_score': verdict.get('grammar') or 0,
+            'coherence_score': verdict.get('coherence') or 0,
+            'overall_score': verdict['score'],
+            'feedback': verdict.get('feedback') or '',
+        },
+    )
+    if game_complete:
+        GameRoom.objects.filter(pk=room.pk).update(status='completed', current_image_index=job.total_images)
+    return game_round
+
+
+def save_game(job, verdicts):
+    """Store every round of a batch-scored game, provisional scores where the model gave none."""
+    for position, entry in enumerate(job.rounds):
+        verdict = verdicts.get(entry.image_index) or {"score": job.provisional[entry.image_index]}
+        save_round(entry, verdict, game_complete=position == len(job.rounds) - 1)
@@ -0,0 +1,238 @@
+"""
+Story Chain game flow shared by StoryChainConsumer and the room's turn
+scheduler (games/story_scheduler.py).
+
+Everything here talks to the room through the channel layer group, so it
+works from whichever consumer or worker happens to run it.
+"""
+import math
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from backend.redis_pool import get_async_redis
+from games.data.story_images import story_images
+from games.story_evaluation import (
+    StoryEvaluationJob, StoryGameJob, get_story_queue, provisional_verdict, save_game, save_round,
+)
+from games.story_room import StoryRoom, MISSED_TURN
+
+TURN_TIME_LIMIT = 20
+# Seconds a disconnected player's turn is held for them to resume
+RESUME_GRACE = 10
+
+
+class StoryChainGame:
+    def __init__(self, room_name, channel_layer=None, redis=None, batched=None):
+        self.room_name = room_name
+        if batched is None:
+            batched = getattr(settings, 'STORY_EVALUATION', {}).get('MODE') == 'batched'
+        self.batched = batched
+        self.room_group_name = f"story_{room_name}"
+        self.channel_layer = channel_layer or get_channel_layer()
+        self.room = StoryRoom(redis or get_async_redis(), room_name)
+
+    async def broadcast(self, event):
+        event = {**event, "seq": await self.room.record_event(event)}
+        await self.channel_layer.group_send(self.room_group_name, event)
+
+    # -------------------- Turn Management --------------------
+
+    async def start_turn(self, player, turn):
+        """Announce a player's turn and set its deadline for the scheduler."""
+        if not player:
+            print("⚠️ Cannot start turn: no players")
+            return
+
+        print(f"🎯 Starting turn for: {player}")
+
+        await self.broadcast_turn_update(player, TURN_TIME_LIMIT)
+        if not await self.room.schedule(player, turn, time.time() + TURN_TIME_LIMIT):
+            print(f"⏭️ Turn {turn} already advanced, no deadline set for {player}")
+
+    async def broadcast_turn_update(self, player, time_limit):
+        """Broadcast whose turn it is."""
+        await self.broadcast({"type": "turn_update", "next_player": player, "time_limit": time_limit})
+
+    async def on_timeout(self, player, result):
+        """Follow-up after the scheduler expired `player`'s turn."""
+        print(f"⏰ {player} timed out!")
+
+        await self.broadcast({
+            "type": "timeout_event",
+            "player": player,
+            "penalty": 2,
+        })
+
+        # Check if sentence is complete
+        if result["round_complete"]:
+            await self.complete_round()
+        else:
+            await self.start_turn(result["next_player"], result["turn"])
+
+    # -------------------- Reconnects --------------------
+
+    async def hold_turn(self, player, channel):
+        """`player`'s socket dropped: hold their turn for at least RESUME_GRACE seconds."""
+        remaining = await self.room.hold(player, channel, time.time(), RESUME_GRACE)
+        if remaining is None:
+            return
+        grace = math.ceil(max(remaining, RESUME_GRACE))
+        print(f"⏸️ Holding {player}'s turn ({remaining:.1f}s left) for {grace}s")
+        await self.broadcast({"type": "turn_held", "player": player, "grace": grace})
+
+    async def resume_turn(self, player):
+        """`player` is back: their held turn continues where it stopped."""
+        resumed = await self.room.resume(player, time.time())
+        if resumed is None:
+            return
+        print(f"▶️ {player} resumed with {resumed['remaining']:.1f}s left")
+        await self.broadcast_turn_update(player, math.ceil(resumed["remaining"]))
+
+    # -------------------- Rounds --------------------
+
+    async def complete_round(self):
+        """
+        Close the finished round, queue it for scoring and move straight on
+        to the next image; the score arrives later as `sentence_evaluation`.
+        In batched mode the round gets its provisional score right away.
+        """
+        finished = await self.room.finish_round()
+        if finished is None:
+            print("⚠️ Round was already closed")
+            return
+
+        parts = [part for part in finished["parts"] if part["text"] != MISSED_TURN]
+        full_sentence = " ".join(part["text"] for part in parts)
+        print(f"📝 Queued for evaluation: {full_sentence}")
+
+        image_index = finished["image_index"]
+        image = story_images[image_index] if image_index < len(story_images) else story_images[0]
+        job = StoryEvaluationJob(
+            room_name=self.room_name,
+            image_index=image_index,
+            total_images=finished["total_images"],
+            image_url=image["url"],
+            image_description=image["description"],
+            sentence=full_sentence,
+            contributors=[part["player"] for part in parts],
+        )
+        if self.batched:
+            await self.record_evaluation(job, provisional_verdict(full_sentence))
+        else:
+            get_story_queue().submit(job, self.record_evaluation)
+
+        if finished["last_round"]:
+            # game_complete follows the last round's score
+            return
+
+        # Send next image
+        next_image = story_images[finished["current_image_index"]]
+        await self.broadcast({
+            "type": "new_image",
+            "image_index": finished["current_image_index"],
+            "total_images": len(story_images),
+            "image_url": next_image["url"],
+            "image_description": next_image["description"],
+        })
+        await self.start_turn(finished["next_player"], finished["turn"])
+
+    async def record_evaluation(self, job, verdict):
+        """Award a scored round, announce it and store it."""
+        awarded = await self.room.award(
+            job.image_index, verdict["score"], job.contributors,
+            record={"sentence": job.sentence, "image_url": job.image_url, "image_description": job.image_description},
+        )
+        if awarded is None:
+            print(f"⚠️ Round {job.image_index} in {self.room_name} was already scored")
+            return
+
+        provisional = verdict.get("source") == "provisional"
+        await self.broadcast({
+            "type": "sentence_evaluation",
+            "image_index": job.image_index,
+            "sentence": job.sentence,
+            "score": verdict["score"],
+            "feedback": verdict.get("feedback", ""),
+            "provisional": provisional,
+        })
+
+        if provisional:
+            # Stored once the whole game has been scored
+            if awarded["game_complete"]:
+                await self.queue_game_evaluation(job.total_images)
+            return
+
+        if awarded["game_complete"]:
+            print(f"🏁 Game complete!")
+            await self.broadcast({
+                "type": "game_complete",
+                "scores": awarded["scores"],
+            })
+
+        await sync_to_async(save_round)(job, verdict, awarded["game_complete"])
+
+    # -------------------- Batched evaluation --------------------
+
+    async def queue_game_evaluation(self, total_images):
+        """Send every provisionally scored round to the model in one request."""
+        rounds = await self.room.rounds()
+        get_story_queue().submit(
+            StoryGameJob(
+                room_name=self.room_name,
+                total_images=total_images,
+                rounds=[
+                    StoryEvaluationJob(
+                        room_name=self.room_name,
+                        image_index=index,
+                        total_images=total_images,
+                        image_url=record.get("image_url", ""),
+                        image_description=record.get("image_description", ""),
+                        sentence=record.get("sentence", ""),
+                        contributors=record["contributors"],
+                    )
+                    for index, record in sorted(rounds.items())
+                ],
+                provisional={index: record["score"] for index, record in rounds.items()},
+            ),
+            self.record_game_evaluation,
+        )
+        print(f"📝 Queued {len(rounds)} rounds of {self.room_name} for evaluation")
+
+    async def record_game_evaluation(self, job, verdicts):
+        """Swap the provisional round scores for the model's, then end the game."""
+        deltas = defaultdict(int)
+        for entry in job.rounds:
+            verdict = verdicts.get(entry.image_index)
+            if verdict is None or not entry.contributors:
+                continue
+            # Same split as award: every part gets floor(score / parts)
+            parts = len(entry.contributors)
+            change = verdict["score"] // parts - job.provisional[entry.image_index] // parts
+            for player in entry.contributors:
+                deltas[player] += change
+
+        scores = await self.room.reconcile(deltas)
+        if scores is None:
+            print(f"⚠️ {self.room_name} was already reconciled")
+            return
+
+        print(f"🏁 Game complete!")
+        await self.broadcast({
+            "type": "game_complete",
+            "scores": scores,
+            "rounds": [
+                {
+                    "image_index": entry.image_index,
+                    "sentence": entry.sentence,
+                    "score": verdicts.get(entry.image_index, {}).get("score", job.provisional[entry.image_index]),
+                    "feedback": verdicts.get(entry.image_index, {}).get("feedback", ""),
+                }
+                for entry in job.rounds
+            ],
+        })
+
+        await sync_to_async(save_game)(job, verdicts)
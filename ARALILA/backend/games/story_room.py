@@ -0,0 +1,525 @@
+"""
+Redis room state for Story Chain.
+
+    story:<room>:meta      hash  current_turn_index, current_image_index,
+                                 total_images, game_started, turn,
+                                 deadline, deadline_player, seq,
+                                 held_player, held_remaining
+    story:<room>:players   list  join order (= turn order)
+    story:<room>:scores    hash  player -> points
+    story:<room>:sentence  list  JSON parts {"player", "text"} for the current image
+    story:<room>:evaluated hash  image index -> JSON round record (sentence,
+                                 contributors, score), once it is scored
+    story:<room>:events    stream recent broadcast events, entry id <seq>-1
+    story:<room>:sessions  hash  token:<player> -> resume token,
+                                 channel:<player> -> their current socket
+                                 (removed when that socket drops)
+
+Every transition (join, submit, timeout, finish round, award) is a single Lua
+script, so each event is one atomic round trip and concurrent submits,
+timers and evaluations can't overwrite each other. `turn` increases on every
+transition; timers carry the turn they were started for and go stale as soon
+as it moves on. Each turn has at most one deadline (set by `schedule`,
+cleared by every transition), fired by the room's scheduler
+(games/story_scheduler.py). Finished rounds are scored later by the
+evaluation queue (games/story_evaluation.py); `award` applies each score
+exactly once, and in batched mode `reconcile` swaps the provisional scores
+for the end-of-game ones, also exactly once.
+
+Every broadcast is numbered and logged by `record_event`, so a player whose
+socket drops can resume with their session token and get the events they
+missed (`events_since`). A name only gets a new token while no socket holds
+its session, so nobody can take over a connected player by sending their
+name. While they are away their turn is held: `hold`
+parks the remaining time and extends the deadline to at least a grace
+window, `resume` restores it. Any transition (e.g. their submit) also ends
+the hold.
+"""
+import hmac
+import json
+import secrets
+
+ROOM_TTL = 3600
+MISSED_TURN = "[missed turn]"
+SUBMIT_POINTS = 2
+TIMEOUT_PENALTY = 2
+# Broadcast events kept for resuming players
+EVENT_LOG_LENGTH = 500
+
+# KEYS: meta, players, scores, sentence, evaluated, events, sessions. The last ARGV is always the TTL.
+PRELUDE = """
+local meta, players, scores, sentence, evaluated, events, sessions =
+    KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5], KEYS[6], KEYS[7]
+
+local function touch()
+    local ttl = tonumber(ARGV[#ARGV])
+    for _, key in ipairs(KEYS) do
+        redis.call('EXPIRE', key, ttl)
+    end
+end
+
+-- Index of the player whose turn it is (clamped like the old JSON state)
+local function turn_index(count)
+    local index = tonumber(redis.call('HGET', meta, 'current_turn_index') or '0')
+    if index >= count then
+        index = 0
+    end
+    return index
+end
+
+local function advance(index, count, parts)
+    local next_index = (index + 1) % count
+    redis.call('HSET', meta, 'current_turn_index', next_index)
+    redis.call('HDEL', meta, 'deadline', 'deadline_player', 'held_player', 'held_remaining')
+    local turn = redis.call('HINCRBY', meta, 'turn', 1)
+    touch()
+    local complete = 0
+    if parts >= count then
+        complete = 1
+    end
+    return {'ok', redis.call('LINDEX', players, next_index), turn, complete}
+end
+"""
+
+# ARGV: player, total_images, ttl
+JOIN = PRELUDE + """
+local player = ARGV[1]
+redis.call('HSETNX', meta, 'current_turn_index', 0)
+redis.call('HSETNX', meta, 'current_image_index', 0)
+redis.call('HSETNX', meta, 'total_images', ARGV[2])
+redis.call('HSETNX', meta, 'game_started', 0)
+redis.call('HSETNX', meta, 'turn', 0)
+
+local added = 0
+if redis.call('HEXISTS', scores, player) == 0 then
+    redis.call('RPUSH', players, player)
+    redis.call('HSET', scores, player, 0)
+    added = 1
+end
+
+-- Start with the first player (solo play) or once three have joined
+local count = redis.call('LLEN', players)
+local started = 0
+if redis.call('HGET', meta, 'game_started') == '0' and (count == 1 or count == 3) then
+    redis.call('HSET', meta, 'game_started', 1)
+    started = 1
+end
+touch()
+
+local state = redis.call('HMGET', meta, 'current_image_index', 'game_started', 'turn')
+return {
+    added, started, tonumber(state[1]), tonumber(state[2]), tonumber(state[3]),
+    redis.call('LINDEX', players, turn_index(count)),
+    redis.call('LRANGE', players, 0, -1),
+}
+"""
+
+# ARGV: player, part, points, ttl
+SUBMIT = PRELUDE + """
+local count = redis.call('LLEN', players)
+if count == 0 then
+    return {'no_players'}
+end
+local index = turn_index(count)
+local current = redis.call('LINDEX', players, index)
+if current ~= ARGV[1] then
+    return {'not_your_turn', current}
+end
+if redis.call('LLEN', sentence) >= count then
+    return {'round_complete', current}
+end
+
+local parts = redis.call('RPUSH', sentence, ARGV[2])
+redis.call('HINCRBY', scores, ARGV[1], ARGV[3])
+return advance(index, count, parts)
+"""
+
+# ARGV: player, turn the timer was started for, part, penalty, ttl
+TIMEOUT = PRELUDE + """
+if (redis.call('HGET', meta, 'turn') or '0') ~= ARGV[2] then
+    return {'stale'}
+end
+local count = redis.call('LLEN', players)
+if count == 0 then
+    return {'stale'}
+end
+local index = turn_index(count)
+if redis.call('LINDEX', players, index) ~= ARGV[1] or redis.call('LLEN', sentence) >= count then
+    return {'stale'}
+end
+
+local parts = redis.call('RPUSH', sentence, ARGV[3])
+redis.call('HINCRBY', scores, ARGV[1], -tonumber(ARGV[4]))
+return advance(index, count, parts)
+"""
+
+# ARGV: ttl
+FINISH_ROUND = PRELUDE + """
+local count = redis.call('LLEN', players)
+local parts = redis.call('LRANGE', sentence, 0, -1)
+if count == 0 or #parts < count then
+    return false
+end
+
+local image = tonumber(redis.call('HGET', meta, 'current_image_index') or '0')
+redis.call('DEL', sentence)
+redis.call('HSET', meta, 'current_image_index', image + 1, 'current_turn_index', 0)
+redis.call('HDEL', meta, 'deadline', 'deadline_player', 'held_player', 'held_remaining')
+local turn = redis.call('HINCRBY', meta, 'turn', 1)
+touch()
+return {
+    image, tonumber(redis.call('HGET', meta, 'total_images')), turn,
+    redis.call('LINDEX', players, 0), parts,
+}
+"""
+
+# ARGV: image index, group score, round record, contributing player (one per part)..., ttl
+AWARD = PRELUDE + """
+if redis.call('HSETNX', evaluated, ARGV[1], ARGV[3]) == 0 then
+    return false
+end
+
+-- Split the group score between the parts that weren't missed turns
+local contributors = #ARGV - 4
+if contributors > 0 then
+    local points = math.floor(tonumber(ARGV[2]) / contributors)
+    for i = 4, #ARGV - 1 do
+        redis.call('HINCRBY', scores, ARGV[i], points)
+    end
+end
+touch()
+return {
+    redis.call('HLEN', evaluated), tonumber(redis.call('HGET', meta, 'total_images') or '0'),
+    redis.call('HGETALL', scores),
+}
+"""
+
+# ARGV: (player, points delta)..., ttl
+RECONCILE = PRELUDE + """
+if redis.call('HSETNX', meta, 'reconciled', 1) == 0 then
+    return false
+end
+for i = 1, #ARGV - 1, 2 do
+    redis.call('HINCRBY', scores, ARGV[i], ARGV[i + 1])
+end
+touch()
+return redis.call('HGETALL', scores)
+"""
+
+# ARGV: event JSON, log length, ttl
+RECORD_EVENT = PRELUDE + """
+local seq = redis.call('HINCRBY', meta, 'seq', 1)
+redis.call('XADD', events, 'MAXLEN', '~', ARGV[2], seq .. '-1', 'event', ARGV[1])
+touch()
+return seq
+"""
+
+# ARGV: player, socket channel, now (unix seconds), grace seconds, ttl
+HOLD = PRELUDE + """
+-- Only the player's current socket holds the turn (not one they already replaced)
+if redis.call('HGET', sessions, 'channel:' .. ARGV[1]) ~= ARGV[2] then
+    return false
+end
+if redis.call('HGET', meta, 'deadline_player') ~= ARGV[1] or redis.call('HEXISTS', meta, 'held_player') == 1 then
+    return false
+end
+local now = tonumber(ARGV[3])
+local remaining = math.max(tonumber(redis.call('HGET', meta, 'deadline')) - now, 0)
+-- A held turn never expires sooner than it would have without the drop
+local hold_for = math.max(remaining, tonumber(ARGV[4]))
+redis.call('HSET', meta, 'held_player', ARGV[1], 'held_remaining', tostring(remaining), 'deadline', tostring(now + hold_for))
+touch()
+return tostring(remaining)
+"""
+
+# ARGV: player, socket channel, new token, ttl
+OPEN_SESSION = PRELUDE + """
+local token_field, channel_field = 'token:' .. ARGV[1], 'channel:' .. ARGV[1]
+local channel = redis.call('HGET', sessions, channel_field)
+if channel == ARGV[2] then
+    return redis.call('HGET', sessions, token_field)
+end
+-- Another connected socket already plays under this name
+if channel and redis.call('HEXISTS', sessions, token_field) == 1 then
+    return false
+end
+redis.call('HSET', sessions, token_field, ARGV[3], channel_field, ARGV[2])
+touch()
+return ARGV[3]
+"""
+
+# ARGV: player, socket channel, ttl
+CLOSE_SESSION = PRELUDE + """
+if redis.call('HGET', sessions, 'channel:' .. ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('HDEL', sessions, 'channel:' .. ARGV[1])
+touch()
+return 1
+"""
+
+# ARGV: player, now (unix seconds), ttl
+RESUME = PRELUDE + """
+if redis.call('HGET', meta, 'held_player') ~= ARGV[1] then
+    return false
+end
+local remaining = tonumber(redis.call('HGET', meta, 'held_remaining'))
+redis.call('HDEL', meta, 'held_player', 'held_remaining')
+redis.call('HSET', meta, 'deadline', tostring(tonumber(ARGV[2]) + remaining))
+touch()
+return {redis.call('HGET', meta, 'turn'), tostring(remaining)}
+"""
+
+# ARGV: turn, player, deadline (unix seconds), ttl
+SCHEDULE = PRELUDE + """
+if (redis.call('HGET', meta, 'turn') or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', meta, 'deadline', ARGV[3], 'deadline_player', ARGV[2])
+touch()
+return 1
+"""
+
+
+def _scores(flat):
+    return {flat[i]: int(flat[i + 1]) for i in range(0, len(flat), 2)}
+
+
+def _turn_result(reply):
+    status = reply[0]
+    if status != 'ok':
+        return {'status': status, 'current_player': reply[1] if len(reply) > 1 else None}
+    return {
+        'status': status,
+        'next_player': reply[1],
+        'turn': int(reply[2]),
+        'round_complete': bool(reply[3]),
+    }
+
+
+class StoryRoom:
+    """Story Chain state for one room, stored in Redis hashes and lists."""
+
+    def __init__(self, redis, room_name, ttl=ROOM_TTL):
+        self.redis = redis
+        self.ttl = ttl
+        prefix = f"story:{room_name}"
+        self.keys = [
+            f"{prefix}:meta", f"{prefix}:players", f"{prefix}:scores",
+            f"{prefix}:sentence", f"{prefix}:evaluated", f"{prefix}:events",
+            f"{prefix}:sessions",
+        ]
+        self._join = redis.register_script(JOIN)
+        self._submit = redis.register_script(SUBMIT)
+        self._timeout = redis.register_script(TIMEOUT)
+        self._finish_round = redis.register_script(FINISH_ROUND)
+        self._award = redis.register_script(AWARD)
+        self._reconcile = redis.register_script(RECONCILE)
+        self._schedule = redis.register_script(SCHEDULE)
+        self._record_event = redis.register_script(RECORD_EVENT)
+        self._hold = redis.register_script(HOLD)
+        self._resume = redis.register_script(RESUME)
+        self._open_session = redis.register_script(OPEN_SESSION)
+        self._close_session = redis.register_script(CLOSE_SESSION)
+
+    async def join(self, player, total_images):
+        reply = await self._join(keys=self.keys, args=[player, total_images, self.ttl])
+        added, started, image_index, game_started, turn, current_player, players = reply
+        return {
+            'added': bool(added),
+            'started': bool(started),
+            'current_image_index': int(image_index),
+            'game_started': bool(game_started),
+            'turn': int(turn),
+            'current_player': current_player,
+            'players': players,
+        }
+
+    async def submit(self, player, text):
+        part = json.dumps({"player": player, "text": text})
+        reply = await self._submit(keys=self.keys, args=[player, part, SUBMIT_POINTS, self.ttl])
+        return _turn_result(reply)
+
+    async def timeout(self, player, turn):
+        part = json.dumps({"player": player, "text": MISSED_TURN})
+        reply = await self._timeout(keys=self.keys, args=[player, turn, part, TIMEOUT_PENALTY, self.ttl])
+        return _turn_result(reply)
+
+    async def schedule(self, player, turn, deadline):
+        """Set the deadline of `turn`; False if the game has already moved on."""
+        reply = await self._schedule(keys=self.keys, args=[turn, player, deadline, self.ttl])
+        return bool(reply)
+
+    async def next_deadline(self):
+        """
+        {'turn', 'player', 'deadline'} of the pending turn, {} while no turn
+        is pending, or None once the game is over.
+        """
+        turn, deadline, player, image_index, total_images = await self.redis.hmget(
+            self.keys[0], 'turn', 'deadline', 'deadline_player', 'current_image_index', 'total_images',
+        )
+        if turn is None:
+            return {}
+        if int(image_index) >= int(total_images):
+            return None
+        if deadline is None:
+            return {}
+        return {'turn': int(turn), 'player': player, 'deadline': float(deadline)}
+
+    async def current_round(self):
+        """Image index and sentence parts of the round in progress."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self.keys[0], 'current_image_index')
+            pipe.lrange(self.keys[3], 0, -1)
+            image_index, parts = await pipe.execute()
+        return {
+            'current_image_index': int(image_index or 0),
+            'parts': [json.loads(part) for part in parts],
+        }
+
+    async def finish_round(self):
+        """
+        Close the complete round and move to the next image. Returns the
+        finished round's parts, or None if the round isn't complete (or was
+        already closed).
+        """
+        reply = await self._finish_round(keys=self.keys, args=[self.ttl])
+        if not reply:
+            return None
+        image_index, total_images, turn, next_player, parts = reply
+        return {
+            'image_index': int(image_index),
+            'current_image_index': int(image_index) + 1,
+            'total_images': int(total_images),
+            'turn': int(turn),
+            'next_player': next_player,
+            'parts': [json.loads(part) for part in parts],
+            'last_round': int(image_index) + 1 >= int(total_images),
+        }
+
+    async def award(self, image_index, group_score, contributors, record=None):
+        """
+        Add a finished round's score, split between `contributors` (one entry
+        per part written), and keep `record` for the end-of-game batch.
+        Returns None if that round was already scored.
+        """
+        record = json.dumps({**(record or {}), "score": int(group_score), "contributors": list(contributors)})
+        reply = await self._award(
+            keys=self.keys, args=[image_index, int(group_score), record, *contributors, self.ttl],
+        )
+        if not reply:
+            return None
+        evaluated, total_images, scores = reply
+        return {
+            'scores': _scores(scores),
+            'game_complete': int(evaluated) >= int(total_images),
+        }
+
+    async def rounds(self):
+        """{image index: round record} of every scored round."""
+        records = await self.redis.hgetall(self.keys[4])
+        return {int(index): json.loads(record) for index, record in records.items()}
+
+    async def reconcile(self, deltas):
+        """
+        Apply {player: points delta} once per game. Returns the final scores,
+        or None if the game was already reconciled.
+        """
+        args = [value for player, delta in deltas.items() for value in (player, int(delta))]
+        reply = await self._reconcile(keys=self.keys, args=[*args, self.ttl])
+        if not reply:
+            return None
+        return _scores(reply)
+
+    async def record_event(self, event):
+        """Number a broadcast event (see games/room_events.py) and log it for resuming players."""
+        reply = await self._record_event(
+            keys=self.keys, args=[json.dumps(event), EVENT_LOG_LENGTH, self.ttl],
+        )
+        return int(reply)
+
+    async def events_since(self, seq):
+        """
+        Logged events numbered after `seq`, oldest first, or None if some of
+        them are no longer in the log (the caller needs a snapshot instead).
+        """
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hget(self.keys[0], 'seq')
+            pipe.xrange(self.keys[5], min=f"{int(seq) + 1}-0")
+            current, entries = await pipe.execute()
+        if len(entries) != int(current or 0) - int(seq):
+            return None
+        return [
+            {**json.loads(fields['event']), 'seq': int(entry_id.split('-')[0])}
+            for entry_id, fields in entries
+        ]
+
+    # ---- sessions ----
+
+    async def open_session(self, player, channel):
+        """
+        Resume token for `player` on socket `channel`. A new token replaces
+        the old one only once the socket that held it has closed; returns
+        None while another socket still plays under this name.
+        """
+        return await self._open_session(
+            keys=self.keys, args=[player, channel, secrets.token_urlsafe(24), self.ttl],
+        )
+
+    async def claim_session(self, player, channel):
+        """Make `channel` the player's current socket (after `check_session`)."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.keys[6], f"channel:{player}", channel)
+            pipe.expire(self.keys[6], self.ttl)
+            await pipe.execute()
+
+    async def close_session(self, player, channel):
+        """`channel` closed; the player's token stays valid for resuming."""
+        await self._close_session(keys=self.keys, args=[player, channel, self.ttl])
+
+    async def check_session(self, player, token):
+        expected = await self.redis.hget(self.keys[6], f"token:{player}")
+        return bool(expected and token) and hmac.compare_digest(expected, str(token))
+
+    async def hold(self, player, channel, now, grace):
+        """
+        Pause `player`'s pending turn after their socket `channel` dropped;
+        it now expires after the time that was left or `grace` seconds,
+        whichever is longer, unless they resume. Returns the seconds that
+        were left, or None if it wasn't their turn (or they already
+        reconnected on another socket).
+        """
+        reply = await self._hold(keys=self.keys, args=[player, channel, now, grace, self.ttl])
+        return float(reply) if reply else None
+
+    async def resume(self, player, now):
+        """Give back a held turn's remaining time. Returns {'turn', 'remaining'} or None."""
+        reply = await self._resume(keys=self.keys, args=[player, now, self.ttl])
+        if not reply:
+            return None
+        turn, remaining = reply
+        return {'turn': int(turn), 'remaining': float(remaining)}
+
+    async def snapshot(self):
+        """Full room state, read atomically with the last event's `seq`."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hgetall(self.keys[0])
+            pipe.lrange(self.keys[1], 0, -1)
+            pipe.hgetall(self.keys[2])
+            pipe.lrange(self.keys[3], 0, -1)
+            meta, players, scores, parts = await pipe.execute()
+        index = int(meta.get('current_turn_index', 0))
+        if index >= len(players):
+            index = 0
+        return {
+            'seq': int(meta.get('seq', 0)),
+            'players': players,
+            'scores': {player: int(points) for player, points in scores.items()},
+            'current_image_index': int(meta.get('current_image_index', 0)),
+            'game_started': meta.get('game_started') == '1',
+            'current_player': players[index] if players else None,
+            'parts': [json.loads(part) for part in parts],
+        }
+
+    async def scores(self):
+        return {player: int(points) for player, points in (await self.redis.hgetall(self.keys[2])).items()}
@@ -0,0 +1,130 @@
+"""
+One turn scheduler per Story Chain room.
+
+Every worker with a socket in the room runs a TurnScheduler task, but only
+the holder of the room's Redis lock fires deadlines. The others stand by and
+take over when the owner lets go (its last socket left) or its lease lapses
+(the worker died). Deadlines live in the room state (StoryRoom.schedule), so
+they survive disconnects, and rescheduling is just writing the next turn's
+deadline.
+"""
+import asyncio
+import time
+
+from redis.exceptions import LockError
+
+LOCK_TIMEOUT = 10
+POLL_INTERVAL = 0.5
+
+# room name -> {'task': asyncio.Task, 'sockets': int} for this worker
+_schedulers = {}
+
+
+class TurnScheduler:
+    def __init__(self, game, lock_timeout=LOCK_TIMEOUT, poll_interval=POLL_INTERVAL):
+        self.game = game
+        self.poll_interval = poll_interval
+        self.renew_every = lock_timeout / 3
+        self.lock = game.room.redis.lock(
+            f"story:{game.room_name}:scheduler", timeout=lock_timeout, blocking=False,
+        )
+        self.owner = False
+        self.stopped = False
+        self._renewed_at = 0
+        self._followups = set()
+
+    async def hold_lock(self):
+        """Take or renew the room lock; False while another worker owns it."""
+        now = time.monotonic()
+        if not self.owner:
+            self.owner = await self.lock.acquire()
+            self._renewed_at = now
+            if self.owner:
+                print(f"⏱️ Scheduling turns for room {self.game.room_name}")
+        elif now - self._renewed_at >= self.renew_every:
+            try:
+                await self.lock.reacquire()
+                self._renewed_at = now
+            except LockError:
+                print(f"⚠️ Lost the scheduler lock for room {self.game.room_name}")
+                self.owner = False
+        return self.owner
+
+    def stop(self):
+        """
+        Stop at the next step. Used alongside Task.cancel(): a cancellation
+        that lands just as a Redis reply arrives can be lost inside the client.
+        """
+        self.stopped = True
+
+    async def release(self):
+        if self.owner:
+            self.owner = False
+            try:
+                await self.lock.release()
+            except LockError:
+                pass
+
+    async def fire(self, pending):
+        """Expire the pending turn; the broadcasts run outside the scheduler loop."""
+        result = await self.game.room.timeout(pending['player'], pending['turn'])
+        if result['status'] != 'ok':
+            return
+        task = asyncio.create_task(self.game.on_timeout(pending['player'], result))
+        self._followups.add(task)
+        task.add_done_callback(self._followups.discard)
+
+    async def run(self):
+        try:
+            while not self.stopped:
+                try:
+                    if not await self.hold_lock():
+                        await asyncio.sleep(self.renew_every)
+                        continue
+
+                    pending = await self.game.room.next_deadline()
+                    if pending is None:
+                        print(f"🏁 Room {self.game.room_name} finished, scheduler stopped")
+                        return
+
+                    remaining = pending['deadline'] - time.time() if pending else self.poll_interval
+                    if remaining > 0:
+                        await asyncio.sleep(min(remaining, self.poll_interval))
+                        continue
+
+                    await self.fire(pending)
+                except LockError as e:
+                    print(f"⚠️ Scheduler lock error in room {self.game.room_name}: {e}")
+                    self.owner = False
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"❌ Scheduler error in room {self.game.room_name}: {e}")
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self.release()
+
+
+def attach(game):
+    """Called when a socket joins `game`'s room on this worker."""
+    entry = _schedulers.get(game.room_name)
+    if entry and not entry['task'].done():
+        entry['sockets'] += 1
+        return
+    # A finished scheduler is replaced, but its sockets are still connected
+    sockets = entry['sockets'] + 1 if entry else 1
+    scheduler = TurnScheduler(game)
+    task = asyncio.create_task(scheduler.run())
+    _schedulers[game.room_name] = {'scheduler': scheduler, 'task': task, 'sockets': sockets}
+
+
+def detach(room_name):
+    """Called when a socket leaves; the last one stops this worker's scheduler."""
+    entry = _schedulers.get(room_name)
+    if not entry:
+        return
+    entry['sockets'] -= 1
+    if entry['sockets'] <= 0:
+        entry['scheduler'].stop()
+        entry['task'].cancel()
+        del _schedulers[room_name]
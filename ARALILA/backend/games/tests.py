@@ -1,3 +1,1309 @@
-from django.test import TestCase
+import asyncio
+import json
+import msgpack
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from channels.testing import WebsocketCommunicator
+from rest_framework.test import APIClient
+
+from backend import redis_pool
+from users.models import CustomUser
+from progress.models import GameProgress
+from progress.snapshot import build_snapshot_data, get_snapshot
+from .models import (
+    Area, Game, GameItem, GameRound,
+    SpellingItem, PunctuationItem, PunctuationAnswer,
+    PartsOfSpeechItem, PartsOfSpeechWord,
+    FourPicsOneWordItem, FourPicsOneWordImage,
+    GrammarItem, EmojiSentenceItem, EmojiSymbol,
+    AssessmentLesson, AssessmentChallenge, AssessmentChallengeOption, AssessmentProgress, AssessmentResult,
+)
+from .consumers import LobbyConsumer, StoryChainConsumer
+from .room_events import MSGPACK, JSON
+from .lobby_room import LobbyRoom
+from .story_room import StoryRoom, MISSED_TURN
+from .story_game import StoryChainGame
+from .story_evaluation import StoryEvaluationQueue
+from . import story_evaluation
+from .story_scheduler import TurnScheduler
+from . import story_scheduler
+from .ai_evaluator import AIEvaluator, LocalBackend, local_story_score, set_evaluator
+from .pregrader import pregrade
+from .data import pregrader_corpus
+from .assessment_session import SESSION_KEY
+from .question_packs import compile_question_pack
+from .question_plans import QUESTION_PLANS
+
+
+def create_question_data(item, game_type, index):
+    """Create the game-specific rows (with children) for one GameItem."""
+    if game_type == 'spelling-challenge':
+        SpellingItem.objects.create(item=item, word=f"SALITA{index}", sentence="Ang _____ ay maganda.")
+    elif game_type == 'grammar-check':
+        GrammarItem.objects.create(item=item, sentence=f"Pangungusap {index}")
+    elif game_type == 'punctuation-task':
+        punctuation = PunctuationItem.objects.create(item=item, sentence=f"Kumain ka na {index}", hint="")
+        PunctuationAnswer.objects.create(punctuation_item=punctuation, position=2, mark=',')
+        PunctuationAnswer.objects.create(punctuation_item=punctuation, position=4, mark='?')
+    elif game_type == 'parts-of-speech':
+        pos = PartsOfSpeechItem.objects.create(item=item, sentence=f"Tumakbo ang aso {index}")
+        PartsOfSpeechWord.objects.create(pos_item=pos, word="Tumakbo", correct_answer="Pandiwa")
+        PartsOfSpeechWord.objects.create(pos_item=pos, word="aso", correct_answer="Pangngalan")
+    elif game_type == 'word-association':
+        fourpics = FourPicsOneWordItem.objects.create(item=item, answer=f"ULAN{index}")
+        for n in range(4):
+            FourPicsOneWordImage.objects.create(fourpics_item=fourpics, image_path=f"/images/{index}-{n}.png")
+    elif game_type == 'emoji-challenge':
+        emoji = EmojiSentenceItem.objects.create(item=item, translation=f"Umuulan {index}")
+        EmojiSymbol.objects.create(emoji_item=emoji, symbol="🌧️", keyword="ulan")
+        EmojiSymbol.objects.create(emoji_item=emoji, symbol="☕", keyword="kape")
+
+
+class QuestionQueryPlanTests(TestCase):
+    """Question endpoints must run a fixed number of queries per game type."""
+
+    ITEMS_PER_GAME = 8
+
+    # area + game + items (+ one prefetch per child relation)
+    PACK_QUERY_CEILING = {
+        'spelling-challenge': 3,
+        'grammar-check': 3,
+        'punctuation-task': 4,
+        'parts-of-speech': 4,
+        'word-association': 4,
+        'emoji-challenge': 4,
+    }
+
+    # area + items (+ one prefetch per child relation)
+    LEGACY_URLS = {
+        'spelling-challenge': ('/api/games/spelling/{area_id}/', 2),
+        'grammar-check': ('/api/games/grammar-check/{area_id}/', 2),
+        'punctuation-task': ('/api/games/punctuation/{area_id}/', 3),
+        'parts-of-speech': ('/api/games/parts-of-speech/{area_id}/', 3),
+        'word-association': ('/api/games/word-association/{area_id}/', 3),
+        'emoji-challenge': ('/api/games/emoji/{area_id}/', 3),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email="student@example.com")
+        cls.area = Area.objects.create(name="Palaruan")
+        cls.games = {}
+        for order, (game_type, label) in enumerate(Game.GAME_TYPE_CHOICES):
+            game = Game.objects.create(name=label, game_type=game_type, order_index=order)
+            cls.games[game_type] = game
+            for index in range(cls.ITEMS_PER_GAME):
+                item = GameItem.objects.create(
+                    game=game, area=cls.area, difficulty=1 + index % 3, order_index=index
+                )
+                create_question_data(item, game_type, index)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_every_game_type_has_a_plan(self):
+        self.assertEqual(
+            set(QUESTION_PLANS),
+            {game_type for game_type, _ in Game.GAME_TYPE_CHOICES},
+        )
+
+    def test_question_pack_query_ceiling(self):
+        for game_type, ceiling in self.PACK_QUERY_CEILING.items():
+            with self.subTest(game_type=game_type):
+                with self.assertNumQueries(ceiling):
+                    pack = compile_question_pack(self.area.id, game_type, 1)
+                self.assertEqual(len(pack['questions']), 3)
+
+    def test_legacy_endpoint_query_ceiling(self):
+        for game_type, (url, ceiling) in self.LEGACY_URLS.items():
+            with self.subTest(game_type=game_type):
+                with self.assertNumQueries(ceiling):
+                    response = self.client.get(url.format(area_id=self.area.id))
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.json()['questions'])
+
+    def test_difficulty_endpoint_serves_pack_from_cache(self):
+        url = f"/api/games/questions/{self.area.id}/emoji-challenge/1/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()['questions'][0]['keywords'], ['ulan', 'kape'])
+
+        # Warm pack: only the progress lookup hits the database
+        with self.assertNumQueries(1):
+            second = self.client.get(url)
+        self.assertEqual(second.json()['questions'], first.json()['questions'])
+
+    def test_content_change_invalidates_pack(self):
+        url = f"/api/games/questions/{self.area.id}/spelling-challenge/1/"
+        before = self.client.get(url).json()['questions']
+
+        SpellingItem.objects.filter(item_id=before[0]['id']).update(word="BAGO")
+        SpellingItem.objects.get(item_id=before[0]['id']).save()
+
+        after = self.client.get(url).json()['questions']
+        self.assertEqual(after[0]['word'], "BAGO")
+
+
+class AreaViewTests(TestCase):
+    """Both area URLs are served by the shared, cached area-view builder."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email="student@example.com")
+        cls.area = Area.objects.create(name="Palaruan", order_index=1)
+        for order, (game_type, label) in enumerate(Game.GAME_TYPE_CHOICES):
+            game = Game.objects.create(name=label, game_type=game_type, order_index=order)
+            GameItem.objects.create(game=game, area=cls.area, difficulty=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_warm_area_view_query_count(self):
+        for url in (f"/api/games/area/{self.area.id}/", "/api/games/area/order/1/"):
+            with self.subTest(url=url):
+                self.client.get(url)
+                # area lookup + progress snapshot
+                with self.assertNumQueries(2):
+                    response = self.client.get(url)
+                self.assertEqual(len(response.json()['games']), len(Game.GAME_TYPE_CHOICES))
+
+    def test_content_change_refreshes_catalog(self):
+        url = f"/api/games/area/{self.area.id}/"
+        self.client.get(url)
+
+        game = Game.objects.get(game_type='spelling-challenge')
+        game.name = "Baybayin"
+        game.save()
+
+        names = [g['name'] for g in self.client.get(url).json()['games']]
+        self.assertIn("Baybayin", names)
+
+
+class AreaMapTests(TestCase):
+    """get_unlocked_areas keeps the response of the per-area query version."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(email="map@example.com")
+        palaruan = Area.objects.create(name="Palaruan", order_index=1, description="Simula", theme_color="#FFAA00")
+        gubat = Area.objects.create(name="Gubat", order_index=2)
+        Area.objects.create(name="Dagat", order_index=3)
+        Area.objects.create(name="Bundok", order_index=4)
+        Area.objects.create(name="Lihim", order_index=5, is_active=False)
+
+        games = [Game.objects.create(name=f"Laro {n}", game_type=game_type) for n, game_type in enumerate(
+            ['spelling-challenge', 'punctuation-task', 'parts-of-speech'],
+        )]
+        # Four items over three games: total_games counts items, unlocking counts games
+        for game, difficulty in [(games[0], 1), (games[0], 2), (games[1], 1), (games[2], 1)]:
+            GameItem.objects.create(game=game, area=palaruan, difficulty=difficulty)
+        GameItem.objects.create(game=games[0], area=gubat, difficulty=1)
+
+        for game, stars, scores in [(games[0], 3, (70, 85, 90)), (games[1], 1, (34, 0, 0)), (games[2], 1, (0, 21, 0))]:
+            GameProgress.objects.create(
+                user=cls.user, area=palaruan, game=game, stars_earned=stars,
+                difficulty_1_score=scores[0], difficulty_2_score=scores[1], difficulty_3_score=scores[2],
+            )
+        GameProgress.objects.create(user=cls.user, area=gubat, game=games[0], stars_earned=1, difficulty_1_score=50)
+        GameProgress.objects.create(user=cls.user, area=gubat, game=games[1], stars_earned=0)
+
+        lesson = AssessmentLesson.objects.create(area=palaruan, title="Pagsusulit")
+        challenge = AssessmentChallenge.objects.create(lesson=lesson, type='SPELL', question="Baybayin", order_index=1)
+        AssessmentProgress.objects.create(user=cls.user, area=palaruan, challenge=challenge, completed=True, passed=True, score=90)
+        AssessmentResult.objects.create(user=cls.user, area=palaruan, passed=True, score=90)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_response_is_unchanged(self):
+        self.client.get('/api/games/areas/')  # builds the progress snapshot
+        # areas, grouped item/game counts, progress snapshot
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/games/areas/')
+        ids = list(Area.objects.filter(is_active=True).order_by('order_index').values_list('id', flat=True))
+        self.assertEqual(response.content.decode(), json.dumps({'areas': [
+            {
+                'id': ids[0], 'order_index': 1, 'name': "Palaruan", 'description': "Simula", 'is_locked': False,
+                'completed_games': 3, 'total_games': 4, 'average_score': 48.3,
+                'message': "Start your journey here!", 'theme_color': "#FFAA00",
+            },
+            {
+                'id': ids[1], 'order_index': 2, 'name': "Gubat", 'description': "", 'is_locked': False,
+                'completed_games': 1, 'total_games': 1, 'average_score': 50.0,
+                'message': "Unlocked!", 'theme_color': "#4A90E2",
+            },
+            {
+                'id': ids[2], 'order_index': 3, 'name': "Dagat", 'description': "", 'is_locked': True,
+                'completed_games': 0, 'total_games': 6, 'average_score': 0,
+                'message': "Pass the assessment in Gubat with 80%+", 'theme_color': "#4A90E2",
+            },
+            {
+                'id': ids[3], 'order_index': 4, 'name': "Bundok", 'description': "", 'is_locked': True,
+                'completed_games': 0, 'total_games': 6, 'average_score': 0,
+                'message': "Earn at least 1 star in all games in Dagat (0/6)", 'theme_color': "#4A90E2",
+            },
+        ]}, ensure_ascii=False, separators=(',', ':')))
+
+
+class AIEvaluatorTests(TestCase):
+    """AI grading runs offline through the LocalBackend."""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = LocalBackend(delay=0.05)
+        self.evaluator = AIEvaluator(backend=self.backend, max_concurrency=2)
+        previous = set_evaluator(self.evaluator)
+        self.addCleanup(set_evaluator, previous)
+
+    def test_normalized_answers_share_a_cached_verdict(self):
+        first = self.evaluator.evaluate('compose', "Umuulan  ngayon.", ["🌧️"])
+        second = self.evaluator.evaluate('compose', "  umuulan ngayon. ", ["🌧️"])
+        self.assertEqual(first, second)
+        self.assertEqual(self.backend.calls, 1)
+
+        # A new rubric version does not reuse old verdicts
+        AIEvaluator(backend=self.backend, rubric_version=2).evaluate('compose', "Umuulan ngayon.", ["🌧️"])
+        self.assertEqual(self.backend.calls, 2)
+
+    def test_concurrency_is_bounded(self):
+        answers = [f"Pangungusap bilang {n}" for n in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda answer: self.evaluator.evaluate('emoji', answer, ["☕"]), answers))
+        self.assertTrue(all(result['valid'] for result in results))
+        self.assertEqual(self.backend.calls, 8)
+        self.assertLessEqual(self.backend.max_in_flight, 2)
+
+    def test_identical_requests_are_coalesced(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(
+                lambda n: self.evaluator.evaluate('compose', "Umuulan ngayon." + " " * n, ["🌧️"]),
+                range(10),
+            ))
+        self.assertEqual(self.backend.calls, 1)
+        self.assertTrue(all(result == results[0] for result in results))
+
+        stats = self.evaluator.stats()
+        self.assertEqual(stats['requests'], 10)
+        self.assertEqual(stats['model_calls'], 1)
+        self.assertEqual(stats['coalesced'] + stats['cache_hits'], 9)
+        self.assertEqual(stats['in_flight'], 0)
+
+    def test_evaluation_endpoints(self):
+        client = APIClient()
+        emoji = client.post(
+            '/api/games/sentence-construction/emoji-evaluate/',
+            data=json.dumps({'answer': "Umiinom ako ng kape.", 'emojis': ["☕"]}),
+            content_type='application/json',
+        )
+        self.assertEqual(emoji.status_code, 200)
+        self.assertEqual(emoji.json()['points'], 20)
+        self.assertIn('details', emoji.json())
+
+        compose = client.post(
+            '/api/games/evaluate-compose/',
+            data=json.dumps({'answer': "", 'emojis': ["☕"]}),
+            content_type='application/json',
+        )
+        self.assertEqual(compose.json()['score'], 0)
+        self.assertEqual(compose.json()['missing_emojis'], [])
+
+    def test_compose_challenge_uses_evaluator(self):
+        user = CustomUser.objects.create(email="student@example.com")
+        area = Area.objects.create(name="Palaruan")
+        lesson = AssessmentLesson.objects.create(area=area)
+        challenge = AssessmentChallenge.objects.create(
+            lesson=lesson, type='COMPOSE', question="Sumulat gamit ang: 🌧️ ☕", order_index=1,
+        )
+
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            '/api/games/assessment/validate-answer/',
+            {'challengeId': challenge.id, 'answer': "Umuulan kaya nagkape ako."},
+            format='json',
+        )
+        self.assertTrue(response.json()['correct'])
+        self.assertEqual(response.json()['score'], 100)
+        self.assertEqual(self.backend.calls, 1)
+
+
+class PreGraderTests(TestCase):
+    """Clear-cut answers are failed locally; everything else reaches the model."""
+
+    @classmethod
+    def setUpTestData(cls):
+        game = Game.objects.create(name="Emoji", game_type='emoji-challenge')
+        area = Area.objects.create(name="Palaruan")
+        create_question_data(GameItem.objects.create(game=game, area=area, difficulty=1), 'emoji-challenge', 0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_clear_cut_answers(self):
+        self.assertEqual(pregrade('compose', "  ☕ ", ["☕"])['pregraded'], 'empty')
+
+        english = pregrade('emoji', "I drink coffee when it is raining", ["ulan", "kape"])
+        self.assertEqual(english['pregraded'], 'english')
+        self.assertEqual(english['points'], 10)
+        self.assertIn('coffee', english['english_words_found'])
+
+        unrelated = pregrade('compose', "Mabait ang aking lola.", ["🌧️", "☕"])
+        self.assertEqual(unrelated['pregraded'], 'unrelated')
+        self.assertEqual(unrelated['score'], 0)
+
+    def test_ambiguous_answers_go_to_the_model(self):
+        # Affixed keyword ("umuulan") counts as using the emoji
+        self.assertIsNone(pregrade('compose', "Umuulan kaya nagkape kami.", ["🌧", "☕"]))
+        self.assertIsNone(pregrade('emoji', "Ang kape ay very nice.", ["kape"]))
+        # Unknown emoji: keyword coverage can't be judged
+        self.assertIsNone(pregrade('compose', "Mabait ang aking lola.", ["🦄"]))
+
+    def test_conjugated_verbs_cover_their_keyword(self):
+        for keywords, answer in pregrader_corpus.conjugated_answers:
+            self.assertIsNone(pregrade('emoji', answer, keywords), answer)
+        self.assertEqual(pregrade('emoji', "Mabait ang aking lola.", ["maglaro"])['pregraded'], 'unrelated')
+
+    def test_evaluator_skips_model_for_pregraded_answers(self):
+        backend = LocalBackend()
+        evaluator = AIEvaluator(backend=backend)
+        result = evaluator.evaluate('emoji', "The dog is sleeping in the house", ["aso"])
+        self.assertFalse(result['valid'])
+        self.assertIn('details', result)
+        self.assertEqual(backend.calls, 0)
+        self.assertEqual(evaluator.stats()['pregraded_rate'], 1.0)
+
+
+def fake_pool_factory(server):
+    """BlockingConnectionPool.from_url replacement that talks to a fakeredis server."""
+    from fakeredis.aioredis import FakeConnection
+    from redis import asyncio as aioredis
+
+    def from_url(url, **kwargs):
+        return aioredis.BlockingConnectionPool(connection_class=FakeConnection, server=server, **kwargs)
+    return from_url
+
+
+# fakeredis connections do not answer the pool's PING health checks
+@override_settings(REDIS_POOL={'MAX_CONNECTIONS': 4, 'TIMEOUT': 5, 'HEALTH_CHECK_INTERVAL': 0})
+class RedisPoolTests(TestCase):
+    """WebSocket consumers share one bounded async Redis pool."""
+
+    def setUp(self):
+        import fakeredis
+        patcher = mock.patch.object(
+            redis_pool.aioredis.BlockingConnectionPool, 'from_url',
+            side_effect=fake_pool_factory(fakeredis.FakeServer()),
+        )
+        self.from_url = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_lobby_sockets_share_the_pool(self):
+        sockets = [
+            WebsocketCommunicator(
+                LobbyConsumer.as_asgi(), f"/ws/lobby/ROOM1/?player=P{n}&maxPlayers=99",
+            )
+            for n in range(40)
+        ]
+        for communicator in sockets:
+            communicator.scope['url_route'] = {'kwargs': {'room_code': 'ROOM1'}}
+
+        results = await asyncio.gather(*(communicator.connect() for communicator in sockets))
+        self.assertTrue(all(connected for connected, _ in results))
+
+        # One pool for the whole process, never more connections than its limit
+        self.assertEqual(self.from_url.call_count, 1)
+        stats = redis_pool.pool_stats()
+        self.assertEqual(stats['max_connections'], 4)
+        self.assertLessEqual(stats['open'], 4)
+
+        for communicator in sockets:
+            await communicator.disconnect()
+        await redis_pool.close_async_redis()
+        self.assertFalse(redis_pool.pool_stats()['created'])
+
+    async def test_stats_count_pooled_connections(self):
+        client = redis_pool.get_async_redis()
+        await client.set("key", "value")
+        self.assertEqual(redis_pool.pool_stats(), {
+            'created': True, 'max_connections': 4, 'in_use': 0, 'idle': 1, 'open': 1,
+        })
+
+        # Pins the redis-py private fields pool_stats() reads
+        connection = await redis_pool._pool.get_connection()
+        self.assertEqual((redis_pool.pool_stats()['in_use'], redis_pool.pool_stats()['idle']), (1, 0))
+        await redis_pool._pool.release(connection)
+        self.assertEqual((redis_pool.pool_stats()['in_use'], redis_pool.pool_stats()['idle']), (0, 1))
+        await redis_pool.close_async_redis()
+
+    async def test_reactor_shutdown_closes_the_pool(self):
+        class Reactor:
+            triggers = []
+
+            def addSystemEventTrigger(self, phase, event, callable):
+                self.triggers.append((phase, event, callable))
+
+        reactor = Reactor()
+        redis_pool.close_on_reactor_shutdown(reactor)
+        [(phase, event, close)] = reactor.triggers
+        self.assertEqual((phase, event), ('during', 'shutdown'))
+
+        await redis_pool.get_async_redis().set("key", "value")
+        await close().asFuture(asyncio.get_running_loop())
+        self.assertFalse(redis_pool.pool_stats()['created'])
+
+
+class StoryRoomTests(TestCase):
+    """Story Chain transitions stay consistent under concurrent events."""
+
+    def setUp(self):
+        import fakeredis
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        self.room = StoryRoom(self.redis, "stress")
+
+    async def test_turns_and_rounds(self):
+        joined = await self.room.join("Ana", 2)
+        self.assertTrue(joined['started'])
+        await self.room.join("Ben", 2)
+
+        self.assertEqual((await self.room.submit("Ben", "mali"))['status'], 'not_your_turn')
+        first = await self.room.submit("Ana", "Ang bata")
+        self.assertEqual((first['next_player'], first['round_complete']), ("Ben", False))
+
+        # A timer for an old turn does nothing
+        self.assertEqual((await self.room.timeout("Ana", joined['turn']))['status'], 'stale')
+        second = await self.room.timeout("Ben", first['turn'])
+        self.assertTrue(second['round_complete'])
+
+        finished = await self.room.finish_round()
+        self.assertEqual([part['text'] for part in finished['parts']], ["Ang bata", MISSED_TURN])
+        self.assertEqual((finished['current_image_index'], finished['next_player']), (1, "Ana"))
+        # The same round can only be finished once
+        self.assertIsNone(await self.room.finish_round())
+
+        awarded = await self.room.award(0, 15, ["Ana"])
+        self.assertEqual(awarded['scores'], {"Ana": 2 + 15, "Ben": -2})
+        self.assertFalse(awarded['game_complete'])
+        self.assertIsNone(await self.room.award(0, 15, ["Ana"]))
+
+    async def test_concurrent_submits_and_timeouts(self):
+        players = ["Ana", "Ben", "Cara"]
+        for player in players:
+            await self.room.join(player, 100)
+
+        outcomes = {'submitted': 0, 'timed_out': 0}
+
+        async def play(player, worker):
+            for step in range(60):
+                turn = await self.redis.hget(self.room.keys[0], 'turn')
+                if (worker + step) % 4 == 0:
+                    result = await self.room.timeout(player, turn)
+                    key = 'timed_out'
+                else:
+                    result = await self.room.submit(player, f"{player}-{worker}-{step}")
+                    key = 'submitted'
+                if result['status'] == 'ok':
+                    outcomes[key] += 1
+                    if result['round_complete']:
+                        self.assertIsNotNone(await self.room.finish_round())
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(play(player, worker) for player in players for worker in range(5)))
+
+        # Every accepted event is accounted for exactly once
+        meta = await self.redis.hgetall(self.room.keys[0])
+        parts = (await self.room.current_round())['parts']
+        transitions = outcomes['submitted'] + outcomes['timed_out']
+        rounds = int(meta['current_image_index'])
+        self.assertEqual(rounds * len(players) + len(parts), transitions)
+        self.assertEqual(int(meta['turn']), transitions + rounds)
+        self.assertEqual(int(meta['current_turn_index']), len(parts) % len(players))
+        self.assertEqual(
+            sum((await self.room.scores()).values()),
+            2 * outcomes['submitted'] - 2 * outcomes['timed_out'],
+        )
+        self.assertGreater(rounds, 10)
+
+
+async def stop_scheduler(scheduler, task):
+    scheduler.stop()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+class TurnSchedulerTests(TestCase):
+    """One scheduler per room fires each turn deadline exactly once."""
+
+    def setUp(self):
+        import fakeredis
+        from channels.layers import InMemoryChannelLayer
+        self.redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+        self.layer = InMemoryChannelLayer()
+
+    def worker(self):
+        game = StoryChainGame("sched", channel_layer=self.layer, redis=self.redis)
+        return game, TurnScheduler(game, lock_timeout=0.6, poll_interval=0.02)
+
+    async def start_game(self, game):
+        joined = await game.room.join("Ana", 3)
+        await game.room.join("Ben", 3)
+        return joined['turn']
+
+    async def test_only_the_lock_owner_fires(self):
+        (game, first), (_, second) = self.worker(), self.worker()
+        turn = await self.start_game(game)
+        await game.room.schedule("Ana", turn, time.time() - 1)
+
+        tasks = [asyncio.create_task(first.run()), asyncio.create_task(second.run())]
+        await asyncio.sleep(0.2)
+        self.assertEqual([first.owner, second.owner].count(True), 1)
+
+        # Ana's turn expired once; Ben's deadline was scheduled by the follow-up
+        meta = await self.redis.hgetall(game.room.keys[0])
+        self.assertEqual(int(meta['turn']), turn + 1)
+        self.assertEqual(meta['deadline_player'], "Ben")
+        self.assertEqual(await game.room.scores(), {"Ana": -2, "Ben": 0})
+
+        await stop_scheduler(first, tasks[0])
+        await stop_scheduler(second, tasks[1])
+
+    async def test_a_move_cancels_the_deadline(self):
+        game, scheduler = self.worker()
+        turn = await self.start_game(game)
+        await game.room.schedule("Ana", turn, time.time() + 0.1)
+        task = asyncio.create_task(scheduler.run())
+
+        await game.room.submit("Ana", "Ang bata")
+        await asyncio.sleep(0.3)
+        self.assertEqual(await game.room.scores(), {"Ana": 2, "Ben": 0})
+        self.assertEqual(await game.room.next_deadline(), {})
+
+        await stop_scheduler(scheduler, task)
+
+    async def test_restarted_scheduler_counts_every_socket(self):
+        game = StoryChainGame("restart", channel_layer=self.layer, redis=self.redis)
+        await game.room.join("Ana", 1)
+        with mock.patch.dict(story_scheduler._schedulers, clear=True):
+            story_scheduler.attach(game)
+            story_scheduler.attach(game)
+
+            # The game ends and the scheduler returns; the sockets stay connected
+            await self.redis.hset(game.room.keys[0], 'current_image_index', 1)
+            await story_scheduler._schedulers["restart"]['task']
+            await self.redis.hset(game.room.keys[0], 'current_image_index', 0)
+
+            story_scheduler.attach(game)
+            story_scheduler.detach("restart")
+            entry = story_scheduler._schedulers["restart"]
+            self.assertEqual(entry['sockets'], 2)
+            await asyncio.sleep(0.05)
+            self.assertFalse(entry['task'].done())
+
+            story_scheduler.detach("restart")
+            story_scheduler.detach("restart")
+            await asyncio.gather(entry['task'], return_exceptions=True)
+            self.assertNotIn("restart", story_scheduler._schedulers)
+
+    async def test_standby_worker_takes_over(self):
+        (game, first), (_, second) = self.worker(), self.worker()
+        turn = await self.start_game(game)
+        owner = asyncio.create_task(first.run())
+        await asyncio.sleep(0.05)
+        standby = asyncio.create_task(second.run())
+
+        # The owner's last socket leaves; its deadline still fires
+        await stop_scheduler(first, owner)
+        await game.room.schedule("Ana", turn, time.time())
+        await asyncio.sleep(0.5)
+
+        self.assertTrue(second.owner)
+        self.assertEqual((await game.room.scores())["Ana"], -2)
+
+        await stop_scheduler(second, standby)
+
+
+class StoryEvaluationTests(TestCase):
+    """Finished rounds are scored in the background; the game moves on at once."""
+
+    def setUp(self):
+        import fakeredis
+        from channels.layers import InMemoryChannelLayer
+        self.layer = InMemoryChannelLayer()
+        self.game = StoryChainGame("evalroom", channel_layer=self.layer, redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+
+        self.backend = LocalBackend()
+        previous = set_evaluator(AIEvaluator(backend=self.backend))
+        self.addCleanup(set_evaluator, previous)
+
+        self.queue = StoryEvaluationQueue(workers=2, timeout=0.2)
+        patcher = mock.patch.object(story_evaluation, '_queue', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+    async def events(self, channel):
+        received = []
+        while True:
+            try:
+                received.append(await asyncio.wait_for(self.layer.receive(channel), 0.05))
+            except asyncio.TimeoutError:
+                return [event['type'] for event in received], received
+
+    async def play_round(self, texts):
+        room = self.game.room
+        for player, text in texts:
+            result = await room.submit(player, text)
+        self.assertTrue(result['round_complete'])
+        await self.game.complete_round()
+
+    async def test_next_image_does_not_wait_for_the_score(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add(self.game.room_group_name, channel)
+        await self.game.room.join("Ana", 2)
+
+        self.backend.delay = 0.1
+        await self.play_round([("Ana", "Umuulan ngayon.")])
+        types, _ = await self.events(channel)
+        self.assertEqual(types[:2], ['new_image', 'turn_update'])
+
+        await self.queue.join()
+        types, events = await self.events(channel)
+        self.assertEqual(types, ['sentence_evaluation'])
+        self.assertEqual(events[0]['score'], local_story_score("Umuulan ngayon."))
+        self.assertEqual(await self.game.room.scores(), {"Ana": 2 + events[0]['score']})
+
+    async def test_slow_model_falls_back_and_rounds_are_stored(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add(self.game.room_group_name, channel)
+        await self.game.room.join("Ana", 2)
+
+        self.backend.delay = 1
+        await self.play_round([("Ana", "Ang bata ay naglalaro sa parke.")])
+        await self.play_round([("Ana", "Masaya sila!")])
+        await self.queue.join()
+
+        types, events = await self.events(channel)
+        self.assertEqual(types.count('sentence_evaluation'), 2)
+        self.assertEqual(types[-1], 'game_complete')
+
+        rounds = await sync_to_async(list)(
+            GameRound.objects.filter(room__room_name="evalroom").order_by('round_index').select_related('evaluation')
+        )
+        self.assertEqual([r.round_index for r in rounds], [0, 1])
+        self.assertEqual(rounds[1].evaluated_sentence, "Masaya sila!")
+        self.assertEqual(rounds[1].evaluation.overall_score, local_story_score("Masaya sila!"))
+
+    async def test_batched_mode_scores_the_game_in_one_request(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add(self.game.room_group_name, channel)
+        self.game.batched = True
+        self.backend.responder = lambda request: {
+            "scores": [{"round": entry["round"], "score": 20, "feedback": "Mahusay!"} for entry in json.loads(request.answer)]
+        }
+        await self.game.room.join("Ana", 3)
+
+        sentences = ["Umuulan ngayon.", "Naglalaro ang bata.", "Masaya sila!"]
+        for sentence in sentences:
+            await self.play_round([("Ana", sentence)])
+            # Provisional score, no model call in the turn loop
+            self.assertEqual(self.backend.calls, 0)
+        await self.queue.join()
+        self.assertEqual(self.backend.calls, 1)
+
+        types, events = await self.events(channel)
+        provisional = [e for e in events if e['type'] == 'sentence_evaluation']
+        self.assertEqual([e['score'] for e in provisional], [local_story_score(s) for s in sentences])
+        self.assertTrue(all(e['provisional'] for e in provisional))
+        self.assertEqual(types.count('game_complete'), 1)
+        self.assertEqual(types[-1], 'game_complete')
+        self.assertEqual(events[-1]['scores'], {"Ana": 3 * 2 + 3 * 20})
+        self.assertEqual([r['score'] for r in events[-1]['rounds']], [20, 20, 20])
+        self.assertEqual(await self.game.room.scores(), {"Ana": 66})
+
+        scores = await sync_to_async(list)(
+            GameRound.objects.filter(room__room_name="evalroom").order_by('round_index')
+            .values_list('evaluation__overall_score', flat=True)
+        )
+        self.assertEqual(scores, [20, 20, 20])
+        # A repeated batch doesn't apply the scores twice
+        self.assertIsNone(await self.game.room.reconcile({"Ana": 5}))
+
+    async def test_failed_batch_keeps_the_provisional_scores(self):
+        channel = await self.layer.new_channel()
+        await self.layer.group_add(self.game.room_group_name, channel)
+        self.game.batched = True
+        self.backend.delay = 1
+        await self.game.room.join("Ana", 2)
+
+        await self.play_round([("Ana", "Ang bata ay naglalaro sa parke.")])
+        await self.play_round([("Ana", "Masaya sila!")])
+        await self.queue.join()
+
+        types, events = await self.events(channel)
+        self.assertEqual(types[-1], 'game_complete')
+        expected = local_story_score("Ang bata ay naglalaro sa parke.") + local_story_score("Masaya sila!")
+        self.assertEqual(events[-1]['scores'], {"Ana": 2 * 2 + expected})
+
+
+@override_settings(REDIS_POOL={'MAX_CONNECTIONS': 8, 'TIMEOUT': 5, 'HEALTH_CHECK_INTERVAL': 0})
+class SocketTestCase(TestCase):
+    """Consumers on a fakeredis-backed pool, with story rounds scored offline."""
+
+    def setUp(self):
+        import fakeredis
+        patcher = mock.patch.object(
+            redis_pool.aioredis.BlockingConnectionPool, 'from_url',
+            side_effect=fake_pool_factory(fakeredis.FakeServer()),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        # Finished story rounds are scored offline
+        previous = set_evaluator(AIEvaluator(backend=LocalBackend()))
+        self.addCleanup(set_evaluator, previous)
+        patcher = mock.patch.object(story_evaluation, '_queue', StoryEvaluationQueue(workers=1))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        async_to_sync(redis_pool.close_async_redis)()
+
+
+class RoomEventProtocolTests(SocketTestCase):
+    """v2 sockets get numbered delta events; v1 sockets keep the full payloads."""
+
+    async def lobby_socket(self, player, subprotocols=None):
+        communicator = WebsocketCommunicator(
+            LobbyConsumer.as_asgi(), f"/ws/lobby/ROOM2/?player={player}&maxPlayers=5",
+            subprotocols=subprotocols,
+        )
+        communicator.scope['url_route'] = {'kwargs': {'room_code': 'ROOM2'}}
+        connected, subprotocol = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator, subprotocol
+
+    async def test_lobby_deltas_and_snapshot(self):
+        legacy, subprotocol = await self.lobby_socket("Ana")
+        self.assertIsNone(subprotocol)
+        self.assertEqual((await legacy.receive_json_from())['type'], 'player_list')
+        await legacy.receive_json_from()
+
+        compact, subprotocol = await self.lobby_socket("Ben", [MSGPACK])
+        self.assertEqual(subprotocol, MSGPACK)
+        snapshot = msgpack.unpackb(await compact.receive_from())
+        self.assertEqual(snapshot, {"type": "snapshot", "seq": 1, "players": ["Ana", "Ben"], "max_players": 5})
+        self.assertEqual(msgpack.unpackb(await compact.receive_from()), {"type": "player_joined", "seq": 2, "player": "Ben"})
+        await legacy.receive_json_from()
+
+        await self.lobby_socket("Cara")
+        full = await legacy.receive_from()
+        delta = await compact.receive_from()
+        self.assertEqual(json.loads(full)['players'], ["Ana", "Ben", "Cara"])
+        self.assertNotIn('seq', json.loads(full))
+        self.assertEqual(msgpack.unpackb(delta), {"type": "player_joined", "seq": 3, "player": "Cara"})
+        self.assertLess(len(delta), len(full))
+
+        # A client that missed events asks for the state again
+        await compact.send_to(bytes_data=msgpack.packb({"type": "snapshot"}))
+        snapshot = msgpack.unpackb(await compact.receive_from())
+        self.assertEqual((snapshot['seq'], snapshot['players']), (3, ["Ana", "Ben", "Cara"]))
+
+    async def test_story_new_image_is_sent_as_an_index(self):
+        communicator = WebsocketCommunicator(StoryChainConsumer.as_asgi(), "/ws/story/protoroom/", subprotocols=[JSON])
+        communicator.scope['url_route'] = {'kwargs': {'room_name': 'protoroom'}}
+        connected, subprotocol = await communicator.connect()
+        self.assertEqual((connected, subprotocol), (True, JSON))
+
+        await communicator.send_json_to({"type": "player_join", "player": "Ana"})
+        received = {}
+        for _ in range(4):
+            event = await communicator.receive_json_from()
+            received[event['type']] = event
+        self.assertEqual(set(received), {'session', 'players_update', 'snapshot', 'turn_update'})
+        self.assertEqual(received['players_update'], {"type": "players_update", "seq": 1, "player": "Ana"})
+        snapshot = received['snapshot']
+        self.assertEqual(snapshot['players'], ["Ana"])
+        self.assertEqual(len(snapshot['images']), snapshot['total_images'])
+
+        await communicator.send_json_to({"type": "submit_sentence", "player": "Ana", "text": "Umuulan."})
+        events = {}
+        while 'new_image' not in events:
+            event = await communicator.receive_json_from()
+            events[event['type']] = event
+        self.assertEqual(events['new_image'], {"type": "new_image", "seq": events['new_image']['seq'], "image_index": 1})
+        self.assertGreater(events['new_image']['seq'], events['story_update']['seq'])
+        await communicator.disconnect()
+
+
+class StoryResumeTests(SocketTestCase):
+    """A dropped player gets their turn held and resumes from the event log."""
+
+    async def story_socket(self):
+        communicator = WebsocketCommunicator(StoryChainConsumer.as_asgi(), "/ws/story/resumeroom/", subprotocols=[JSON])
+        communicator.scope['url_route'] = {'kwargs': {'room_name': 'resumeroom'}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def receive_until(self, communicator, event_type):
+        received = []
+        while not received or received[-1]['type'] != event_type:
+            received.append(await communicator.receive_json_from())
+        return received
+
+    async def test_resume_replays_missed_events_and_keeps_the_turn(self):
+        first = await self.story_socket()
+        await first.send_json_to({"type": "player_join", "player": "Ana"})
+        received = await self.receive_until(first, 'turn_update')
+        token = next(e['token'] for e in received if e['type'] == 'session')
+        last_seq = max(e['seq'] for e in received if 'seq' in e)
+
+        # Ana drops while it's her turn; Ben joins meanwhile
+        await first.disconnect()
+        other = await self.story_socket()
+        await other.send_json_to({"type": "player_join", "player": "Ben"})
+        await self.receive_until(other, 'players_update')
+
+        rejected = await self.story_socket()
+        await rejected.send_json_to({"type": "resume", "player": "Ana", "token": "stale", "last_seq": last_seq})
+        self.assertEqual((await rejected.receive_json_from())['type'], 'resume_failed')
+
+        second = await self.story_socket()
+        await second.send_json_to({"type": "resume", "player": "Ana", "token": token, "last_seq": last_seq})
+        replayed = await self.receive_until(second, 'resumed')
+        self.assertEqual([e['type'] for e in replayed], ['turn_held', 'players_update', 'resumed'])
+        self.assertEqual([e['seq'] for e in replayed[:2]], [last_seq + 1, last_seq + 2])
+
+        turn = await self.receive_until(second, 'turn_update')
+        self.assertEqual(turn[-1]['next_player'], "Ana")
+        self.assertGreater(turn[-1]['time_limit'], 15)
+
+        # No penalty, and the turn has a deadline again
+        game = StoryChainGame("resumeroom")
+        self.assertEqual(await game.room.scores(), {"Ana": 0, "Ben": 0})
+        self.assertEqual((await game.room.next_deadline())['player'], "Ana")
+        for communicator in (other, rejected, second):
+            await communicator.disconnect()
+
+    async def test_turn_times_out_after_the_grace_window(self):
+        import fakeredis
+        from channels.layers import InMemoryChannelLayer
+        game = StoryChainGame("graceroom", channel_layer=InMemoryChannelLayer(), redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+        joined = await game.room.join("Ana", 3)
+        await game.room.open_session("Ana", "socket-2")
+        await game.room.schedule("Ana", joined['turn'], time.time() + 0.05)
+
+        # A socket Ana already replaced doesn't hold her turn
+        await game.hold_turn("Ana", "socket-1")
+        self.assertIsNone(await game.room.resume("Ana", time.time()))
+
+        with mock.patch('games.story_game.RESUME_GRACE', 0.1):
+            await game.hold_turn("Ana", "socket-2")
+        scheduler = TurnScheduler(game, lock_timeout=0.6, poll_interval=0.02)
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.3)
+        self.assertEqual(await game.room.scores(), {"Ana": -2})
+
+        await stop_scheduler(scheduler, task)
+
+    async def test_hold_never_shortens_the_turn(self):
+        import fakeredis
+        from channels.layers import InMemoryChannelLayer
+        game = StoryChainGame("longroom", channel_layer=InMemoryChannelLayer(), redis=fakeredis.FakeAsyncRedis(decode_responses=True))
+        joined = await game.room.join("Ana", 3)
+        await game.room.open_session("Ana", "socket-1")
+        now = time.time()
+        await game.room.schedule("Ana", joined['turn'], now + 18)
+
+        self.assertAlmostEqual(await game.room.hold("Ana", "socket-1", now, 10), 18, places=3)
+        self.assertAlmostEqual((await game.room.next_deadline())['deadline'], now + 18, places=3)
+
+        # Submitting ends the hold along with the turn
+        await game.room.submit("Ana", "Noong")
+        self.assertIsNone(await game.room.resume("Ana", time.time()))
+
+    async def test_v1_rejoin_releases_the_hold(self):
+        first = await self.story_socket_v1()
+        await first.send_json_to({"type": "player_join", "player": "Ana"})
+        await self.receive_until(first, 'turn_update')
+        await first.disconnect()
+
+        # The v1 hook rejoins with player_join instead of sending resume;
+        # the snapshot reply means the join has been fully handled
+        second = await self.story_socket_v1()
+        await second.send_json_to({"type": "player_join", "player": "Ana"})
+        await second.send_json_to({"type": "snapshot"})
+        await self.receive_until(second, 'snapshot')
+
+        game = StoryChainGame("resumeroom")
+        self.assertIsNone(await game.room.resume("Ana", time.time()))
+        self.assertEqual(await game.room.scores(), {"Ana": 0})
+
+        # The rejoined socket owns the session, so dropping again holds the turn
+        await second.disconnect()
+        self.assertIsNotNone(await game.room.resume("Ana", time.time()))
+
+    async def test_a_connected_player_cannot_be_taken_over(self):
+        first = await self.story_socket()
+        await first.send_json_to({"type": "player_join", "player": "Ana"})
+        received = await self.receive_until(first, 'turn_update')
+        token = next(e['token'] for e in received if e['type'] == 'session')
+
+        intruder = await self.story_socket()
+        await intruder.send_json_to({"type": "player_join", "player": "Ana"})
+        self.assertEqual((await intruder.receive_json_from())['type'], 'error')
+        await intruder.send_json_to({"type": "submit_sentence", "player": "Ana", "text": "Hindi ako si Ana."})
+        await intruder.send_json_to({"type": "snapshot"})
+        self.assertEqual((await self.receive_until(intruder, 'snapshot'))[-1]['parts'], [])
+
+        game = StoryChainGame("resumeroom")
+        self.assertTrue(await game.room.check_session("Ana", token))
+        self.assertEqual((await game.room.next_deadline())['player'], "Ana")
+
+        # Ana's own socket still plays, and dropping it still holds her turn
+        await intruder.disconnect()
+        await first.disconnect()
+        self.assertIsNotNone(await game.room.resume("Ana", time.time()))
+
+    async def story_socket_v1(self):
+        communicator = WebsocketCommunicator(StoryChainConsumer.as_asgi(), "/ws/story/resumeroom/")
+        communicator.scope['url_route'] = {'kwargs': {'room_name': 'resumeroom'}}
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+
+@override_settings(CHANNEL_LAYERS={'default': {
+    'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 1000},
+}})
+class LobbyJoinStormTests(SocketTestCase):
+    """Simultaneous connects neither lose players nor start the game twice."""
+
+    def lobby_sockets(self, room_code, players, max_players):
+        sockets = []
+        for player in players:
+            communicator = WebsocketCommunicator(
+                LobbyConsumer.as_asgi(), f"/ws/lobby/{room_code}/?player={player}&maxPlayers={max_players}",
+                subprotocols=[JSON],
+            )
+            communicator.scope['url_route'] = {'kwargs': {'room_code': room_code}}
+            sockets.append(communicator)
+        return sockets
+
+    async def drain(self, communicator, until=None):
+        """Messages up to `until` (or until the socket goes quiet or closes)."""
+        received = []
+        while until or not await communicator.receive_nothing(timeout=0.5):
+            output = await communicator.receive_output(timeout=10)
+            if output['type'] == 'websocket.close':
+                break
+            received.append(json.loads(output['text']))
+            if received[-1]['type'] == until:
+                break
+        return received
+
+    async def test_join_storm_starts_the_game_once(self):
+        players = [f"P{n}" for n in range(100)]
+        sockets = self.lobby_sockets("STORM", players, 100)
+        results = await asyncio.gather(*(communicator.connect() for communicator in sockets))
+        self.assertTrue(all(connected for connected, _ in results))
+
+        received = await asyncio.gather(*(self.drain(communicator, 'game_start') for communicator in sockets))
+        rest = await asyncio.gather(*(self.drain(communicator) for communicator in sockets))
+        starts = [[e for e in first + later if e['type'] == 'game_start'] for first, later in zip(received, rest)]
+        # Every member got exactly one game_start, all with the same turn order of everyone
+        self.assertEqual([len(events) for events in starts], [1] * 100)
+        self.assertEqual(len({tuple(events[0]['turn_order']) for events in starts}), 1)
+        self.assertEqual(sorted(starts[0][0]['turn_order']), sorted(players))
+
+        snapshot = await LobbyRoom(redis_pool.get_async_redis(), "STORM").snapshot()
+        self.assertCountEqual(snapshot['players'], players)
+        for communicator in sockets:
+            await communicator.disconnect()
+
+    async def test_seats_are_never_overfilled(self):
+        sockets = self.lobby_sockets("FULL", [f"P{n}" for n in range(12)], 5)
+        await asyncio.gather(*(communicator.connect() for communicator in sockets))
+
+        received = await asyncio.gather(*(self.drain(communicator) for communicator in sockets))
+        turned_away = [events for events in received if events and events[0]['type'] == 'room_full']
+        self.assertEqual(len(turned_away), 7)
+        self.assertEqual(sum(1 for events in received for e in events if e['type'] == 'game_start'), 5)
+        self.assertEqual(len((await LobbyRoom(redis_pool.get_async_redis(), "FULL").snapshot())['players']), 5)
+        for communicator in sockets:
+            await communicator.disconnect()
+
+    async def test_players_rejoin_a_started_lobby(self):
+        lobby = LobbyRoom(redis_pool.get_async_redis(), "BACK")
+        for player in ("Cara", "Ana", "Ben"):
+            joined = await lobby.join(player, 3)
+        self.assertTrue(joined['started'])
+        self.assertEqual(joined['players'], ["Cara", "Ana", "Ben"])
+
+        # Ana's socket drops and reconnects; the game doesn't start again
+        self.assertEqual((await lobby.leave("Ana"))['players'], ["Cara", "Ben"])
+        self.assertEqual((await lobby.join("Dan", 3))['status'], 'full')
+        joined = await lobby.join("Ana", 3)
+        self.assertEqual((joined['status'], joined['started']), ('ok', False))
+        self.assertEqual(joined['players'], ["Cara", "Ben", "Ana"])
+
+        # Once everyone has left the room code can be used again
+        for player in ("Cara", "Ben", "Ana"):
+            await lobby.leave(player)
+        self.assertEqual((await lobby.join("Dan", 3))['status'], 'ok')
+
+
+def create_assessment(area):
+    """One challenge of every non-AI type plus a COMPOSE, with their options."""
+    lesson = AssessmentLesson.objects.create(area=area)
+    option = AssessmentChallengeOption.objects.create
+
+    select = AssessmentChallenge.objects.create(lesson=lesson, type='SELECT', question="Alin ang aso?", order_index=1)
+    option(challenge=select, text="aso", correct=True)
+    option(challenge=select, text="pusa")
+
+    AssessmentChallenge.objects.create(lesson=lesson, type='SPELL', question="Baybayin", order_index=2, correct_answer="Ulan")
+
+    arrange = AssessmentChallenge.objects.create(lesson=lesson, type='ARRANGE', question="Ayusin", order_index=3)
+    for position, word in [(2, "ang"), (1, "Tumakbo"), (3, "aso")]:
+        option(challenge=arrange, text=word, order_position=position)
+
+    punctuate = AssessmentChallenge.objects.create(lesson=lesson, type='PUNCTUATE', question="Kumain ka na", order_index=4)
+    option(challenge=punctuate, text=",", order_position=1)
+    option(challenge=punctuate, text="?", order_position=2)
+
+    tag = AssessmentChallenge.objects.create(lesson=lesson, type='TAG_POS', question="Tumakbo ang aso", order_index=5)
+    option(challenge=tag, text="Tumakbo", order_position=0, pos_tag="Pandiwa")
+    option(challenge=tag, text="aso", order_position=2, pos_tag="Pangngalan")
+    option(challenge=tag, text="Pandiwa", order_position=100, correct=True)
+
+    AssessmentChallenge.objects.create(
+        lesson=lesson, type='COMPOSE', question="Sumulat gamit ang: 🌧️ ☕", order_index=6, correct_answer="ulan kape",
+    )
+    return lesson
+
+
+class AssessmentSessionTests(TestCase):
+    """Answers are checked against the session's answer keys, not the database."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(email="assess@example.com")
+        self.area = Area.objects.create(name="Gubat")
+        game = Game.objects.create(name="Baybay", game_type='spelling-challenge')
+        GameItem.objects.create(game=game, area=self.area)
+        GameProgress.objects.create(user=self.user, area=self.area, game=game, stars_earned=1)
+        self.lesson = create_assessment(self.area)
+        self.challenges = {c.type: c for c in self.lesson.challenges.prefetch_related('options')}
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        previous = set_evaluator(AIEvaluator(backend=LocalBackend()))
+        self.addCleanup(set_evaluator, previous)
+
+    def validate(self, challenge_type, answer, session_id=None):
+        return self.client.post(
+            '/api/games/assessment/validate-answer/',
+            {'challengeId': self.challenges[challenge_type].id, 'answer': answer, 'sessionId': session_id},
+            format='json',
+        ).json()
+
+    def start(self):
+        return self.client.get(f'/api/games/assessment/{self.area.id}/').json()['sessionId']
+
+    def test_lesson_start_keeps_answers_on_the_server(self):
+        response = self.client.get(f'/api/games/assessment/{self.area.id}/')
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body['sessionId'])
+        self.assertEqual(len(body['challenges']), 6)
+        for challenge in body['challenges']:
+            self.assertNotIn('correctAnswer', challenge)
+            for option in challenge.get('challengeOptions', []) + challenge.get('posOptions', []):
+                self.assertEqual(set(option) & {'correct', 'isCorrect'}, set())
+        arrange = next(c for c in body['challenges'] if c['type'] == 'ARRANGE')
+        self.assertCountEqual([w['text'] for w in arrange['words']], ["Tumakbo", "ang", "aso"])
+        self.assertNotEqual([w['text'] for w in arrange['words']], ["Tumakbo", "ang", "aso"])
+        self.assertNotIn('correctPosition', arrange['words'][0])
+        session = cache.get(SESSION_KEY.format(user_id=self.user.pk, session_id=body['sessionId']))
+        self.assertEqual(session['words'][str(arrange['id'])], [w['id'] for w in arrange['words']])
+        punctuate = next(c for c in body['challenges'] if c['type'] == 'PUNCTUATE')
+        self.assertEqual(punctuate['punctuationMarks'], [{'id': 0, 'mark': ","}, {'id': 1, 'mark': "?"}])
+
+    def test_validation_reads_no_rows(self):
+        session_id = self.start()
+        options = {t: list(c.options.all()) for t, c in self.challenges.items()}
+        words = {str(opt.id): opt.pos_tag for opt in options['TAG_POS'] if opt.order_position < 100}
+        answers = [
+            ('SELECT', next(opt.id for opt in options['SELECT'] if opt.correct), True),
+            ('SPELL', " ulan ", True),
+            ('SPELL', "araw", False),
+            ('ARRANGE', ["Tumakbo", "ang", "aso"], True),
+            ('ARRANGE', ["ang", "Tumakbo", "aso"], False),
+            ('PUNCTUATE', [{'mark': "?", 'position': 2}, {'mark': ",", 'position': 1}], True),
+            ('PUNCTUATE', [{'mark': ",", 'position': 1}], False),
+            ('TAG_POS', words, True),
+            ('TAG_POS', {**words, next(iter(words)): "Pang-uri"}, False),
+        ]
+        for challenge_type, answer, expected in answers:
+            # The session key and the authenticated user are the only lookups
+            with self.assertNumQueries(0):
+                result = self.validate(challenge_type, answer, session_id)
+            self.assertEqual(result['correct'], expected, (challenge_type, answer))
+        self.assertEqual(self.validate('SPELL', "araw", session_id)['correctAnswer'], "Ulan")
+
+        with self.assertNumQueries(0):
+            result = self.validate('COMPOSE', "Umuulan kaya nagkape ako.", session_id)
+        self.assertTrue(result['correct'])
+
+    def test_sessions_do_not_replace_each_other(self):
+        first, second = self.start(), self.start()
+        self.assertNotEqual(first, second)
+        for session_id in (first, second):
+            with self.assertNumQueries(0):
+                self.assertTrue(self.validate('SPELL', "ulan", session_id)['correct'])
+
+    def test_expired_session_compiles_from_the_database(self):
+        for session_id in (None, "expired"):
+            with self.assertNumQueries(2):
+                self.assertTrue(self.validate('ARRANGE', ["Tumakbo", "ang", "aso"], session_id)['correct'])
+        response = self.client.post(
+            '/api/games/assessment/validate-answer/', {'challengeId': 999999, 'answer': "x"}, format='json',
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class AssessmentCompletionTests(TestCase):
+    """Passing an assessment writes every challenge in one statement."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(email="complete@example.com")
+        self.area = Area.objects.create(name="Dagat", order_index=1)
+        Area.objects.create(name="Bundok", order_index=2)
+        self.lesson = create_assessment(self.area)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def complete(self, percentage):
+        return self.client.post(
+            '/api/games/assessment/complete/', {'areaId': self.area.id, 'percentage': percentage}, format='json',
+        ).json()
+
+    def test_query_count_does_not_grow_with_challenges(self):
+        self.complete(85)  # builds the progress snapshot
+        # area, challenge ids, progress upsert, result upsert, snapshot
+        # select + update, next area, and the savepoints around them
+        with self.assertNumQueries(11):
+            self.assertTrue(self.complete(85)['passed'])
+
+        for index in range(20):
+            AssessmentChallenge.objects.create(lesson=self.lesson, type='SPELL', question="?", order_index=10 + index)
+        with self.assertNumQueries(11):
+            self.assertTrue(self.complete(90)['passed'])
+
+        self.assertEqual(AssessmentProgress.objects.filter(user=self.user, passed=True, score=90).count(), 26)
+        result = AssessmentResult.objects.get(user=self.user, area=self.area)
+        self.assertEqual((result.passed, result.score), (True, 90))
+
+    def test_rejects_areas_without_an_assessment(self):
+        empty = Area.objects.create(name="Disyerto", order_index=3)
+        response = self.client.post(
+            '/api/games/assessment/complete/', {'areaId': empty.id, 'percentage': 100}, format='json',
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(AssessmentResult.objects.filter(area=empty).exists())
+
+    def test_rejects_invalid_percentages(self):
+        for percentage in (None, "85", True, 101, -1):
+            response = self.client.post(
+                '/api/games/assessment/complete/', {'areaId': self.area.id, 'percentage': percentage}, format='json',
+            )
+            self.assertEqual(response.status_code, 400, percentage)
+        self.assertFalse(AssessmentResult.objects.exists())
+
+    def test_unlock_reads_the_result_row(self):
+        self.complete(80)
+        self.assertEqual(get_snapshot(self.user)['passed_areas'], [self.area.id])
+        self.assertEqual(build_snapshot_data(self.user.id)['passed_areas'], [self.area.id])
+
+        self.client.post('/api/games/assessment/reset/', {'areaId': self.area.id}, format='json')
+        self.assertFalse(AssessmentResult.objects.filter(user=self.user).exists())
+        self.assertEqual(build_snapshot_data(self.user.id)['passed_areas'], [])
+
+
+class AssessmentBatchTests(TestCase):
+    """validate-answers grades a whole batch and records the correct answers."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create(email="batch@example.com")
+        self.area = Area.objects.create(name="Bukid")
+        self.lesson = create_assessment(self.area)
+        AssessmentChallenge.objects.create(
+            lesson=self.lesson, type='COMPOSE', question="Sumulat gamit ang: 📚", order_index=7, correct_answer="aklat",
+        )
+        self.challenges = {c.type: c for c in self.lesson.challenges.all()}
+        self.compose = list(self.lesson.challenges.filter(type='COMPOSE'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.backend = LocalBackend(delay=0.05)
+        previous = set_evaluator(AIEvaluator(backend=self.backend))
+        self.addCleanup(set_evaluator, previous)
+
+    def test_batch_grades_records_and_fans_out_compose(self):
+        answers = [
+            {'challengeId': self.challenges['SPELL'].id, 'answer': "ulan"},
+            {'challengeId': self.challenges['ARRANGE'].id, 'answer': ["aso", "ang", "Tumakbo"]},
+            {'challengeId': 999999, 'answer': "x"},
+        ] + [
+            {'challengeId': challenge.id, 'answer': f"Pangungusap tungkol sa {challenge.correct_answer} bilang {n}."}
+            for n, challenge in enumerate(self.compose)
+        ]
+        response = self.client.post('/api/games/assessment/validate-answers/', {'answers': answers}, format='json')
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+
+        self.assertEqual([r['challengeId'] for r in results], [a['challengeId'] for a in answers])
+        self.assertEqual((results[0]['correct'], results[0]['points']), (True, 10))
+        self.assertEqual((results[1]['correct'], results[1]['correctAnswer'], results[1]['points']), (False, None, 0))
+        self.assertEqual(results[2], {'challengeId': 999999, 'error': 'Challenge not found'})
+        self.assertTrue(all('ai_feedback' in r for r in results[3:]))
+
+        # Both COMPOSE answers were with the grader at the same time
+        self.assertEqual(self.backend.calls, 2)
+        self.assertEqual(self.backend.max_in_flight, 2)
+
+        recorded = set(AssessmentProgress.objects.filter(user=self.user, completed=True).values_list('challenge_id', flat=True))
+        expected = {r['challengeId'] for r in results if r.get('correct')}
+        self.assertEqual(recorded, expected)
+        self.assertIn(self.challenges['SPELL'].id, recorded)
+
+    def test_single_item_endpoints_wrap_the_batch(self):
+        spell = self.challenges['SPELL']
+        response = self.client.post(
+            '/api/games/assessment/validate-answer/', {'challengeId': spell.id, 'answer': "araw"}, format='json',
+        )
+        self.assertEqual(response.json(), {'correct': False, 'correctAnswer': "Ulan"})
+        self.assertFalse(AssessmentProgress.objects.exists())
+
+        response = self.client.post('/api/games/assessment/submit-challenge/', {'challengeId': spell.id}, format='json')
+        self.assertEqual(response.json(), {'success': True, 'points': 10})
+        self.assertTrue(AssessmentProgress.objects.get(user=self.user, challenge=spell).completed)
+
+        response = self.client.post('/api/games/assessment/submit-challenge/', {'challengeId': 999999}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejects_malformed_batches(self):
+        for body in [{}, {'answers': "x"}, {'answers': [1]}, {'answers': [{'challengeId': 1}] * 51}]:
+            response = self.client.post('/api/games/assessment/validate-answers/', body, format='json')
+            self.assertEqual(response.status_code, 400)
@@ -24,6 +24,9 @@ urlpatterns = [
     path('assessment/reduce-hearts/', views.reduce_hearts, name='reduce_hearts'),
     path('assessment/complete/', views.complete_assessment, name='complete_assessment'),
     path('assessment/validate-answer/', views.validate_challenge_answer, name='validate_answer'),
+    path('assessment/validate-answers/', views.validate_answers_batch, name='validate_answers'),
     path('assessment/reset/', views.reset_assessment, name='assessment-reset'),
     path('evaluate-compose/', views.evaluate_compose_answer, name='evaluate_compose'),
+    path('ai-evaluator/stats/', views.get_ai_evaluator_stats, name='ai_evaluator_stats'),
+    path('redis-pool/stats/', views.get_redis_pool_stats, name='redis_pool_stats'),
 ]
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+Analytics dashboard for one user, built from a fixed number of queries.
+
+Query budget (independent of how many GameProgress rows the user has):
+    1. progress snapshot        overview totals (see progress/snapshot.py;
+                                3 more queries the first time, to build it)
+    2. per game type            GROUP BY game type joined to Game, with
+                                conditional counts for perfect games and
+                                recent sessions, summed play time and the
+                                average score used for skill mastery
+    3. per progress row         scores, attempts and the hour/weekday played,
+                                joined to Game for names and types
+reduce_dashboard() then derives improvements, insights and activity from
+these rows in one pass, without touching the database.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from django.db.models import Avg, Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, ExtractWeekDay
+from django.utils import timezone
+
+from .models import GameProgress
+from .snapshot import get_snapshot
+
+SKILL_MAPPING = {
+    'spelling-challenge': 'spelling',
+    'punctuation-task': 'punctuation',
+    'grammar-check': 'grammar',
+    'parts-of-speech': 'grammar',
+    'word-association': 'vocabulary',
+    'emoji-challenge': 'sentenceConstruction',
+}
+
+SKILLS = ['spelling', 'punctuation', 'grammar', 'vocabulary', 'sentenceConstruction']
+
+WEEKDAY_NAMES = ['', 'Linggo', 'Lunes', 'Martes', 'Miyerkules', 'Huwebes', 'Biyernes', 'Sabado']
+
+ROW_FIELDS = [
+    'game_id', 'game__name', 'game__game_type',
+    'difficulty_1_score', 'difficulty_2_score', 'difficulty_3_score',
+    'difficulty_1_completed', 'difficulty_2_unlocked',
+    'attempts', 'stars_earned',
+]
+
+
+def game_type_totals(user, since):
+    """One row per game type the user has played (query 2)."""
+    return list(
+        GameProgress.objects.filter(user=user)
+        .values('game__game_type')
+        .annotate(
+            sessions=Count('id'),
+            perfect=Count('id', filter=Q(stars_earned=3)),
+            recent=Count('id', filter=Q(last_played__gte=since)),
+            total_time=Sum(F('difficulty_1_time_taken') + F('difficulty_2_time_taken') + F('difficulty_3_time_taken')),
+            average_total=Avg(F('difficulty_1_score') + F('difficulty_2_score') + F('difficulty_3_score')),
+        )
+        .order_by()
+    )
+
+
+def progress_rows(user):
+    """Every progress row, most recently played first (query 3)."""
+    return list(
+        GameProgress.objects.filter(user=user)
+        .annotate(hour=ExtractHour('last_played'), weekday=ExtractWeekDay('last_played'))
+        .values(*ROW_FIELDS, 'hour', 'weekday')
+    )
+
+
+def overview(user, snapshot):
+    entries = [entry for area_games in snapshot['games'].values() for entry in area_games.values()]
+
+    def average(field):
+        return sum(entry[field] for entry in entries) / len(entries) if entries else 0
+
+    return {
+        'overview': {
+            'totalGamesPlayed': len(entries),
+            'totalStarsEarned': sum(entry['stars_earned'] for entry in entries),
+            'areasUnlocked': sum(1 for area_games in snapshot['games'].values() if area_games),
+            'currentStreak': user.login_streak,
+            'longestStreak': user.longest_streak,
+        },
+        'averageScoreByDifficulty': {
+            'easy': round(average('difficulty_1_score'), 1),
+            'medium': round(average('difficulty_2_score'), 1),
+            'hard': round(average('difficulty_3_score'), 1),
+        },
+    }
+
+
+def improvement(row):
+    if row['attempts'] <= 1:
+        return None
+    best_score = max(row['difficulty_1_score'], row['difficulty_2_score'], row['difficulty_3_score'])
+    first_score = row['difficulty_1_score']
+    if first_score <= 0 or best_score <= first_score:
+        return None
+    return {
+        'game_id': row['game_id'],
+        'game_name': row['game__name'],
+        'first_attempt': first_score,
+        'best_score': best_score,
+        'improvement_percentage': round((best_score - first_score) / first_score * 100, 1),
+    }
+
+
+def skill_mastery(totals):
+    # Each game type counts once towards its skill, whatever its row count
+    sums = {skill: 0 for skill in SKILLS}
+    counts = {skill: 0 for skill in SKILLS}
+    for group in totals:
+        skill = SKILL_MAPPING.get(group['game__game_type'])
+        if skill:
+            sums[skill] += (group['average_total'] or 0) / 3
+            counts[skill] += 1
+    return {skill: round(sums[skill] / counts[skill], 1) if counts[skill] else 0 for skill in SKILLS}
+
+
+def game_insight(kind, icon, row, message, message_en):
+    return {
+        'type': kind,
+        'icon': icon,
+        'message': message.format(name=row['game__name']),
+        'message_en': message_en.format(name=row['game__name']),
+        'action': f"/student/challenges/games/{row['game__game_type']}",
+        'game_type': row['game__game_type'],
+    }
+
+
+def insights_for(user, rows, perfect_games):
+    insights = []
+
+    # min() keeps the most recently played row among ties
+    weakest = min(rows, key=lambda row: row['difficulty_1_score'], default=None)
+    if weakest and weakest['difficulty_1_score'] < 60:
+        insights.append(game_insight(
+            'improvement', '📈', weakest,
+            "Magpraktis pa sa {name} upang mapabuti ang iyong kasanayan!",
+            "Practice more {name} to improve your skills!",
+        ))
+
+    ready_for_upgrade = next((
+        row for row in rows
+        if row['difficulty_1_completed'] and row['difficulty_2_unlocked'] and row['difficulty_2_score'] == 0
+    ), None)
+    if ready_for_upgrade:
+        insights.append(game_insight(
+            'challenge', '🎯', ready_for_upgrade,
+            "Handa ka na para sa Medium difficulty sa {name}!",
+            "Ready to try Medium difficulty in {name}?",
+        ))
+
+    if getattr(user, 'login_streak', 0) >= 3:
+        insights.append({
+            'type': 'celebration',
+            'icon': '🔥',
+            'message': f"Ang galing! {user.login_streak} araw na sunod-sunod na pag-aaral!",
+            'message_en': f"Amazing! You're on a {user.login_streak}-day streak!",
+        })
+
+    low_practice = min(
+        (row for row in rows if row['attempts'] < 3 and row['stars_earned'] < 2),
+        key=lambda row: row['attempts'],
+        default=None,
+    )
+    if low_practice:
+        insights.append(game_insight(
+            'practice', '💪', low_practice,
+            "Subukan ulit ang {name} para makakuha ng mas mataas na score!",
+            "Try {name} again to get a higher score!",
+        ))
+
+    if perfect_games >= 5:
+        insights.append({
+            'type': 'achievement',
+            'icon': '🏆',
+            'message': f"Nakumpleto mo na ang {perfect_games} laro nang perpekto! Ikaw ay napakagaling!",
+            'message_en': f"You've mastered {perfect_games} games! You're doing amazing!",
+        })
+
+    return insights
+
+
+def time_analytics(rows, totals):
+    hourly = Counter(row['hour'] for row in rows).most_common()
+    daily = Counter(row['weekday'] for row in rows).most_common()
+    total_time = sum(group['total_time'] or 0 for group in totals)
+
+    return {
+        'peak_hour': hourly[0][0] if hourly else None,
+        'most_active_day': WEEKDAY_NAMES[daily[0][0]] if daily else None,
+        'total_sessions': sum(group['sessions'] for group in totals),
+        'total_time_minutes': round(total_time / 60, 1) if total_time else 0,
+        'recent_sessions': sum(group['recent'] for group in totals),
+        'activity_by_day': [
+            {'day': WEEKDAY_NAMES[weekday], 'count': count}
+            for weekday, count in daily[:7]
+        ],
+    }
+
+
+def reduce_dashboard(user, snapshot, totals, rows):
+    """Assemble the dashboard response from the fetched data (no queries)."""
+    improvements = [entry for entry in map(improvement, rows) if entry]
+    improvements.sort(key=lambda entry: entry['improvement_percentage'], reverse=True)
+    perfect_games = sum(group['perfect'] for group in totals)
+
+    return {
+        **overview(user, snapshot),
+        'scoreImprovement': improvements[:5],
+        'skillMastery': skill_mastery(totals),
+        'insights': insights_for(user, rows, perfect_games)[:4],
+        'timeAnalytics': time_analytics(rows, totals),
+    }
+
+
+def build_dashboard(user):
+    week_ago = timezone.now() - timedelta(days=7)
+    return reduce_dashboard(user, get_snapshot(user), game_type_totals(user, week_ago), progress_rows(user))
@@ -0,0 +1,197 @@
+"""
+Leaderboard engine backed by Redis sorted sets.
+
+Two ZSETs per (game, difficulty) scope:
+    leaderboard:<game_id>:<area_id>:<difficulty>   member "<user_id>"
+    leaderboard:<game_id>:all:<difficulty>         member "<user_id>:<area_id>"
+
+The area-less board mirrors the old endpoint, which ranked every
+GameProgress row of the game (one per user and area). Scores pack the best
+points and the time taken into one number (more points first, then the
+faster run), so top-K, rank and neighbour lookups are single ZREVRANGE /
+ZREVRANK calls.
+
+submit_game_score writes a user's new personal bests; the
+rebuild_leaderboards command backfills every board from GameProgress and
+marks them ready. Until then, or whenever Redis is unavailable, reads fall
+back to ordering GameProgress in the database.
+"""
+from django.db.models import F, Q
+
+from backend.redis_client import get_redis
+from .models import GameProgress
+from .serializers import LeaderboardEntrySerializer, progress_to_entry
+
+KEY_PREFIX = 'leaderboard'
+READY_KEY = f'{KEY_PREFIX}:ready'
+
+# Time is stored in tenths of a second; anything slower (or missing) ranks last
+TIME_SLOTS = 10 ** 7
+
+
+def board_key(game_id, difficulty, area_id=None):
+    scope = area_id if area_id is not None else 'all'
+    return f'{KEY_PREFIX}:{game_id}:{scope}:{difficulty}'
+
+
+def encode_score(points, time_taken):
+    """Higher is better: points first, then the shorter time."""
+    if time_taken is None:
+        tenths = TIME_SLOTS - 1
+    else:
+        tenths = min(max(int(round(time_taken * 10)), 0), TIME_SLOTS - 1)
+    return points * TIME_SLOTS + (TIME_SLOTS - 1 - tenths)
+
+
+def board_entries(progress, difficulty):
+    """(key, member, score, points) for both boards a progress row belongs to."""
+    points = getattr(progress, f'difficulty_{difficulty}_score')
+    time_taken = getattr(progress, f'difficulty_{difficulty}_time_taken')
+    score = encode_score(points, time_taken)
+    return [
+        (board_key(progress.game_id, difficulty, progress.area_id), str(progress.user_id), score, points),
+        (board_key(progress.game_id, difficulty), f'{progress.user_id}:{progress.area_id}', score, points),
+    ]
+
+
+def record_best(progress, difficulty):
+    """Store the row's best run for one difficulty on its boards."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for key, member, score, points in board_entries(progress, difficulty):
+            if points > 0:
+                pipe.zadd(key, {member: score})
+            else:
+                # Zero scores never appear on the leaderboard
+                pipe.zrem(key, member)
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Leaderboard update failed: {e}")
+
+
+def forget(user_id, area_id, game_id):
+    """Remove a deleted progress row from every board."""
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        pipe = redis.pipeline(transaction=False)
+        for difficulty in (1, 2, 3):
+            pipe.zrem(board_key(game_id, difficulty, area_id), str(user_id))
+            pipe.zrem(board_key(game_id, difficulty), f'{user_id}:{area_id}')
+        pipe.execute()
+    except Exception as e:
+        print(f"⚠️ Leaderboard cleanup failed: {e}")
+
+
+def _ready_redis():
+    """Redis client if the boards have been backfilled, else None."""
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        if not redis.exists(READY_KEY):
+            return None
+    except Exception as e:
+        print(f"⚠️ Leaderboard unavailable, using database: {e}")
+        return None
+    return redis
+
+
+def _parse_member(member, area_id):
+    if area_id is not None:
+        return int(member), int(area_id)
+    user_id, member_area_id = member.split(':')
+    return int(user_id), int(member_area_id)
+
+
+def _load_entries(pairs, game_id, difficulty):
+    """Entries for (user_id, area_id) pairs in the given order (one query)."""
+    if not pairs:
+        return []
+    user_ids = {user_id for user_id, _ in pairs}
+    area_ids = {area_id for _, area_id in pairs}
+    rows = {
+        (progress.user_id, progress.area_id): progress
+        for progress in GameProgress.objects.filter(
+            game_id=game_id, user_id__in=user_ids, area_id__in=area_ids
+        ).select_related('user')
+    }
+    return [
+        progress_to_entry(rows[pair], difficulty)
+        for pair in pairs
+        if pair in rows
+    ]
+
+
+def _ordered_queryset(game_filter, difficulty, area_id=None):
+    score_field = f"difficulty_{difficulty}_score"
+    time_field = f"difficulty_{difficulty}_time_taken"
+    qs = GameProgress.objects.filter(game_filter)
+    if area_id is not None:
+        qs = qs.filter(area_id=area_id)
+    # Missing times rank last, like they do in the Redis score
+    return qs.exclude(**{score_field: 0}).order_by(f"-{score_field}", F(time_field).asc(nulls_last=True))
+
+
+def top_entries(game_ids, difficulty, limit, area_id=None):
+    """Top `limit` leaderboard entries for one or more games."""
+    redis = _ready_redis() if len(game_ids) == 1 else None
+    if redis is not None:
+        game_id = game_ids[0]
+        try:
+            members = redis.zrevrange(board_key(game_id, difficulty, area_id), 0, limit - 1)
+            pairs = [_parse_member(member, area_id) for member in members]
+            return _load_entries(pairs, game_id, difficulty)
+        except Exception as e:
+            print(f"⚠️ Leaderboard read failed, using database: {e}")
+
+    qs = _ordered_queryset(Q(game_id__in=game_ids), difficulty, area_id)
+    return [
+        progress_to_entry(progress, difficulty)
+        for progress in qs.select_related('user')[:limit]
+    ]
+
+
+def standing(user_id, game_id, area_id, difficulty, radius=0):
+    """
+    The user's 1-based rank on an area board plus up to `radius` entries
+    on each side. Returns None when the user has no score there.
+    """
+    redis = _ready_redis()
+    if redis is not None:
+        key = board_key(game_id, difficulty, area_id)
+        try:
+            rank = redis.zrevrank(key, str(user_id))
+            if rank is None:
+                return None
+            start = max(rank - radius, 0)
+            members = redis.zrevrange(key, start, rank + radius)
+            pairs = [(int(member), int(area_id)) for member in members]
+            return _standing(rank, start, _load_entries(pairs, game_id, difficulty))
+        except Exception as e:
+            print(f"⚠️ Leaderboard read failed, using database: {e}")
+
+    qs = _ordered_queryset(Q(game_id=game_id), difficulty, area_id)
+    ordered_user_ids = list(qs.values_list('user_id', flat=True))
+    if user_id not in ordered_user_ids:
+        return None
+    rank = ordered_user_ids.index(user_id)
+    start = max(rank - radius, 0)
+    return _standing(rank, start, [
+        progress_to_entry(progress, difficulty)
+        for progress in qs.select_related('user')[start:rank + radius + 1]
+    ])
+
+
+def _standing(rank, start, entries):
+    return {
+        'rank': rank + 1,
+        'neighbours': [
+            {'rank': start + offset + 1, **LeaderboardEntrySerializer(entry).data}
+            for offset, entry in enumerate(entries)
+        ],
+    }
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.redis_client import get_redis
+from progress.leaderboard import KEY_PREFIX, READY_KEY, board_entries
+from progress.models import GameProgress
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis leaderboards from GameProgress'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        redis = get_redis()
+        if redis is None:
+            raise CommandError('❌ Redis is not available (check REDIS_URL)')
+
+        # Readers fall back to the database while the boards are rebuilt
+        redis.delete(READY_KEY)
+        stale = list(redis.scan_iter(match=f'{KEY_PREFIX}:*', count=500))
+        if stale:
+            redis.delete(*stale)
+        self.stdout.write(f'🧹 Cleared {len(stale)} leaderboard keys')
+
+        rows = GameProgress.objects.only(
+            'user_id', 'area_id', 'game_id',
+            'difficulty_1_score', 'difficulty_1_time_taken',
+            'difficulty_2_score', 'difficulty_2_time_taken',
+            'difficulty_3_score', 'difficulty_3_time_taken',
+        ).order_by('id')
+
+        pipe = redis.pipeline(transaction=False)
+        written = 0
+        for progress in rows.iterator(chunk_size=options['batch_size']):
+            for difficulty in (1, 2, 3):
+                for key, member, score, points in board_entries(progress, difficulty):
+                    if points > 0:
+                        pipe.zadd(key, {member: score})
+                        written += 1
+            if len(pipe) >= options['batch_size']:
+                pipe.execute()
+        pipe.execute()
+
+        redis.set(READY_KEY, 1)
+        self.stdout.write(self.style.SUCCESS(f'✅ Wrote {written} leaderboard entries'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from progress.snapshot import rebuild_snapshot, verify_snapshot
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or verify) per-user progress snapshots from GameProgress / AssessmentResult'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help='Only this user id')
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report snapshots that differ from the source tables without rewriting them',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(id=options['user'])
+
+        checked = 0
+        out_of_sync = 0
+        for user in users.iterator():
+            checked += 1
+            if options['verify']:
+                problems = verify_snapshot(user)
+                if problems:
+                    out_of_sync += 1
+                    self.stdout.write(self.style.WARNING(f'⚠️ {user.email}:'))
+                    for problem in problems:
+                        self.stdout.write(f'   {problem}')
+            else:
+                rebuild_snapshot(user.id)
+
+        if options['verify']:
+            style = self.style.SUCCESS if out_of_sync == 0 else self.style.ERROR
+            self.stdout.write(style(f'{"✅" if out_of_sync == 0 else "❌"} {out_of_sync}/{checked} snapshots out of sync'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {checked} progress snapshots'))
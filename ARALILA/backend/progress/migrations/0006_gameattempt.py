@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0005_assessmentchallenge_correct_answer_and_more'),
+        ('progress', '0005_progresssnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('difficulty', models.PositiveSmallIntegerField()),
+                ('raw_points', models.IntegerField(default=0)),
+                ('percent_score', models.FloatField(default=0.0)),
+                ('time_taken', models.FloatField(blank=True, help_text='Time in seconds', null=True)),
+                ('passed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='games.area')),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='games.game')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='game_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', 'created_at'], name='progress_ga_user_id_2c8c17_idx'), models.Index(fields=['user', 'game', 'created_at'], name='progress_ga_user_id_a43501_idx')],
+            },
+        ),
+    ]
@@ -67,6 +67,33 @@ class GameProgress(models.Model):
         return False
 
 
+class GameAttempt(models.Model):
+    """Append-only log of every submitted game run (GameProgress keeps only the bests)."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="game_attempts"
+    )
+    area = models.ForeignKey(Area, on_delete=models.CASCADE)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE)
+    difficulty = models.PositiveSmallIntegerField()  # 1 = Easy, 2 = Medium, 3 = Hard
+    raw_points = models.IntegerField(default=0)
+    percent_score = models.FloatField(default=0.0)
+    time_taken = models.FloatField(null=True, blank=True, help_text="Time in seconds")
+    passed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['user', 'game', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.game.name} (D{self.difficulty}) - {self.percent_score}%"
+
+
 # Optional: Gamification badges/achievements
 class Badge(models.Model):
     name = models.CharField(max_length=100)
@@ -101,4 +128,20 @@ class MultiplayerStats(models.Model):
     total_score = models.IntegerField(default=0)
 
     def __str__(self):
-        return f"{self.user.email} Multiplayer Stats"
\ No newline at end of file
+        return f"{self.user.email} Multiplayer Stats"
+
+class ProgressSnapshot(models.Model):
+    """
+    Denormalized per-user view of GameProgress rows and passed assessments,
+    kept up to date incrementally (see progress/snapshot.py).
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="progress_snapshot"
+    )
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.email} Progress Snapshot"
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import leaderboard
+from .models import GameProgress
+from .snapshot import forget_progress
+
+
+@receiver(post_delete, sender=GameProgress)
+def drop_progress_from_snapshot(sender, instance, **kwargs):
+    """Keep snapshots in sync when progress rows go away (e.g. game/area deleted)."""
+    forget_progress(instance.user_id, instance.area_id, instance.game_id)
+
+
+@receiver(post_delete, sender=GameProgress)
+def drop_progress_from_leaderboards(sender, instance, **kwargs):
+    leaderboard.forget(instance.user_id, instance.area_id, instance.game_id)
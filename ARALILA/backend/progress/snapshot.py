@@ -0,0 +1,159 @@
+"""
+Per-user progress snapshot.
+
+One JSON row per user mirrors the user's GameProgress rows and passed
+assessments so read endpoints don't have to re-derive them:
+
+    {
+        "games": {
+            "<area_id>": {
+                "<game_id>": {"stars_earned": 2, "difficulty_1_score": 90, ...}
+            }
+        },
+        "passed_areas": [1, 2]
+    }
+
+Entries use the GameProgress column names, so callers read them exactly like
+a `.values()` row. Writers (submit_game_score, complete_assessment,
+reset_assessment, question endpoint get_or_create) update the snapshot
+incrementally; `rebuild_progress_snapshots` rebuilds and verifies it from
+the source tables.
+"""
+from django.db import transaction
+
+from games.models import AssessmentResult
+from .models import GameProgress, ProgressSnapshot
+
+SNAPSHOT_FIELDS = [
+    'stars_earned',
+    'difficulty_1_score',
+    'difficulty_1_completed',
+    'difficulty_1_time_taken',
+    'difficulty_2_score',
+    'difficulty_2_completed',
+    'difficulty_2_unlocked',
+    'difficulty_2_time_taken',
+    'difficulty_3_score',
+    'difficulty_3_completed',
+    'difficulty_3_unlocked',
+    'difficulty_3_time_taken',
+    'attempts',
+]
+
+
+def progress_entry(progress):
+    """Snapshot entry for a GameProgress instance."""
+    return {field: getattr(progress, field) for field in SNAPSHOT_FIELDS}
+
+
+def build_snapshot_data(user_id):
+    """Derive snapshot data from GameProgress / AssessmentResult (2 queries)."""
+    games = {}
+    for row in GameProgress.objects.filter(user_id=user_id).values(
+        'area_id', 'game_id', *SNAPSHOT_FIELDS
+    ).order_by():
+        area_id = str(row.pop('area_id'))
+        game_id = str(row.pop('game_id'))
+        games.setdefault(area_id, {})[game_id] = row
+
+    passed_areas = sorted(
+        AssessmentResult.objects.filter(user_id=user_id, passed=True)
+        .values_list('area_id', flat=True)
+    )
+
+    return {'games': games, 'passed_areas': passed_areas}
+
+
+def rebuild_snapshot(user_id):
+    data = build_snapshot_data(user_id)
+    ProgressSnapshot.objects.update_or_create(user_id=user_id, defaults={'data': data})
+    return data
+
+
+def get_snapshot(user):
+    """Snapshot data for user (one query; rebuilt from source if missing)."""
+    snapshot = ProgressSnapshot.objects.filter(user_id=user.id).values_list('data', flat=True).first()
+    if snapshot is None:
+        return rebuild_snapshot(user.id)
+    return snapshot
+
+
+def area_progress(snapshot, area_id):
+    """{game_id: entry} for one area, with int game ids."""
+    return {
+        int(game_id): entry
+        for game_id, entry in snapshot['games'].get(str(area_id), {}).items()
+    }
+
+
+def _update_snapshot(user_id, mutate, create=True):
+    with transaction.atomic():
+        snapshot = ProgressSnapshot.objects.select_for_update().filter(user_id=user_id).first()
+        if snapshot is None:
+            # First write for this user: source tables already hold the change
+            if create:
+                rebuild_snapshot(user_id)
+            return
+        mutate(snapshot.data)
+        snapshot.save(update_fields=['data', 'updated_at'])
+
+
+def record_progress(progress):
+    """Store the current state of a GameProgress row in its user's snapshot."""
+    def mutate(data):
+        area_games = data.setdefault('games', {}).setdefault(str(progress.area_id), {})
+        area_games[str(progress.game_id)] = progress_entry(progress)
+
+    _update_snapshot(progress.user_id, mutate)
+
+
+def forget_progress(user_id, area_id, game_id):
+    """Drop a deleted GameProgress row (never creates a snapshot)."""
+    def mutate(data):
+        area_games = data.setdefault('games', {}).get(str(area_id), {})
+        area_games.pop(str(game_id), None)
+
+    _update_snapshot(user_id, mutate, create=False)
+
+
+def record_assessment(user, area_id, passed):
+    """Mark an area's assessment as passed (or cleared) in the snapshot."""
+    def mutate(data):
+        passed_areas = set(data.get('passed_areas', []))
+        if passed:
+            passed_areas.add(area_id)
+        else:
+            passed_areas.discard(area_id)
+        data['passed_areas'] = sorted(passed_areas)
+
+    _update_snapshot(user.id, mutate)
+
+
+def verify_snapshot(user):
+    """
+    Compare the stored snapshot with the source tables.
+    Returns a list of human-readable differences (empty when in sync).
+    """
+    stored = ProgressSnapshot.objects.filter(user_id=user.id).values_list('data', flat=True).first()
+    if stored is None:
+        return ['snapshot missing']
+
+    expected = build_snapshot_data(user.id)
+    problems = []
+
+    if sorted(stored.get('passed_areas', [])) != expected['passed_areas']:
+        problems.append(
+            f"passed_areas: stored {stored.get('passed_areas', [])} != source {expected['passed_areas']}"
+        )
+
+    stored_games = stored.get('games', {})
+    for area_id in sorted(set(stored_games) | set(expected['games'])):
+        stored_area = stored_games.get(area_id, {})
+        expected_area = expected['games'].get(area_id, {})
+        for game_id in sorted(set(stored_area) | set(expected_area)):
+            if stored_area.get(game_id) != expected_area.get(game_id):
+                problems.append(
+                    f"area {area_id} game {game_id}: stored {stored_area.get(game_id)} != source {expected_area.get(game_id)}"
+                )
+
+    return problems
@@ -1,3 +1,91 @@
+from datetime import timedelta
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from games.models import Area, Game
+from users.models import CustomUser
+from .models import GameProgress
+from .snapshot import rebuild_snapshot
+
+GAME_TYPES = [
+    'spelling-challenge', 'punctuation-task', 'parts-of-speech',
+    'word-association', 'emoji-challenge', 'grammar-check',
+]
+
+
+class AnalyticsDashboardTests(TestCase):
+    """The dashboard stays within its query budget (see progress/dashboard.py)."""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create(email="dashboard@example.com", login_streak=4)
+        self.games = [Game.objects.create(name=game_type.title(), game_type=game_type) for game_type in GAME_TYPES]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_progress(self, count):
+        """`count` progress rows spread over as many areas as needed."""
+        areas = Area.objects.bulk_create(
+            [Area(name=f"Area {n}", order_index=n) for n in range(count // len(self.games) + 1)]
+        )
+        rows = []
+        for n in range(count):
+            area, game = areas[n // len(self.games)], self.games[n % len(self.games)]
+            rows.append(GameProgress(
+                user=self.user, area=area, game=game,
+                stars_earned=n % 4,
+                attempts=n % 5,
+                difficulty_1_score=20 + n % 60,
+                difficulty_1_completed=True,
+                difficulty_1_time_taken=30.0,
+                difficulty_2_score=(40 + n % 50) if n % 3 else 0,
+                difficulty_2_unlocked=True,
+                difficulty_3_score=n % 90,
+            ))
+        GameProgress.objects.bulk_create(rows)
+        rebuild_snapshot(self.user.id)
+
+    def dashboard(self):
+        response = self.client.get('/api/progress/analytics/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_budget_with_500_progress_rows(self):
+        self.add_progress(500)
+
+        # snapshot, per game type totals, progress rows
+        with self.assertNumQueries(3):
+            data = self.dashboard()
+
+        self.assertEqual(data['overview']['totalGamesPlayed'], 500)
+        self.assertEqual(data['timeAnalytics']['total_sessions'], 500)
+        self.assertEqual(data['timeAnalytics']['recent_sessions'], 500)
+        self.assertEqual(data['timeAnalytics']['total_time_minutes'], 250.0)
+        self.assertEqual(len(data['scoreImprovement']), 5)
+        self.assertEqual(set(data['skillMastery']), {'spelling', 'punctuation', 'grammar', 'vocabulary', 'sentenceConstruction'})
+        self.assertEqual([insight['type'] for insight in data['insights']], ['improvement', 'challenge', 'celebration', 'practice'])
+
+    def test_reducer_matches_the_rows(self):
+        area = Area.objects.create(name="Gubat")
+        spelling, punctuation = self.games[0], self.games[1]
+        GameProgress.objects.create(
+            user=self.user, area=area, game=spelling, attempts=3, stars_earned=3,
+            difficulty_1_score=50, difficulty_2_score=80, difficulty_3_score=20,
+        )
+        old = GameProgress.objects.create(
+            user=self.user, area=area, game=punctuation, attempts=1, stars_earned=1, difficulty_1_score=90,
+        )
+        GameProgress.objects.filter(id=old.id).update(last_played=timezone.now() - timedelta(days=10))
 
-# Create your tests here.
+        data = self.dashboard()
+        self.assertEqual(data['scoreImprovement'], [{
+            'game_id': spelling.id, 'game_name': spelling.name,
+            'first_attempt': 50, 'best_score': 80, 'improvement_percentage': 60.0,
+        }])
+        self.assertEqual(data['skillMastery']['spelling'], 50.0)
+        self.assertEqual(data['skillMastery']['punctuation'], 30.0)
+        self.assertEqual(data['skillMastery']['grammar'], 0)
+        self.assertEqual(data['timeAnalytics']['recent_sessions'], 1)
+        self.assertEqual(data['insights'][0]['game_type'], 'spelling-challenge')
+        self.assertEqual(data['insights'][-1]['message_en'], f"Try {punctuation.name} again to get a higher score!")
@@ -0,0 +1,122 @@
+"""
+Score trends built from the GameAttempt log.
+
+Two shapes are served by get_improvement_trends:
+    buckets   - attempts grouped per day/week in SQL (one GROUP BY query)
+    attempts  - the raw log, oldest first, keyset-paginated on id so deep
+                pages cost the same as the first one
+"""
+from django.db.models import Avg, Count, Max
+from django.db.models.functions import TruncDate, TruncWeek
+
+from .models import GameAttempt
+
+BUCKETS = {
+    'day': TruncDate,
+    'week': TruncWeek,
+}
+
+DIFFICULTY_KEYS = {1: 'easy', 2: 'medium', 3: 'hard'}
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+def bucketed_trends(user, bucket='day', game_id=None):
+    """
+    Per-bucket trend rows, oldest first.
+
+    With game_id: best raw points per difficulty in each bucket (the old
+    easy/medium/hard shape). Without: best raw points and average percent
+    across all games.
+    """
+    truncate = BUCKETS[bucket]
+    attempts = GameAttempt.objects.filter(user=user)
+
+    if game_id:
+        rows = attempts.filter(game_id=game_id).annotate(
+            bucket=truncate('created_at')
+        ).values('bucket', 'difficulty').annotate(
+            best=Max('raw_points'),
+            count=Count('id'),
+        ).order_by('bucket', 'difficulty')
+
+        trend_data = []
+        for row in rows:
+            date = row['bucket'].strftime('%Y-%m-%d')
+            if not trend_data or trend_data[-1]['date'] != date:
+                trend_data.append({'date': date, 'easy': 0, 'medium': 0, 'hard': 0, 'attempts': 0})
+            entry = trend_data[-1]
+            key = DIFFICULTY_KEYS.get(row['difficulty'])
+            if key:
+                entry[key] = row['best']
+            entry['attempts'] += row['count']
+        return trend_data
+
+    rows = attempts.annotate(
+        bucket=truncate('created_at')
+    ).values('bucket').annotate(
+        best=Max('raw_points'),
+        average=Avg('percent_score'),
+        count=Count('id'),
+        games=Count('game_id', distinct=True),
+    ).order_by('bucket')
+
+    return [
+        {
+            'date': row['bucket'].strftime('%Y-%m-%d'),
+            'score': row['best'],
+            'average_percent': round(row['average'] or 0, 1),
+            'attempts': row['count'],
+            'games': row['games'],
+        }
+        for row in rows
+    ]
+
+
+def attempt_page(user, after=None, limit=DEFAULT_PAGE_SIZE, game_id=None):
+    """
+    One page of the raw attempt log (oldest first).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    attempts = GameAttempt.objects.filter(user=user)
+    if game_id:
+        attempts = attempts.filter(game_id=game_id)
+    if after is not None:
+        attempts = attempts.filter(id__gt=after)
+
+    rows = list(
+        attempts.order_by('id').values(
+            'id',
+            'created_at',
+            'game_id',
+            'game__name',
+            'area_id',
+            'difficulty',
+            'raw_points',
+            'percent_score',
+            'time_taken',
+            'passed',
+        )[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]['id']
+
+    return [
+        {
+            'id': row['id'],
+            'date': row['created_at'].isoformat(),
+            'game_id': row['game_id'],
+            'game': row['game__name'],
+            'area_id': row['area_id'],
+            'difficulty': row['difficulty'],
+            'raw_points': row['raw_points'],
+            'percent_score': row['percent_score'],
+            'time_taken': row['time_taken'],
+            'passed': row['passed'],
+        }
+        for row in rows
+    ], next_cursor
@@ -0,0 +1,102 @@
+"""
+Daily activity pipeline.
+
+The first authenticated request of the day emits `daily_activity` for the
+user; `apply_daily_activity` consumes it and advances both streak counters
+(ls_points for login days, login_streak/longest_streak for active days) and
+awards streak badges in one conditional UPDATE. Badge rows left in the
+legacy "list of ids" format are normalised on the way; the
+`backfill_badges` command does the same for every user in bulk.
+"""
+from datetime import date, timedelta
+
+from django.dispatch import Signal, receiver
+
+from .models import CustomUser
+
+# Sent with user=<CustomUser>, day=<date>
+daily_activity = Signal()
+
+BADGES_BY_STREAK = {
+    3: "1",
+    5: "2",
+    30: "3",
+    100: "4",
+    200: "5",
+}
+
+
+def next_streak(last_day, streak, day):
+    """Streak length after activity on `day`, given the previous active day."""
+    if last_day == day:
+        return streak
+    if last_day == day - timedelta(days=1):
+        # Consecutive day → +1
+        return streak + 1
+    # First activity ever or missed a day → reset
+    return 1
+
+
+def award_streak_badges(badges, ls_points):
+    """
+    Badge list in dict form with every badge earned by `ls_points`.
+    Returns (badges, changed).
+    """
+    # Convert old list of badge IDs to dict format if needed
+    normalised = [
+        {"id": b, "status": "unclaimed"} if isinstance(b, str) else b
+        for b in (badges or [])
+    ]
+    changed = normalised != (badges or [])
+
+    existing_badge_ids = {b["id"] for b in normalised}
+    for streak, badge_id in BADGES_BY_STREAK.items():
+        if ls_points >= streak and badge_id not in existing_badge_ids:
+            normalised.append({"id": badge_id, "status": "unclaimed"})
+            changed = True
+    return normalised, changed
+
+
+def emit_daily_activity(user, today=None):
+    """Send `daily_activity` unless the user was already counted today."""
+    today = today or date.today()
+    if user.last_login_date != today or user.last_active_date != today:
+        daily_activity.send(sender=CustomUser, user=user, day=today)
+    return user
+
+
+@receiver(daily_activity)
+def apply_daily_activity(sender, user, day, **kwargs):
+    """
+    Single UPDATE guarded on the dates we read, so concurrent first requests
+    of the day only count once; the loser reloads the winner's row.
+    """
+    previous_login, previous_active = user.last_login_date, user.last_active_date
+
+    ls_points = next_streak(previous_login, user.ls_points, day)
+    login_streak = next_streak(previous_active, user.login_streak, day)
+    longest_streak = max(user.longest_streak, login_streak)
+    badges, _ = award_streak_badges(user.collected_badges, ls_points)
+
+    updated = CustomUser.objects.filter(
+        pk=user.pk,
+        last_login_date=previous_login,
+        last_active_date=previous_active,
+    ).update(
+        ls_points=ls_points,
+        login_streak=login_streak,
+        longest_streak=longest_streak,
+        collected_badges=badges,
+        last_login_date=day,
+        last_active_date=day,
+    )
+
+    if updated:
+        user.ls_points = ls_points
+        user.login_streak = login_streak
+        user.longest_streak = longest_streak
+        user.collected_badges = badges
+        user.last_login_date = day
+        user.last_active_date = day
+    else:
+        user.refresh_from_db()
@@ -0,0 +1,50 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.activity import award_streak_badges
+from users.models import CustomUser
+from users.supabase_auth import user_cache_key
+
+
+class Command(BaseCommand):
+    help = 'Award missing login-streak badges and convert legacy badge ids for all users'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the users that would change without writing',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(CustomUser.objects.order_by('id').values_list('id', flat=True))
+
+        checked = 0
+        changed = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            with transaction.atomic():
+                # Lock the batch so a concurrent badge claim isn't overwritten
+                users = list(
+                    CustomUser.objects.filter(id__in=batch)
+                    .select_for_update()
+                    .only('id', 'ls_points', 'collected_badges')
+                )
+                to_update = []
+                for user in users:
+                    badges, updated = award_streak_badges(user.collected_badges, user.ls_points)
+                    if updated:
+                        user.collected_badges = badges
+                        to_update.append(user)
+
+                checked += len(users)
+                changed += len(to_update)
+                if to_update and not options['dry_run']:
+                    CustomUser.objects.bulk_update(to_update, ['collected_badges'])
+                    cache.delete_many([user_cache_key(user.pk) for user in to_update])
+
+        verb = 'Would update' if options['dry_run'] else 'Updated'
+        self.stdout.write(self.style.SUCCESS(f'✅ {verb} badges for {changed}/{checked} users'))
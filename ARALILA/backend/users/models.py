@@ -2,6 +2,10 @@ from django.db import models
 import random
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin 
 from django.utils import timezone 
+from datetime import timedelta
+
+MAX_HEARTS = 3
+HEART_REFILL_INTERVAL = timedelta(minutes=5)
 
 class ProfilePicEnum(models.TextChoices):
     AVATAR1 = '/images/bear.png', 'Avatar 1'
@@ -68,36 +72,56 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             self.profile_pic = random.choice(list(ProfilePicEnum.values))
         super().save(*args, **kwargs)
 
+    def heart_state(self, now=None):
+        """
+        (hearts, next_refill_at) right now, derived from the stored pair:
+        current_hearts is the count as of one refill interval before
+        next_refill_at, and a heart comes back every interval after that.
+        """
+        now = now or timezone.now()
+        hearts, due = self.current_hearts, self.next_refill_at
+
+        if hearts >= MAX_HEARTS:
+            return MAX_HEARTS, None
+        if due is None or now < due:
+            return hearts, due
+
+        gained = 1 + (now - due) // HEART_REFILL_INTERVAL
+        hearts = min(hearts + gained, MAX_HEARTS)
+        return hearts, (due + gained * HEART_REFILL_INTERVAL if hearts < MAX_HEARTS else None)
+
     def refill_hearts_if_needed(self):
-        """Incrementally refill hearts every 5 minutes"""
-        from datetime import timedelta
-        
-        if self.current_hearts >= 3:
-            self.next_refill_at = None
-            return
-        
-        if self.next_refill_at and timezone.now() >= self.next_refill_at:
-            self.current_hearts = min(self.current_hearts + 1, 3)
-            
-            if self.current_hearts < 3:
-                self.next_refill_at = timezone.now() + timedelta(minutes=5)
-            else:
-                self.next_refill_at = None
-            
-            self.save()
+        """Bring current_hearts/next_refill_at up to date in memory (no write)"""
+        self.current_hearts, self.next_refill_at = self.heart_state()
+
+    def lose_heart(self):
+        """
+        Take one heart with a conditional UPDATE on the stored pair, retrying
+        if another request changed it first. Returns False if none are left.
+        """
+        from .supabase_auth import forget_cached_user
+
+        while True:
+            now = timezone.now()
+            hearts, due = self.heart_state(now)
+            if hearts <= 0:
+                return False
+
+            # Losing the first heart starts the refill timer
+            next_refill_at = due or now + HEART_REFILL_INTERVAL
+            updated = CustomUser.objects.filter(
+                pk=self.pk,
+                current_hearts=self.current_hearts,
+                next_refill_at=self.next_refill_at,
+            ).update(current_hearts=hearts - 1, next_refill_at=next_refill_at)
+
+            if updated:
+                self.current_hearts, self.next_refill_at = hearts - 1, next_refill_at
+                forget_cached_user(self.pk)
+                return True
+            self.refresh_from_db(fields=['current_hearts', 'next_refill_at'])
     
     def update_streak(self):
-        from datetime import date, timedelta
-        today = date.today()
-        
-        if self.last_active_date == today:
-            return 
-        
-        if self.last_active_date == today - timedelta(days=1):
-            self.login_streak += 1 
-        else:
-            self.login_streak = 1  
-        
-        self.longest_streak = max(self.longest_streak, self.login_streak)
-        self.last_active_date = today
-        self.save()
\ No newline at end of file
+        """Count today's activity (see users/activity.py)."""
+        from .activity import emit_daily_activity
+        emit_daily_activity(self)
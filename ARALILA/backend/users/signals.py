@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .activity import daily_activity
+from .models import CustomUser
+from .supabase_auth import forget_cached_user
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    # Authentication serves request.user from a short-lived cache
+    forget_cached_user(instance.pk)
+
+
+@receiver(daily_activity)
+def drop_cached_user_after_activity(sender, user, **kwargs):
+    # apply_daily_activity writes with update(), which skips post_save
+    forget_cached_user(user.pk)
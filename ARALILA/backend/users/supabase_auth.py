@@ -1,110 +1,127 @@
 import os
+import time
+import hashlib
 import jwt
+from django.core.cache import cache
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from .models import CustomUser
-from datetime import date, timedelta
+from .activity import emit_daily_activity
+from datetime import date
+
+# Verified token -> user id, kept until the token expires
+TOKEN_CACHE_KEY = 'auth:token:{digest}'
+# User rows are only cached briefly; every save() drops the entry (users/signals.py)
+USER_CACHE_KEY = 'auth:user:{user_id}'
+USER_CACHE_TIMEOUT = 60
+
+
+def token_cache_key(token):
+    return TOKEN_CACHE_KEY.format(digest=hashlib.sha256(token.encode()).hexdigest())
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id=user_id)
+
+
+def cache_user(user):
+    try:
+        cache.set(user_cache_key(user.pk), user, timeout=USER_CACHE_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Could not cache user {user.pk}: {e}")
+
+
+def forget_cached_user(user_id):
+    try:
+        cache.delete(user_cache_key(user_id))
+    except Exception as e:
+        print(f"⚠️ Could not drop cached user {user_id}: {e}")
+
+
+def get_cached_user(user_id):
+    try:
+        user = cache.get(user_cache_key(user_id))
+    except Exception:
+        user = None
+    if user is None:
+        user = CustomUser.objects.get(pk=user_id)
+        cache_user(user)
+    return user
+
+
+def sync_profile(payload):
+    """
+    Get or create the user for a freshly verified token and copy over
+    changed name/email claims with a single UPDATE (no write if unchanged).
+    """
+    user_metadata = payload.get('user_metadata', {})
+    profile = {
+        'email': payload.get('email'),
+        'first_name': user_metadata.get('first_name', ''),
+        'last_name': user_metadata.get('last_name', ''),
+    }
+
+    user, created = CustomUser.objects.get_or_create(
+        supabase_user_id=payload.get('sub'),
+        defaults={**profile, 'school_name': user_metadata.get('school_name', '')},
+    )
+
+    if not created:
+        changes = {field: value for field, value in profile.items() if getattr(user, field) != value}
+        if changes:
+            CustomUser.objects.filter(pk=user.pk).update(**changes)
+            for field, value in changes.items():
+                setattr(user, field, value)
+            forget_cached_user(user.pk)
+
+    return user
+
 
 class SupabaseAuthentication(BaseAuthentication):
 
     def authenticate(self, request):
         auth_header = request.headers.get('Authorization')
-        
+
         if not auth_header or not auth_header.startswith('Bearer '):
             return None
-        
+
         token = auth_header.split(' ')[1]
+        key = token_cache_key(token)
 
         try:
-            payload = jwt.decode(
-                token,
-                os.getenv('SUPABASE_JWT_SECRET'),
-                algorithms=['HS256'],
-                audience='authenticated',
-                leeway=300
-            )
-            
-            user_id = payload.get('sub')
-            email = payload.get('email')
-            user_metadata = payload.get('user_metadata', {})
-
-            user, created = CustomUser.objects.get_or_create(
-                supabase_user_id=user_id,
-                defaults={
-                    'email': email,
-                    'first_name': user_metadata.get('first_name', ''),
-                    'last_name': user_metadata.get('last_name', ''),
-                    'school_name': user_metadata.get('school_name', ''),
-                }
-            )
-
-            # ---- UPDATE NAME INFO IF CHANGED ----
-            if not created:
-                updated = False
-                if user.email != email:
-                    user.email = email
-                    updated = True
-                if user.first_name != user_metadata.get('first_name', ''):
-                    user.first_name = user_metadata.get('first_name', '')
-                    updated = True
-                if user.last_name != user_metadata.get('last_name', ''):
-                    user.last_name = user_metadata.get('last_name', '')
-                    updated = True
-                
-                if updated:
-                    user.save()
-
-            # ---- LOGIN STREAK LOGIC ----
-            today = date.today()
-            new_streak = False
-
-            if user.last_login_date is None:
-                # First login ever
-                user.ls_points = 1
-                new_streak = True
+            try:
+                user_id = cache.get(key)
+            except Exception:
+                user_id = None
+
+            if user_id is not None:
+                try:
+                    user = get_cached_user(user_id)
+                except CustomUser.DoesNotExist:
+                    cache.delete(key)
+                    raise AuthenticationFailed('User not found')
             else:
-                # Check streak
-                if user.last_login_date == today - timedelta(days=1):
-                    # Consecutive day → +1 point
-                    user.ls_points += 1
-                    new_streak = True
-                elif user.last_login_date == today:
-                    # Same-day login → do nothing
-                    new_streak = False
-                else:
-                    # Missed a day → reset streak
-                    user.ls_points = 1
-                    new_streak = True
-
-            # Update login date
-            user.last_login_date = today
-
-            # ---- COLLECT BADGES BASED ON LOGIN STREAK ----
-            badges_by_streak = {
-                3: "1",
-                5: "2",
-                30: "3",
-                100: "4",
-                200: "5",
-            }
-
-            if new_streak:
-                # Ensure collected_badges is a list of dicts
-                if not user.collected_badges:
-                    user.collected_badges = []
-
-                # Convert old list of badge IDs to dict format if needed
-                for i, b in enumerate(user.collected_badges):
-                    if isinstance(b, str):
-                        user.collected_badges[i] = {"id": b, "status": "unclaimed"}
-
-                existing_badge_ids = [b["id"] for b in user.collected_badges]
-
-                for streak, badge_id in badges_by_streak.items():
-                    if user.ls_points >= streak and badge_id not in existing_badge_ids:
-                        user.collected_badges.append({"id": badge_id, "status": "unclaimed"})
-            user.save()
+                payload = jwt.decode(
+                    token,
+                    os.getenv('SUPABASE_JWT_SECRET'),
+                    algorithms=['HS256'],
+                    audience='authenticated',
+                    leeway=300
+                )
+                user = sync_profile(payload)
+
+                expires_in = int(payload.get('exp', 0) - time.time())
+                if expires_in > 0:
+                    try:
+                        cache.set(key, user.pk, timeout=expires_in)
+                    except Exception as e:
+                        print(f"⚠️ Could not cache token for user {user.pk}: {e}")
+                cache_user(user)
 
+            today = date.today()
+            if user.last_login_date != today or user.last_active_date != today:
+                emit_daily_activity(user, today)
+                cache_user(user)
 
             # ---- RETURN USER ----
             return (user, None)
@@ -113,5 +130,7 @@ class SupabaseAuthentication(BaseAuthentication):
             raise AuthenticationFailed('Token has expired')
         except jwt.InvalidTokenError:
             raise AuthenticationFailed('Invalid token')
+        except AuthenticationFailed:
+            raise
         except Exception as e:
             raise AuthenticationFailed(f'Authentication failed: {str(e)}')
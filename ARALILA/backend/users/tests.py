@@ -1,3 +1,195 @@
+import os
+import time
+from io import StringIO
+from datetime import date, timedelta
+from unittest import mock
+
+import jwt
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import CustomUser, HEART_REFILL_INTERVAL
+from .activity import emit_daily_activity
+from .supabase_auth import get_cached_user
+
+JWT_SECRET = 'test-supabase-jwt-secret-0123456789abcdef'
+
+
+def make_token(sub='supabase-user-1', email='bata@example.com', first_name='Juan', ttl=3600):
+    return jwt.encode({
+        'sub': sub,
+        'email': email,
+        'aud': 'authenticated',
+        'exp': int(time.time()) + ttl,
+        'user_metadata': {'first_name': first_name, 'last_name': 'Dela Cruz'},
+    }, JWT_SECRET, algorithm='HS256')
+
+
+def is_write(query):
+    return query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+
+
+@mock.patch.dict(os.environ, {'SUPABASE_JWT_SECRET': JWT_SECRET})
+class SupabaseAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get_badges(self, token):
+        return self.client.get('/api/users/badges/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_repeat_requests_do_not_touch_the_database(self):
+        token = make_token()
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.get_badges(token).status_code, 200)
+        # Create the user, then count today's login
+        self.assertEqual(sum(is_write(q) for q in first.captured_queries), 2)
+
+        requests = 50
+        with CaptureQueriesContext(connection) as warm:
+            for _ in range(requests):
+                self.assertEqual(self.get_badges(token).status_code, 200)
+        self.assertEqual(sum(is_write(q) for q in warm.captured_queries), 0)
+        self.assertEqual(len(warm.captured_queries), 0)
+
+        user = CustomUser.objects.get(supabase_user_id='supabase-user-1')
+        self.assertEqual((user.ls_points, user.last_login_date), (1, date.today()))
+
+    def test_new_token_syncs_changed_profile(self):
+        self.get_badges(make_token())
+        self.get_badges(make_token(first_name='Pedro', ttl=3500))
+        self.assertEqual(CustomUser.objects.get(supabase_user_id='supabase-user-1').first_name, 'Pedro')
+
+    def test_save_drops_cached_user(self):
+        self.get_badges(make_token())
+        user = CustomUser.objects.get(supabase_user_id='supabase-user-1')
+        user.current_hearts = 1
+        user.save()
+        self.assertEqual(get_cached_user(user.pk).current_hearts, 1)
+
+    def test_writes_keep_columns_changed_after_caching(self):
+        token = make_token()
+        auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.get_badges(token)
+        user = CustomUser.objects.get(supabase_user_id='supabase-user-1')
+
+        # update() skips post_save, so the cached user row goes stale
+        CustomUser.objects.filter(pk=user.pk).update(
+            login_streak=9, current_hearts=1,
+            collected_badges=[{"id": "1", "status": "unclaimed"}, {"id": "2", "status": "unclaimed"}],
+        )
+        self.assertEqual(self.client.post('/api/users/badges/2/claim/', **auth).status_code, 200)
+
+        self.get_badges(token)
+        CustomUser.objects.filter(pk=user.pk).update(current_hearts=0)
+        response = self.client.patch('/api/users/profile/update/', {'school_name': "Paaralang Bayan"}, format='json', **auth)
+        self.assertEqual(response.status_code, 200)
+
+        user.refresh_from_db()
+        self.assertEqual((user.login_streak, user.current_hearts, user.school_name), (9, 0, "Paaralang Bayan"))
+        self.assertEqual(user.collected_badges, [{"id": "1", "status": "unclaimed"}, {"id": "2", "status": "claimed"}])
+
+    def test_invalid_token_is_rejected(self):
+        response = self.get_badges(make_token(ttl=-1000))
+        self.assertEqual(response.status_code, 403)
+
+
+
+class DailyActivityTests(TestCase):
+    def test_daily_activity_counts_once(self):
+        yesterday = date.today() - timedelta(days=1)
+        user = CustomUser.objects.create(
+            supabase_user_id='streaker', email='s@example.com',
+            ls_points=2, last_login_date=yesterday,
+            login_streak=4, longest_streak=4, last_active_date=yesterday,
+            collected_badges=["1"],
+        )
+        stale = CustomUser.objects.get(pk=user.pk)
+
+        emit_daily_activity(user)
+        # A concurrent request that read the row before the update
+        emit_daily_activity(stale)
+
+        user.refresh_from_db()
+        self.assertEqual((user.ls_points, user.login_streak, user.longest_streak), (3, 5, 5))
+        self.assertEqual((stale.ls_points, stale.login_streak), (3, 5))
+        self.assertEqual(user.collected_badges, [
+            {"id": "1", "status": "unclaimed"},
+        ])
+
+    def test_missed_day_resets_streaks(self):
+        user = CustomUser.objects.create(
+            supabase_user_id='returning', email='r@example.com',
+            ls_points=40, last_login_date=date.today() - timedelta(days=3),
+            login_streak=40, longest_streak=40, last_active_date=date.today() - timedelta(days=3),
+        )
+        emit_daily_activity(user)
+        user.refresh_from_db()
+        self.assertEqual((user.ls_points, user.login_streak, user.longest_streak), (1, 1, 40))
+
+    def test_backfill_badges(self):
+        legacy = CustomUser.objects.create(
+            supabase_user_id='legacy', email='l@example.com', ls_points=6, collected_badges=["1"],
+        )
+        claimed = [{"id": "1", "status": "claimed"}]
+        current = CustomUser.objects.create(
+            supabase_user_id='current', email='c@example.com', ls_points=3, collected_badges=claimed,
+        )
+
+        out = StringIO()
+        call_command('backfill_badges', stdout=out)
+
+        legacy.refresh_from_db()
+        current.refresh_from_db()
+        self.assertEqual(legacy.collected_badges, [
+            {"id": "1", "status": "unclaimed"},
+            {"id": "2", "status": "unclaimed"},
+        ])
+        self.assertEqual(current.collected_badges, claimed)
+        self.assertIn('1/2', out.getvalue())
+
+
+class HeartTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create(supabase_user_id='hearts', email='h@example.com')
+
+    def test_hearts_refill_in_closed_form(self):
+        now = timezone.now()
+        self.user.current_hearts = 0
+        self.user.next_refill_at = now - timedelta(hours=1)
+        self.assertEqual(self.user.heart_state(now), (3, None))
+
+        self.user.next_refill_at = now - timedelta(minutes=1)
+        self.assertEqual(
+            self.user.heart_state(now),
+            (1, self.user.next_refill_at + HEART_REFILL_INTERVAL),
+        )
+
+    def test_reading_hearts_does_not_write(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            current_hearts=1, next_refill_at=timezone.now() - timedelta(minutes=6),
+        )
+        self.user.refresh_from_db()
+        with CaptureQueriesContext(connection) as queries:
+            self.user.refill_hearts_if_needed()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.user.current_hearts, 3)
+
+    def test_concurrent_heart_losses_both_count(self):
+        tab_a = CustomUser.objects.get(pk=self.user.pk)
+        tab_b = CustomUser.objects.get(pk=self.user.pk)
+
+        self.assertTrue(tab_a.lose_heart())
+        self.assertTrue(tab_b.lose_heart())
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.current_hearts, 1)
+        self.assertIsNotNone(self.user.next_refill_at)
 
-# Create your tests here.
+        self.assertTrue(tab_a.lose_heart())
+        self.assertFalse(tab_b.lose_heart())
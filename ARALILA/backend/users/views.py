@@ -1,9 +1,7 @@
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from django.utils import timezone
-from datetime import timedelta
-from .models import CustomUser
+from .models import CustomUser, MAX_HEARTS
 from .serializers import CustomUserSerializer
 
 # -----------------------------
@@ -24,11 +22,13 @@ def profile_view(request):
 def update_profile_view(request):
     """Update user profile (school_name, profile_pic)"""
     user = request.user
+    # request.user may come from the auth cache; only write the profile columns
+    user.refresh_from_db()
     allowed_fields = ['school_name', 'profile_pic']
-    for field in allowed_fields:
-        if field in request.data:
-            setattr(user, field, request.data[field])
-    user.save()
+    updated_fields = [field for field in allowed_fields if field in request.data]
+    for field in updated_fields:
+        setattr(user, field, request.data[field])
+    user.save(update_fields=updated_fields)
     serializer = CustomUserSerializer(user)
     return Response(serializer.data)
 
@@ -45,7 +45,7 @@ def hearts_status_view(request):
     return Response({
         "current_hearts": user.current_hearts,
         "next_refill_at": user.next_refill_at.isoformat() if user.next_refill_at else None,
-        "max_hearts": 3
+        "max_hearts": MAX_HEARTS
     })
 
 @api_view(['POST'])
@@ -53,19 +53,10 @@ def hearts_status_view(request):
 def reduce_heart_view(request):
     """Reduce one heart after wrong answer"""
     user: CustomUser = request.user
-    user.refill_hearts_if_needed()
-    
-    if user.current_hearts <= 0:
+
+    if not user.lose_heart():
         return Response({"error": "No hearts available"}, status=400)
     
-    user.current_hearts -= 1
-    
-    # Schedule refill if this is the first heart loss
-    if user.current_hearts < 3 and not user.next_refill_at:
-        user.next_refill_at = timezone.now() + timedelta(minutes=5)
-    
-    user.save()
-    
     return Response({
         "current_hearts": user.current_hearts,
         "next_refill_at": user.next_refill_at.isoformat() if user.next_refill_at else None
@@ -89,6 +80,8 @@ def claim_badge_view(request, badge_id: str):
     user: CustomUser = request.user
     updated = False
 
+    # request.user may come from the auth cache; badges can have been awarded since
+    user.refresh_from_db(fields=['collected_badges'])
     if not user.collected_badges:
         return Response({"success": False, "message": "No badges found"}, status=400)
 
@@ -99,7 +92,7 @@ def claim_badge_view(request, badge_id: str):
             break
 
     if updated:
-        user.save()
+        user.save(update_fields=['collected_badges'])
         return Response({"success": True, "badge_id": badge_id})
     else:
         return Response({"success": False, "message": "Badge not found or already claimed"}, status=400)
\ No newline at end of file
@@ -11,6 +11,7 @@ type LessonData = {
   id: number;
   areaId: number;
   title: string;
+  sessionId: string;
   challenges: ChallengeType[];
 };
 
@@ -122,6 +123,7 @@ export default function AssessmentPage() {
       <Quiz
         initialLessonId={lessonData.id}
         initialAreaId={lessonData.areaId}
+        initialSessionId={lessonData.sessionId}
         initialLessonChallenges={lessonData.challenges}
         initialHearts={hearts}
         initialPercentage={initialPercentage}
@@ -3,7 +3,7 @@ import { Card } from "./card";
 import { Input } from "@/components/ui/input";
 import { Textarea } from "@/components/ui/textarea";
 import { Button } from "@/components/ui/button";
-import { useState, useMemo } from "react";
+import { useState } from "react";
 import { QuestionBubble } from "./question-bubble";
 
 type ChallengeOption = {
@@ -11,7 +11,6 @@ type ChallengeOption = {
   text: string;
   imageSrc: string | null;
   audioSrc: string | null;
-  correct: boolean;
 };
 
 type Challenge = {
@@ -29,8 +28,8 @@ type Challenge = {
     correctTag?: string;
     correctPosition?: number;
   }>;
-  punctuationMarks?: Array<{ id: number; mark: string; positions: number[] }>;
-  posOptions?: Array<{ id: number; text: string; isCorrect: boolean }>;
+  punctuationMarks?: Array<{ id: number; mark: string }>;
+  posOptions?: Array<{ id: number; text: string }>;
 };
 
 type ChallengeProps = {
@@ -69,18 +68,7 @@ export const Challenge = ({
   const [draggedMark, setDraggedMark] = useState<string | null>(null);
   const [selectedWord, setSelectedWord] = useState<number | null>(null);
   const [selectedPos, setSelectedPos] = useState<number | null>(null);
-
-  const shuffledWords = useMemo(() => {
-    if (challenge.type === "ARRANGE" && challenge.words) {
-      const words = [...challenge.words];
-      for (let i = words.length - 1; i > 0; i--) {
-        const j = Math.floor(Math.random() * (i + 1));
-        [words[i], words[j]] = [words[j], words[i]];
-      }
-      return words;
-    }
-    return challenge.words || [];
-  }, [challenge.id]);
+  const [selectedGap, setSelectedGap] = useState<number | null>(null);
 
   // 👇 SPELL type - Text input with image
   if (challenge.type === "SPELL") {
@@ -106,7 +94,8 @@ export const Challenge = ({
 
   // 👇 ARRANGE type - Drag and drop words
   if (challenge.type === "ARRANGE") {
-    const availableWords = shuffledWords;
+    // Already shuffled by the server
+    const availableWords = challenge.words || [];
 
     return (
       <div className="flex flex-col gap-4">
@@ -152,20 +141,19 @@ export const Challenge = ({
     const sentence: string = challenge.question || "";
     const words: string[] = sentence.split(" ");
 
-    const allPositions: number[] = (challenge.punctuationMarks || [])
-      .flatMap((pm: any) => (pm.positions as number[]) || [])
-      .filter((p: number): p is number => typeof p === "number");
-
-    const correctWordPositions: number[] = Array.from(
-      new Set(allPositions)
-    ).sort((a, b) => a - b);
-
-    const availableMarks: string[] = [",", ".", "!", "?"];
-
-    const nextGapWordIndex: number | undefined = correctWordPositions.find(
-      (pos: number) => !selectedPunctuation?.some((p) => p.position === pos)
+    // Where the marks go is checked on the server, so every word has a gap
+    const availableMarks: string[] = Array.from(
+      new Set([
+        ",",
+        ".",
+        "!",
+        "?",
+        ...(challenge.punctuationMarks || []).map((pm) => pm.mark),
+      ])
     );
 
+    const nextGapWordIndex: number | null = selectedGap;
+
     const handlePunctuationClick = (mark: string) => {
       if (typeof nextGapWordIndex !== "number" || disabled) return;
 
@@ -174,6 +162,7 @@ export const Challenge = ({
         { mark, position: nextGapWordIndex },
       ];
       onPunctuate?.(newPunctuation);
+      setSelectedGap(null);
     };
 
     const removePunctuation = (wordIndex: number) => {
@@ -187,7 +176,6 @@ export const Challenge = ({
         <div className="flex text-xl p-6 bg-sky-50 rounded-lg border border-sky-300 min-h-[100px] mb-6">
           <div className="flex flex-wrap items-center gap-2">
             {words.map((word, i) => {
-              const hasGap = correctWordPositions.includes(i);
               const placedPunctuation = selectedPunctuation?.find(
                 (p) => p.position === i
               );
@@ -197,33 +185,39 @@ export const Challenge = ({
                 <div key={i} className="flex items-center gap-1">
                   <span className="text-neutral-900">{word}</span>
 
-                  {hasGap && (
-                    <span
-                      className={cn(
-                        "inline-flex items-center justify-center min-w-[36px] h-[36px] rounded-md border-2 border-b-3 transition-all",
-                        placedPunctuation
-                          ? "border-green-500 bg-green-50 text-green-700"
-                          : isNextGap
-                          ? "border-purple-500 bg-purple-50 animate-pulse"
-                          : "border-neutral-300 bg-white"
-                      )}
-                    >
-                      {placedPunctuation ? (
-                        <button
-                          onClick={() => removePunctuation(i)}
-                          className="text-lg font-bold px-2 hover:text-red-600 transition-colors"
-                          disabled={disabled}
-                          title="Click to remove"
-                        >
-                          {placedPunctuation.mark}
-                        </button>
-                      ) : isNextGap ? (
-                        <span className="text-sm text-purple-400">?</span>
-                      ) : (
-                        <span className="text-xs text-neutral-300">_</span>
-                      )}
-                    </span>
-                  )}
+                  <span
+                    className={cn(
+                      "inline-flex items-center justify-center min-w-[36px] h-[36px] rounded-md border-2 border-b-3 transition-all",
+                      placedPunctuation
+                        ? "border-green-500 bg-green-50 text-green-700"
+                        : isNextGap
+                        ? "border-purple-500 bg-purple-50 animate-pulse"
+                        : "border-neutral-300 bg-white"
+                    )}
+                  >
+                    {placedPunctuation ? (
+                      <button
+                        onClick={() => removePunctuation(i)}
+                        className="text-lg font-bold px-2 hover:text-red-600 transition-colors"
+                        disabled={disabled}
+                        title="Click to remove"
+                      >
+                        {placedPunctuation.mark}
+                      </button>
+                    ) : (
+                      <button
+                        onClick={() => setSelectedGap(isNextGap ? null : i)}
+                        className={cn(
+                          "w-full h-full text-xs",
+                          isNextGap ? "text-purple-400" : "text-neutral-300"
+                        )}
+                        disabled={disabled}
+                        title="Click to pick this gap"
+                      >
+                        {isNextGap ? "?" : "_"}
+                      </button>
+                    )}
+                  </span>
                 </div>
               );
             })}
@@ -232,7 +226,7 @@ export const Challenge = ({
 
         <div className="space-y-3">
           <p className="text-base text-gray-400 font-medium text-center">
-            Click a punctuation mark to fill the highlighted gap:
+            Pick a gap after a word, then click a punctuation mark:
           </p>
           <div className="flex items-center justify-center gap-3">
             {availableMarks.map((mark) => (
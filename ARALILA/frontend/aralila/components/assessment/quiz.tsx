@@ -42,8 +42,8 @@ type ChallengeType = {
     correctTag?: string;
     correctPosition?: number;
   }>;
-  punctuationMarks?: Array<{ id: number; mark: string; positions: number[] }>;
-  posOptions?: Array<{ id: number; text: string; isCorrect: boolean }>;
+  punctuationMarks?: Array<{ id: number; mark: string }>;
+  posOptions?: Array<{ id: number; text: string }>;
 };
 
 export const Quiz = ({
@@ -51,6 +51,7 @@ export const Quiz = ({
   initialHearts,
   initialLessonId,
   initialAreaId,
+  initialSessionId,
   initialLessonChallenges,
   userSubscription,
 }: QuizProps) => {
@@ -230,6 +231,102 @@ export const Quiz = ({
     return data;
   };
 
+  // Answers are graded on the server against the assessment session
+  const checkAnswer = async (answer: unknown) => {
+    const supabase = createClient();
+    const {
+      data: { session },
+    } = await supabase.auth.getSession();
+
+    const response = await fetch(
+      `${env.backendUrl}/api/games/assessment/validate-answer/`,
+      {
+        method: "POST",
+        headers: {
+          Authorization: `Bearer ${session?.access_token}`,
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({
+          sessionId: initialSessionId,
+          challengeId: challenge.id,
+          answer: answer,
+        }),
+      }
+    );
+
+    if (!response.ok) {
+      throw new Error("Failed to validate answer");
+    }
+
+    return response.json();
+  };
+
+  const onOptionChecked = (correct: boolean) => {
+    if (correct) {
+      startTransition(() => {
+        upsertChallengeProgress(challenge.id)
+          .then((response) => {
+            if (response?.error === "hearts") {
+              openHeartsModal();
+              return;
+            }
+
+            playCorrectSound();
+            setStatus("correct");
+            setPercentage((prev) => prev + 100 / challenges.length);
+
+            if (initialPercentage === 100) {
+              setHearts((prev) => Math.min(prev + 1, MAX_HEARTS));
+            }
+          })
+          .catch(() => toast.error("Something went wrong. Please try again."))
+          .finally(() => {
+            setIsChecking(false);
+          });
+      });
+    } else {
+      setStatus("wrong");
+
+      if (initialPercentage !== 100) {
+        startTransition(() => {
+          reduceHearts()
+            .then((response) => {
+              if (response?.error === "hearts") {
+                openHeartsModal();
+                return;
+              }
+
+              if (!response?.error) {
+                const newHearts = Math.max(hearts - 1, 0);
+                setHearts(newHearts);
+                // localStorage.setItem("currentHearts", newHearts.toString());
+
+                if (newHearts === 0) {
+                  const HEART_REFILL_TIME = 5 * 60 * 1000;
+                  const refillTime = Date.now() + HEART_REFILL_TIME;
+                  // localStorage.setItem(
+                  //   "heartRefillTime",
+                  //   refillTime.toString()
+                  // );
+
+                  openHeartsModal();
+                }
+              }
+            })
+            .catch(() =>
+              toast.error("Something went wrong. Please try again.")
+            )
+            .finally(() => {
+              setIsChecking(false);
+            });
+        });
+      } else {
+        setIsChecking(false);
+      }
+    }
+
+  };
+
   const onContinue = () => {
     if (hearts === 0 && initialPercentage !== 100) {
       openHeartsModal();
@@ -254,77 +351,12 @@ export const Quiz = ({
 
       setIsChecking(true);
 
-      const correctOption = options.find(
-        (option: ChallengeOption) => option.correct
-      );
-
-      if (!correctOption) {
-        setIsChecking(false);
-        return;
-      }
-
-      if (correctOption.id === selectedOption) {
-        startTransition(() => {
-          upsertChallengeProgress(challenge.id)
-            .then((response) => {
-              if (response?.error === "hearts") {
-                openHeartsModal();
-                return;
-              }
-
-              playCorrectSound();
-              setStatus("correct");
-              setPercentage((prev) => prev + 100 / challenges.length);
-
-              if (initialPercentage === 100) {
-                setHearts((prev) => Math.min(prev + 1, MAX_HEARTS));
-              }
-            })
-            .catch(() => toast.error("Something went wrong. Please try again."))
-            .finally(() => {
-              setIsChecking(false);
-            });
-        });
-      } else {
-        setStatus("wrong");
-
-        if (initialPercentage !== 100) {
-          startTransition(() => {
-            reduceHearts()
-              .then((response) => {
-                if (response?.error === "hearts") {
-                  openHeartsModal();
-                  return;
-                }
-
-                if (!response?.error) {
-                  const newHearts = Math.max(hearts - 1, 0);
-                  setHearts(newHearts);
-                  // localStorage.setItem("currentHearts", newHearts.toString());
-
-                  if (newHearts === 0) {
-                    const HEART_REFILL_TIME = 5 * 60 * 1000;
-                    const refillTime = Date.now() + HEART_REFILL_TIME;
-                    // localStorage.setItem(
-                    //   "heartRefillTime",
-                    //   refillTime.toString()
-                    // );
-
-                    openHeartsModal();
-                  }
-                }
-              })
-              .catch(() =>
-                toast.error("Something went wrong. Please try again.")
-              )
-              .finally(() => {
-                setIsChecking(false);
-              });
-          });
-        } else {
+      checkAnswer(selectedOption)
+        .then((result) => onOptionChecked(result.correct))
+        .catch(() => {
+          toast.error("Failed to validate answer. Please try again.");
           setIsChecking(false);
-        }
-      }
+        });
     } else {
       if (status === "wrong") {
         setStatus("none");
@@ -372,27 +404,7 @@ export const Quiz = ({
           break;
       }
 
-      const supabase = createClient();
-      const {
-        data: { session },
-      } = await supabase.auth.getSession();
-
-      const response = await fetch(
-        `${env.backendUrl}/api/games/assessment/validate-answer/`,
-        {
-          method: "POST",
-          headers: {
-            Authorization: `Bearer ${session?.access_token}`,
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            challengeId: challenge.id,
-            answer: answer,
-          }),
-        }
-      );
-
-      const result = await response.json();
+      const result = await checkAnswer(answer);
 
       if (result.correct) {
         playCorrectSound();
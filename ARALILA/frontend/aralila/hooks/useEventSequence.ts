@@ -0,0 +1,40 @@
+import { useCallback, useRef } from 'react';
+
+/**
+ * Keeps track of the `seq` numbers of v2 room events
+ * (backend/games/room_events.py). Events at or below the last snapshot's
+ * `seq` are already part of it; a gap means an event was missed, so a new
+ * snapshot is requested and events are ignored until it arrives.
+ */
+export function useEventSequence(requestSnapshot: () => void) {
+  const lastSeqRef = useRef<number | null>(null);
+  const requestRef = useRef(requestSnapshot);
+  requestRef.current = requestSnapshot;
+
+  // Called with a snapshot's seq, or null while waiting for one
+  const reset = useCallback((seq: number | null) => {
+    lastSeqRef.current = seq;
+  }, []);
+
+  const accept = useCallback((seq?: number) => {
+    // v1 events aren't numbered
+    if (seq === undefined) return true;
+
+    const last = lastSeqRef.current;
+    if (last === null || seq <= last) return false;
+
+    if (seq > last + 1) {
+      console.log(`⚠️ Missed events ${last + 1}-${seq - 1}, asking for a snapshot`);
+      lastSeqRef.current = null;
+      requestRef.current();
+      return false;
+    }
+
+    lastSeqRef.current = seq;
+    return true;
+  }, []);
+
+  const lastSeq = useCallback(() => lastSeqRef.current, []);
+
+  return { accept, reset, lastSeq };
+}
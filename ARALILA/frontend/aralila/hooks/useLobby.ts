@@ -1,7 +1,10 @@
 import { useState, useCallback, useMemo, useRef } from 'react';
-import { useWebSocket } from './useWebSocket';
+import { useWebSocket, MSGPACK_PROTOCOL } from './useWebSocket';
+import { useEventSequence } from './useEventSequence';
 import { env } from '@/lib/env';
 
+const PROTOCOLS = [MSGPACK_PROTOCOL];
+
 interface UseLobbyProps {
   roomCode: string;
   playerName: string;
@@ -16,6 +19,10 @@ export function useLobby({ roomCode, playerName, maxPlayers, onGameStart }: UseL
   
   const lastPlayersRef = useRef<string[]>([]);
   const processingMessageRef = useRef(false);
+  const sendRef = useRef<(data: any) => boolean>(() => false);
+  const { accept: acceptSeq, reset: resetSeq } = useEventSequence(() =>
+    sendRef.current({ type: 'snapshot' })
+  );
 
   // NEW: Only include maxPlayers in URL if it's defined (host creating room)
   const wsUrl = useMemo(() => {
@@ -35,11 +42,30 @@ export function useLobby({ roomCode, playerName, maxPlayers, onGameStart }: UseL
     try {
       console.log('📨 Lobby message:', data);
 
+      // v2: skip events already in the snapshot (game_start always counts)
+      const inSequence = data.type === 'snapshot' || acceptSeq(data.seq);
+      if (!inSequence && data.type !== 'game_start') {
+        return;
+      }
+
       switch (data.type) {
+        case 'snapshot':
         case 'player_list':
         case 'player_joined':
         case 'player_left':
-          const newPlayers = data.players || [];
+          if (data.type === 'snapshot') {
+            resetSeq(data.seq);
+          }
+
+          // v2 deltas name the player instead of sending the whole list
+          let newPlayers: string[] = data.players || [];
+          if (!data.players && data.type === 'player_joined') {
+            newPlayers = lastPlayersRef.current.includes(data.player)
+              ? lastPlayersRef.current
+              : [...lastPlayersRef.current, data.player];
+          } else if (!data.players && data.type === 'player_left') {
+            newPlayers = lastPlayersRef.current.filter((p) => p !== data.player);
+          }
           const playersChanged = JSON.stringify(newPlayers) !== JSON.stringify(lastPlayersRef.current);
           
           if (playersChanged) {
@@ -71,21 +97,25 @@ export function useLobby({ roomCode, playerName, maxPlayers, onGameStart }: UseL
     } finally {
       processingMessageRef.current = false;
     }
-  }, [onGameStart]);
+  }, [onGameStart, acceptSeq, resetSeq]);
 
   const { isConnected, connectionError, sendMessage } = useWebSocket({
     url: wsUrl,
+    protocols: PROTOCOLS,
     onMessage: handleMessage,
     onOpen: useCallback(() => {
       console.log('✅ Connected to lobby:', roomCode);
     }, [roomCode]),
     onClose: useCallback(() => {
       console.log('🔌 Disconnected from lobby:', roomCode);
-    }, [roomCode]),
+      // The next connection starts with a fresh snapshot
+      resetSeq(null);
+    }, [roomCode, resetSeq]),
     reconnect: true,
     reconnectDelay: 2000,
     maxReconnectAttempts: 3,
   });
+  sendRef.current = sendMessage;
 
   return { 
     players, 
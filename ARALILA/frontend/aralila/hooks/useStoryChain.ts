@@ -1,8 +1,13 @@
 import { useState, useCallback, useEffect, useRef } from 'react';
-import { useWebSocket } from './useWebSocket';
+import { useWebSocket, MSGPACK_PROTOCOL } from './useWebSocket';
+import { useEventSequence } from './useEventSequence';
 import { env } from '@/lib/env';
 import type { StoryChainMessage, GameState } from '@/types/games';
 
+const PROTOCOLS = [MSGPACK_PROTOCOL];
+// Placeholder the server stores for a timed-out turn (games/story_room.py)
+const MISSED_TURN = '[missed turn]';
+
 interface UseStoryChainOptions {
   roomName: string;
   playerName: string;
@@ -26,18 +31,85 @@ export function useStoryChain({ roomName, playerName, turnOrder }: UseStoryChain
   const hasJoinedRef = useRef(false);
   const timerRef = useRef<NodeJS.Timeout | null>(null); // NEW: Track timer
 
+  // v2: resume token, image catalog from the snapshot and each round's parts
+  // (deltas carry only indexes)
+  const tokenRef = useRef<string | null>(null);
+  const imagesRef = useRef<Array<{ url: string; description: string }>>([]);
+  const imageIndexRef = useRef(0);
+  const roundPartsRef = useRef<Record<number, string[]>>({});
+  const sendRef = useRef<(data: any) => boolean>(() => false);
+  const { accept: acceptSeq, reset: resetSeq, lastSeq } = useEventSequence(() =>
+    sendRef.current({ type: 'snapshot' })
+  );
+
   const handleMessage = useCallback((data: StoryChainMessage) => {
     console.log('🎮 Game message:', data);
 
+    // v2: skip events already in the snapshot, or after a gap until the next one
+    if (data.type !== 'snapshot' && !acceptSeq(data.seq)) {
+      return;
+    }
+
     switch (data.type) {
+      case 'session':
+        tokenRef.current = data.token || null;
+        break;
+
+      case 'resume_failed':
+        console.log('⚠️ Session expired, joining again');
+        tokenRef.current = null;
+        sendRef.current({ type: 'player_join', player: playerName });
+        break;
+
+      case 'snapshot': {
+        resetSeq(data.seq ?? null);
+        imagesRef.current = data.images || imagesRef.current;
+        const imageIndex = data.current_image_index ?? 0;
+        imageIndexRef.current = imageIndex;
+        const image = imagesRef.current[imageIndex];
+
+        // Add the current round's parts this client hasn't seen yet
+        const parts = (data.parts || []).filter((part) => part.text !== MISSED_TURN);
+        const known = roundPartsRef.current[imageIndex] || [];
+        const missing = parts.slice(known.length);
+        roundPartsRef.current[imageIndex] = parts.map((part) => part.text);
+
+        setGameState((prev) => ({
+          ...prev,
+          players: data.players || prev.players,
+          scores: data.scores || prev.scores,
+          story: [...prev.story, ...missing],
+          currentTurn: data.game_started && data.current_player ? data.current_player : prev.currentTurn,
+          imageIndex,
+          totalImages: data.total_images ?? prev.totalImages,
+          imageUrl: image?.url ?? prev.imageUrl,
+          imageDescription: image?.description ?? prev.imageDescription,
+          timeLeft: data.time_limit ?? prev.timeLeft,
+        }));
+        break;
+      }
+
+      case 'resumed':
+        console.log('🔁 Resumed as', data.player);
+        break;
+
       case 'players_update':
         if (data.players) {
           setGameState((prev) => ({ ...prev, players: data.players! }));
+        } else if (data.player) {
+          // v2 delta: just the player who joined
+          setGameState((prev) => (
+            prev.players.includes(data.player!)
+              ? prev
+              : { ...prev, players: [...prev.players, data.player!] }
+          ));
         }
         break;
 
       case 'story_update':
         if (data.player && data.text) {
+          const round = imageIndexRef.current;
+          roundPartsRef.current[round] = [...(roundPartsRef.current[round] || []), data.text];
           // NEW: Force immediate UI update
           setGameState((prev) => {
             const newStory = [...prev.story, { player: data.player!, text: data.text! }];
@@ -77,35 +149,46 @@ export function useStoryChain({ roomName, playerName, turnOrder }: UseStoryChain
         }
         break;
 
-      case 'sentence_evaluation':
-        if (data.sentence && data.score !== undefined) {
+      case 'sentence_evaluation': {
+        // v2 leaves out the sentence; rebuild it from the round's parts
+        const sentence = data.sentence
+          ?? (data.image_index !== undefined ? roundPartsRef.current[data.image_index]?.join(' ') : undefined);
+        if (sentence && data.score !== undefined) {
           setGameState((prev) => ({
             ...prev,
             story: [...prev.story, { 
               player: 'AI', 
-              text: `✅ Complete sentence: "${data.sentence}" | Score: ${data.score}/20` 
+              text: `✅ Complete sentence: "${sentence}" | Score: ${data.score}/20` 
             }],
           }));
         }
         break;
+      }
 
-      case 'new_image':
+      case 'new_image': {
         console.log('🖼️ New image:', data);
         
         // NEW: Clear timer when image changes
         if (timerRef.current) {
           clearInterval(timerRef.current);
         }
+
+        if (data.image_index !== undefined) {
+          imageIndexRef.current = data.image_index;
+        }
+        // v2 sends only the index; the URL and description come from the snapshot
+        const catalogImage = data.image_index !== undefined ? imagesRef.current[data.image_index] : undefined;
         
         setGameState((prev) => ({
           ...prev,
           imageIndex: data.image_index ?? prev.imageIndex,
           totalImages: data.total_images ?? prev.totalImages,
-          imageUrl: data.image_url || null,
-          imageDescription: data.image_description ?? null,
+          imageUrl: data.image_url || catalogImage?.url || null,
+          imageDescription: data.image_description ?? catalogImage?.description ?? null,
           timeLeft: 20, 
         }));
         break;
+      }
 
       case 'game_complete':
         console.log('🏁 Game complete:', data.scores);
@@ -126,26 +209,39 @@ export function useStoryChain({ roomName, playerName, turnOrder }: UseStoryChain
         console.error('❌ Game error:', data.message);
         break;
     }
-  }, []);
+  }, [acceptSeq, resetSeq, playerName]);
 
   const wsUrl = `${env.wsUrl}/ws/story/${roomName}/?player=${encodeURIComponent(playerName)}`;
 
-  const { isConnected, connectionError, sendMessage } = useWebSocket({
+  const { isConnected, connectionError, protocol, sendMessage } = useWebSocket({
     url: wsUrl,
+    protocols: PROTOCOLS,
     onMessage: handleMessage,
     onOpen: useCallback(() => {
       console.log('✅ Connected to Story Chain game');
     }, []),
+    onClose: useCallback(() => {
+      // A reconnected socket has to join again before it can play
+      hasJoinedRef.current = false;
+    }, []),
   });
 
-  // Auto-join game when connected
+  sendRef.current = sendMessage;
+
+  // Auto-join game when connected; a v2 client that already had a session
+  // resumes it and gets the events it missed
   useEffect(() => {
     if (isConnected && !hasJoinedRef.current) {
-      console.log('🎮 Joining game as:', playerName);
-      sendMessage({ type: 'player_join', player: playerName });
+      if (protocol && tokenRef.current) {
+        console.log('🔁 Resuming game as:', playerName);
+        sendMessage({ type: 'resume', player: playerName, token: tokenRef.current, last_seq: lastSeq() });
+      } else {
+        console.log('🎮 Joining game as:', playerName);
+        sendMessage({ type: 'player_join', player: playerName });
+      }
       hasJoinedRef.current = true;
     }
-  }, [isConnected, playerName, sendMessage]);
+  }, [isConnected, protocol, playerName, sendMessage, lastSeq]);
 
   const submitSentence = useCallback((text: string) => {
     if (text.trim() && gameState.currentTurn === playerName) {
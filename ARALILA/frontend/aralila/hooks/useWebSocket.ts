@@ -1,7 +1,13 @@
 import { useEffect, useRef, useState } from 'react';
+import { decode, encode } from '@/lib/msgpack';
+
+// v2 room-event protocol: numbered delta events as MessagePack frames
+// (backend/games/room_events.py)
+export const MSGPACK_PROTOCOL = 'aralila.v2.msgpack';
 
 interface UseWebSocketOptions {
   url: string;
+  protocols?: string[];
   onMessage?: (data: any) => void;
   onOpen?: () => void;
   onClose?: () => void;
@@ -13,6 +19,7 @@ interface UseWebSocketOptions {
 
 export function useWebSocket({
   url,
+  protocols,
   onMessage,
   onOpen,
   onClose,
@@ -23,6 +30,8 @@ export function useWebSocket({
 }: UseWebSocketOptions) {
   const [isConnected, setIsConnected] = useState(false);
   const [connectionError, setConnectionError] = useState<string | null>(null);
+  // Subprotocol the server accepted ('' = v1)
+  const [protocol, setProtocol] = useState('');
   
   const socketRef = useRef<WebSocket | null>(null);
   const reconnectAttemptsRef = useRef(0);
@@ -71,7 +80,8 @@ export function useWebSocket({
           throw new Error(`Invalid WebSocket URL: ${url}`);
         }
 
-        const ws = new WebSocket(url);
+        const ws = new WebSocket(url, protocols);
+        ws.binaryType = 'arraybuffer';
         socketRef.current = ws;
 
         ws.onopen = () => {
@@ -82,6 +92,7 @@ export function useWebSocket({
           
           console.log('✅ WebSocket connected');
           connectingRef.current = false;
+          setProtocol(ws.protocol);
           setIsConnected(true);
           setConnectionError(null);
           reconnectAttemptsRef.current = 0;
@@ -92,7 +103,9 @@ export function useWebSocket({
           if (!mountedRef.current) return;
           
           try {
-            const data = JSON.parse(event.data);
+            const data = event.data instanceof ArrayBuffer
+              ? decode(event.data)
+              : JSON.parse(event.data);
             console.log('📨 Received:', data);
             callbacksRef.current.onMessage?.(data);
           } catch (error) {
@@ -168,11 +181,12 @@ export function useWebSocket({
       
       setIsConnected(false);
     };
-  }, [url, reconnect, reconnectDelay, maxReconnectAttempts]); // Only URL and config in deps
+  }, [url, protocols, reconnect, reconnectDelay, maxReconnectAttempts]); // Only URL and config in deps
 
   const sendMessage = (data: any) => {
-    if (socketRef.current?.readyState === WebSocket.OPEN) {
-      socketRef.current.send(JSON.stringify(data));
+    const ws = socketRef.current;
+    if (ws?.readyState === WebSocket.OPEN) {
+      ws.send(ws.protocol === MSGPACK_PROTOCOL ? encode(data) : JSON.stringify(data));
       return true;
     }
     console.warn('⚠️ Cannot send - WebSocket not connected');
@@ -182,6 +196,7 @@ export function useWebSocket({
   return {
     isConnected,
     connectionError,
+    protocol,
     sendMessage,
     disconnect: () => {
       mountedRef.current = false;
@@ -0,0 +1,170 @@
+// Minimal MessagePack codec for the aralila.v2.msgpack socket protocol
+// (see backend/games/room_events.py). Covers the types the room events use:
+// nil, booleans, numbers, strings, binary, arrays and string-keyed maps.
+
+const textEncoder = new TextEncoder();
+const textDecoder = new TextDecoder();
+
+export function encode(value: unknown): Uint8Array {
+  const bytes: number[] = [];
+  const view = new DataView(new ArrayBuffer(8));
+
+  const push = (size: number) => {
+    for (let i = 0; i < size; i++) bytes.push(view.getUint8(i));
+  };
+
+  // Length prefix: fix format when it fits (fixMax < 0: none), then the
+  // 8-bit (code8 = 0: none), 16-bit and 32-bit formats
+  const header = (
+    length: number,
+    fix: number,
+    fixMax: number,
+    code8: number,
+    code16: number,
+    code32: number
+  ) => {
+    if (length <= fixMax) {
+      bytes.push(fix | length);
+    } else if (code8 && length < 0x100) {
+      bytes.push(code8, length);
+    } else if (length < 0x10000) {
+      bytes.push(code16);
+      view.setUint16(0, length);
+      push(2);
+    } else {
+      bytes.push(code32);
+      view.setUint32(0, length);
+      push(4);
+    }
+  };
+
+  const write = (item: unknown) => {
+    if (item === null || item === undefined) {
+      bytes.push(0xc0);
+    } else if (typeof item === "boolean") {
+      bytes.push(item ? 0xc3 : 0xc2);
+    } else if (typeof item === "number") {
+      if (Number.isInteger(item) && item >= -0x80000000 && item <= 0xffffffff) {
+        if (item >= 0 && item < 0x80) {
+          bytes.push(item);
+        } else if (item < 0 && item >= -0x20) {
+          bytes.push(item & 0xff);
+        } else if (item >= 0) {
+          bytes.push(0xce);
+          view.setUint32(0, item);
+          push(4);
+        } else {
+          bytes.push(0xd2);
+          view.setInt32(0, item);
+          push(4);
+        }
+      } else {
+        bytes.push(0xcb);
+        view.setFloat64(0, item);
+        push(8);
+      }
+    } else if (typeof item === "string") {
+      const encoded = textEncoder.encode(item);
+      header(encoded.length, 0xa0, 31, 0xd9, 0xda, 0xdb);
+      encoded.forEach((byte) => bytes.push(byte));
+    } else if (item instanceof Uint8Array) {
+      header(item.length, 0, -1, 0xc4, 0xc5, 0xc6);
+      item.forEach((byte) => bytes.push(byte));
+    } else if (Array.isArray(item)) {
+      header(item.length, 0x90, 15, 0, 0xdc, 0xdd);
+      item.forEach(write);
+    } else if (typeof item === "object") {
+      const entries = Object.entries(item as Record<string, unknown>).filter(
+        ([, entry]) => entry !== undefined
+      );
+      header(entries.length, 0x80, 15, 0, 0xde, 0xdf);
+      entries.forEach(([key, entry]) => {
+        write(key);
+        write(entry);
+      });
+    } else {
+      throw new Error(`Cannot encode ${typeof item} as MessagePack`);
+    }
+  };
+
+  write(value);
+  return new Uint8Array(bytes);
+}
+
+export function decode(data: ArrayBuffer | Uint8Array): unknown {
+  const bytes = data instanceof Uint8Array ? data : new Uint8Array(data);
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  let offset = 0;
+
+  const take = (size: number) => {
+    const start = offset;
+    offset += size;
+    if (offset > bytes.length) throw new Error("Truncated MessagePack data");
+    return start;
+  };
+
+  const str = (length: number) => {
+    const start = take(length);
+    return textDecoder.decode(bytes.subarray(start, start + length));
+  };
+
+  const bin = (length: number) => {
+    const start = take(length);
+    return bytes.slice(start, start + length);
+  };
+
+  const array = (length: number): unknown[] => {
+    const items: unknown[] = [];
+    for (let i = 0; i < length; i++) items.push(read());
+    return items;
+  };
+
+  const map = (length: number) => {
+    const result: Record<string, unknown> = {};
+    for (let i = 0; i < length; i++) {
+      const key = read();
+      result[String(key)] = read();
+    }
+    return result;
+  };
+
+  const read = (): unknown => {
+    const code = bytes[take(1)];
+
+    if (code < 0x80) return code;
+    if (code < 0x90) return map(code & 0x0f);
+    if (code < 0xa0) return array(code & 0x0f);
+    if (code < 0xc0) return str(code & 0x1f);
+    if (code >= 0xe0) return code - 0x100;
+
+    switch (code) {
+      case 0xc0: return null;
+      case 0xc2: return false;
+      case 0xc3: return true;
+      case 0xc4: return bin(view.getUint8(take(1)));
+      case 0xc5: return bin(view.getUint16(take(2)));
+      case 0xc6: return bin(view.getUint32(take(4)));
+      case 0xca: return view.getFloat32(take(4));
+      case 0xcb: return view.getFloat64(take(8));
+      case 0xcc: return view.getUint8(take(1));
+      case 0xcd: return view.getUint16(take(2));
+      case 0xce: return view.getUint32(take(4));
+      case 0xcf: return Number(view.getBigUint64(take(8)));
+      case 0xd0: return view.getInt8(take(1));
+      case 0xd1: return view.getInt16(take(2));
+      case 0xd2: return view.getInt32(take(4));
+      case 0xd3: return Number(view.getBigInt64(take(8)));
+      case 0xd9: return str(view.getUint8(take(1)));
+      case 0xda: return str(view.getUint16(take(2)));
+      case 0xdb: return str(view.getUint32(take(4)));
+      case 0xdc: return array(view.getUint16(take(2)));
+      case 0xdd: return array(view.getUint32(take(4)));
+      case 0xde: return map(view.getUint16(take(2)));
+      case 0xdf: return map(view.getUint32(take(4)));
+      default:
+        throw new Error(`Unsupported MessagePack type 0x${code.toString(16)}`);
+    }
+  };
+
+  return read();
+}
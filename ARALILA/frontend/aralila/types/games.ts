@@ -135,6 +135,16 @@ export interface StoryChainMessage {
   image_description?: string;
   scores?: Record<string, number>;
   message?: string;
+  // v2 protocol (aralila.v2.msgpack): numbered deltas and snapshots
+  seq?: number;
+  token?: string;
+  feedback?: string;
+  provisional?: boolean;
+  current_image_index?: number;
+  current_player?: string | null;
+  game_started?: boolean;
+  parts?: StoryPart[];
+  images?: Array<{ url: string; description: string }>;
 }
 
 export interface StoryPart {
@@ -160,7 +170,6 @@ export interface GameState {
 export type ChallengeOption = {
   id: number;
   text: string;
-  correct: boolean;
   imageSrc: string | null;
   audioSrc: string | null;
 };
@@ -182,8 +191,8 @@ export type ChallengeType = {
     correctTag?: string;
     correctPosition?: number;
   }>;
-  punctuationMarks?: Array<{ id: number; mark: string; positions: number[] }>;
-  posOptions?: Array<{ id: number; text: string; isCorrect: boolean }>;
+  punctuationMarks?: Array<{ id: number; mark: string }>;
+  posOptions?: Array<{ id: number; text: string }>;
 };
 
 export type QuizProps = {
@@ -191,6 +200,7 @@ export type QuizProps = {
   initialHearts: number;
   initialLessonId: number;
   initialAreaId: number;
+  initialSessionId: string;
   initialLessonChallenges: ChallengeType[];
   userSubscription: {
     isActive: boolean;